@@ -5,9 +5,8 @@ from datetime import timedelta
 from dotenv import load_dotenv  # type: ignore
 from pathlib import Path
 
-load_dotenv()  # Load environment variables from .env file
-
 BASE_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(BASE_DIR / ".env")  # explicit path: skips find_dotenv()'s search
 SECRET_KEY = os.getenv("SECRET_KEY")
 # DEBUG = True
 DEBUG = False
@@ -42,7 +41,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.ServerTimingMiddleware",  # keep first: times the whole stack
+    "api.nplusone.NPlusOneMiddleware",  # only active with NPLUSONE_DETECTION
+    "api.middleware.ReplicaMiddleware",  # read replica routing (api.routers)
     "corsheaders.middleware.CorsMiddleware",  # add CORS
+    "api.middleware.CompressionMiddleware",  # brotli/gzip for API JSON
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,6 +87,10 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "your_db_password"),
         "HOST": os.getenv("DB_HOST", "your_db_host"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # One connection per request unless set; gunicorn.conf.py sets 60s for
+        # sync workers, so the connection opened by the warm-up is reused
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "0")),
+        "CONN_HEALTH_CHECKS": True,
     }
     # "default": {
     #     "ENGINE": "django.db.backends.sqlite3",
@@ -91,6 +98,148 @@ DATABASES = {
     # }
 }
 
+# Read replica: set DB_REPLICA_HOST and/or DB_REPLICA_NAME (the others, and
+# USER/PASSWORD/PORT, default to the primary's). Locally, DB_REPLICA_NAME
+# alone points the replica at a second database on the same server, e.g. a
+# copy of the primary. Views marked @read_replica read from DATABASE_REPLICA;
+# after writing, a user reads from the primary for REPLICA_PIN_SECONDS (a pin
+# in the default cache, which must be shared between workers; see api.routers).
+if os.getenv("DB_REPLICA_HOST") or os.getenv("DB_REPLICA_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.getenv("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "USER": os.getenv("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.getenv("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        "HOST": os.getenv("DB_REPLICA_HOST", DATABASES["default"]["HOST"]),
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICA = "replica" if "replica" in DATABASES else None
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+
+# Logging
+# One JSON line per request on `api.timing` (see api.middleware): requests
+# slower than API_SLOW_REQUEST_MS at WARNING, the others at INFO
+API_SLOW_REQUEST_MS = int(os.getenv("API_SLOW_REQUEST_MS", "500"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "api.timing": {
+            "handlers": ["console"],
+            # WARNING logs the slow requests only, INFO every request
+            "level": os.getenv("API_TIMING_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
+
+
+# Cache
+# Local memory is per worker process; point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (file based, redis...) to share payloads between workers.
+
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+PROFILE_CACHE_BACKEND = os.getenv("PROFILE_CACHE_BACKEND", LOCMEM_CACHE)
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", LOCMEM_CACHE),
+        "LOCATION": os.getenv("CACHE_LOCATION", "epgp"),
+    },
+    "profiles": {
+        "BACKEND": PROFILE_CACHE_BACKEND,
+        "LOCATION": os.getenv("PROFILE_CACHE_LOCATION", "epgp-profiles"),
+        # Invalidation only reaches the worker's own local memory: keep what
+        # the other workers may serve stale short
+        "TIMEOUT": 30 if PROFILE_CACHE_BACKEND == LOCMEM_CACHE else 3600,
+    },
+    # Token buckets of api.throttles; use redis when running several workers
+    # (a system check warns about local memory when DEBUG is off)
+    "throttles": {
+        "BACKEND": os.getenv("THROTTLE_CACHE_BACKEND", LOCMEM_CACHE),
+        "LOCATION": os.getenv("THROTTLE_CACHE_LOCATION", "epgp-throttles"),
+    },
+}
+# Profile cache backends, e.g.
+#   file:  PROFILE_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+#          PROFILE_CACHE_LOCATION=/tmp/epgp-profiles
+#   redis: PROFILE_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#          PROFILE_CACHE_LOCATION=redis://127.0.0.1:6379/1  (needs `redis`)
+# Signals only reach the worker that made the change, so use a shared backend
+# when running several workers (a system check warns about local memory when
+# DEBUG is off).
+API_PAYLOAD_CACHE_TIMEOUT = 300  # seconds; signals invalidate earlier on change
+
+# Offerings kept per offering by api.recommend (/api/electives/<id>/also-taken).
+# `manage.py build_recommendations` recomputes the terms whose enrollments
+# changed: run it every few minutes, e.g. from cron or a scheduled job.
+RECOMMEND_TOP_K = 10
+
+# /api/sync keeps tombstones of deleted rows this long; older cursors get a
+# full snapshot. `manage.py prune_tombstones` deletes the expired ones, and
+# the suggestion change log past api.suggest.LOG_RETENTION (one hour): run it
+# hourly, e.g. from cron or a scheduled job of the host.
+SYNC_TOMBSTONE_DAYS = 30
+
+# `manage.py archive_batch <batch>` moves a retired batch's offerings and
+# enrollments to archive tables (api.archive); on PostgreSQL they and their
+# indexes live in this tablespace when set, e.g. one on cheaper disks. Set it
+# before running migrate: the archive models' db_tablespace is read from it.
+ARCHIVE_TABLESPACE = os.getenv("ARCHIVE_TABLESPACE", "")
+
+
+# /api/bootstrap sections built at once per request, each in a thread with
+# its own database connection
+BOOTSTRAP_CONCURRENCY = 3
+
+
+# Server-sent events, /api/events (api.events)
+# "local" only reaches the streams of the worker that made the change;
+# "cache" relays through the default cache, which must then be shared.
+
+EVENTS_FANOUT = os.getenv("EVENTS_FANOUT", "local")
+EVENTS_POLL_SECONDS = 0.5  # "cache" fan-out delay
+EVENTS_HEARTBEAT_SECONDS = 15  # keeps proxies from closing idle streams
+EVENTS_STREAM_SECONDS = 300  # then the client reconnects (after EVENTS_RETRY_MS)
+EVENTS_RETRY_MS = 3000
+EVENTS_QUEUE_SIZE = 256  # events buffered per stream before it must resync
+
+
+# API response compression
+
+API_COMPRESSION_PATHS = ("/api/",)
+API_COMPRESSION_MIN_SIZE = 1024  # bytes; smaller responses are sent as is
+API_BROTLI_QUALITY = 5  # on the fly; cached payloads use the maximum
+API_GZIP_LEVEL = 6
+
+
+# N+1 query detection (api.nplusone)
+# "log" or "raise" when a query shape repeats more than NPLUSONE_THRESHOLD
+# times in one request; anything else disables the middleware.
+
+NPLUSONE_DETECTION = os.getenv("NPLUSONE_DETECTION", "off")
+NPLUSONE_THRESHOLD = 5
+
+
+# OpenAPI schema, written by `manage.py build_schema` during build.sh
+
+SCHEMA_FILE = BASE_DIR / "openapi.json"
+
+
+# Metrics
+# /metrics requires `Authorization: Bearer <METRICS_TOKEN>` when the token is
+# set; without one it is a 404 unless DEBUG is on
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -145,6 +294,25 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.BasicAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    # Token-bucket sizes (refilled over the period) for api.throttles
+    "DEFAULT_THROTTLE_RATES": {
+        "enroll": "20/min",  # enroll_elective and batch enrollment, per user
+        "auth": "20/min",  # /auth/token/ and /api-token-auth/, per IP
+        "lists": "120/min",  # heavy list endpoints, per user
+    },
+    # Reverse proxies in front of the app (1 on Render), so that the per-IP
+    # throttles take the client address from X-Forwarded-For rather than
+    # trusting whatever the client put there; 0 when serving directly.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
 }
 
 
@@ -9,6 +9,8 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,  # Verifies a token's validity
 )
 from rest_framework.authtoken import views as drf_views  # type: ignore
+from api.metrics import metrics_view
+from api.throttles import AuthThrottle
 
 
 def index(request):
@@ -23,10 +25,19 @@ def index(request):
 urlpatterns = [
     path("", index),
     path("admin/", admin.site.urls),
-    path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("metrics", metrics_view, name="metrics"),
+    path(
+        "auth/token/",
+        TokenObtainPairView.as_view(throttle_classes=[AuthThrottle]),
+        name="token_obtain_pair",
+    ),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("auth/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
     path("api-auth/", include("rest_framework.urls")),
-    path("api-token-auth/", drf_views.obtain_auth_token, name="api-token-auth"),
+    path(
+        "api-token-auth/",
+        drf_views.ObtainAuthToken.as_view(throttle_classes=[AuthThrottle]),
+        name="api-token-auth",
+    ),
     path("api/", include("api.urls")),
 ]
@@ -1,6 +1,19 @@
 """Admin configuration for the API app"""
 
-from django.contrib import admin  # type: ignore
+import csv
+
+from django import forms  # type: ignore
+from django.contrib import admin, messages  # type: ignore
+from django.contrib.admin.helpers import ActionForm  # type: ignore
+from django.contrib.admin.widgets import AutocompleteSelect  # type: ignore
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin  # type: ignore
+from django.contrib.auth.models import User  # type: ignore
+from django.core.exceptions import ValidationError  # type: ignore
+from django.core.paginator import Paginator  # type: ignore
+from django.db import connections, transaction  # type: ignore
+from django.http import StreamingHttpResponse  # type: ignore
+from django.utils.functional import cached_property  # type: ignore
+from . import allocation, events, recommend, suggest
 from .models import (
     StudyCenter,
     StudyCentrePOC,
@@ -11,21 +24,155 @@ from .models import (
     Elective,
     ElectiveOffering,
     ElectiveEnrollment,
+    AllocationRound,
+    AllocationPreference,
 )
 
+# Below this many rows an exact COUNT(*) is cheap enough.
+ESTIMATED_COUNT_THRESHOLD = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate (pg_class.reltuples) instead of
+    COUNT(*) for unfiltered changelists of large PostgreSQL tables.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist without the full-table COUNT(*) queries."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class Echo:
+    """File-like object for csv.writer that hands each line back."""
+
+    def write(self, value):
+        return value
+
+
+@admin.action(description="Export selected rows as CSV")
+def export_csv(modeladmin, request, queryset):
+    """Stream `modeladmin.csv_fields` of the selected rows, one chunk at a time."""
+    fields = modeladmin.csv_fields
+    writer = csv.writer(Echo())
+    rows = queryset.order_by("pk").values_list(*fields).iterator(chunk_size=2000)
+
+    def lines():
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    filename = f"{queryset.model._meta.model_name}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+class EnrollActionForm(ActionForm):
+    # Searched through ElectiveEnrollmentAdmin's autocomplete view rather
+    # than rendering every offering into the changelist
+    offering = forms.ModelChoiceField(
+        queryset=ElectiveOffering.objects.all(),
+        required=False,
+        label="Offering",
+        widget=AutocompleteSelect(
+            ElectiveEnrollment._meta.get_field("elective_offering"), admin.site
+        ),
+    )
+
+
+@admin.action(description="Enroll selected users in the chosen offering")
+def enroll_in_offering(modeladmin, request, queryset):
+    """Enroll every selected user with one INSERT, skipping existing enrollments."""
+    try:
+        offering = EnrollActionForm.base_fields["offering"].clean(
+            request.POST.get("offering")
+        )
+    except ValidationError:
+        offering = None
+    if offering is None:
+        modeladmin.message_user(
+            request, "Choose an offering to enroll into.", messages.WARNING
+        )
+        return
+    users = set(queryset.values_list(modeladmin.enroll_user_field, flat=True))
+    with transaction.atomic():
+        enrolled = set(
+            ElectiveEnrollment.objects.filter(
+                elective_offering=offering, user_id__in=users
+            ).values_list("user_id", flat=True)
+        )
+        ElectiveEnrollment.objects.bulk_create(
+            [
+                ElectiveEnrollment(user_id=user, elective_offering=offering)
+                for user in users - enrolled
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        events.enrollments_changed([offering.pk])
+        recommend.enrollments_changed([offering.pk])
+        suggest.users_changed(users - enrolled)
+    modeladmin.message_user(
+        request,
+        f"Enrolled {len(users - enrolled)} users in {offering} "
+        f"({len(enrolled)} already enrolled).",
+        messages.SUCCESS,
+    )
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    action_form = EnrollActionForm
+    actions = (enroll_in_offering, export_csv)
+    enroll_user_field = "pk"
+    csv_fields = (
+        "username",
+        "first_name",
+        "last_name",
+        "email",
+        "batch_info__epgp_batch",
+        "batch_info__epgp_group",
+        "batch_info__roll_number",
+    )
+
 
 @admin.register(StudyCenter)
 class StudyCenterAdmin(admin.ModelAdmin):
     list_display = ("state", "city", "location")
+    search_fields = ("state", "city", "location")
 
 
 @admin.register(StudyCentrePOC)
 class StudyCenterPOCAdmin(admin.ModelAdmin):
     list_display = ("centre", "person", "number")
+    list_select_related = ("centre",)
+    autocomplete_fields = ("centre",)
 
 
 @admin.register(BatchInfo)
-class BatchInfoAdmin(admin.ModelAdmin):
+class BatchInfoAdmin(LargeTableAdmin):
     list_display = (
         "user",
         "epgp_batch",
@@ -37,18 +184,41 @@ class BatchInfoAdmin(admin.ModelAdmin):
         "user__email",
     )
     search_fields = ("user__username", "user__email")
+    list_select_related = ("user", "studyCenter")
+    autocomplete_fields = ("user", "studyCenter")
+    action_form = EnrollActionForm
+    actions = (enroll_in_offering, export_csv)
+    enroll_user_field = "user_id"
+    csv_fields = (
+        "user__username",
+        "user__first_name",
+        "user__last_name",
+        "user__email",
+        "epgp_batch",
+        "epgp_group",
+        "roll_number",
+        "homeState",
+        "homeTown",
+        "currentCity",
+        "studyCenter__city",
+        "studyCenter__location",
+    )
 
 
 @admin.register(SocialLinks)
-class SocialLinksAdmin(admin.ModelAdmin):
+class SocialLinksAdmin(LargeTableAdmin):
     list_display = ("user", "personalEmail", "phone")
     search_fields = ("user__username", "personalEmail", "phone")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
 
 
 @admin.register(Employment)
-class EmploymentAdmin(admin.ModelAdmin):
+class EmploymentAdmin(LargeTableAdmin):
     list_display = ("user", "employer", "position", "start_date", "end_date")
     search_fields = ("user__username", "employer", "position")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
 
 
 @admin.register(Professor)
@@ -60,24 +230,104 @@ class ProfessorAdmin(admin.ModelAdmin):
 @admin.register(Elective)
 class ElectiveAdmin(admin.ModelAdmin):
     list_display = ("area", "course_code", "course_name", "instructor", "credits")
-    search_fields = ("area", "course_code", "course_name", "instructor")
+    search_fields = ("area", "course_code", "course_name", "instructor__name")
+    ordering = ("course_code",)
+    list_select_related = ("instructor",)
+    autocomplete_fields = ("instructor",)
+
+    def get_queryset(self, request):
+        # Also used by the autocomplete views, whose labels include the instructor
+        return super().get_queryset(request).select_related("instructor")
 
 
 @admin.register(ElectiveOffering)
-class ElectiveOfferingAdmin(admin.ModelAdmin):
-    list_display = ("epgp_batch", "term", "course", "track", "section")
+class ElectiveOfferingAdmin(LargeTableAdmin):
+    list_display = ("epgp_batch", "term", "course", "track", "section", "capacity")
     search_fields = ("course__course_code", "course__course_name")
+    ordering = ("-epgp_batch", "term", "course__course_code", "section")
+    list_select_related = ("course__instructor",)
+    autocomplete_fields = ("course",)
+
+    def get_queryset(self, request):
+        # Also used by the autocomplete views, whose labels include the course
+        return super().get_queryset(request).select_related("course__instructor")
 
 
 @admin.register(ElectiveEnrollment)
-class ElectiveEnrollmentAdmin(admin.ModelAdmin):
+class ElectiveEnrollmentAdmin(LargeTableAdmin):
     list_display = ("user", "elective_offering")
     search_fields = (
         "user__username",
         "elective_offering__course__course_code",
         "elective_offering__course__course_name",
     )
+    list_select_related = ("user", "elective_offering__course__instructor")
+    autocomplete_fields = ("user", "elective_offering")
+    actions = (export_csv,)
+    csv_fields = (
+        "user__username",
+        "user__first_name",
+        "user__last_name",
+        "elective_offering__epgp_batch",
+        "elective_offering__term",
+        "elective_offering__course__course_code",
+        "elective_offering__course__course_name",
+        "elective_offering__track",
+        "elective_offering__section",
+    )
 
 
 admin.site.site_title = "EPGP"
 admin.site.site_header = "EPGP Admin"
+
+
+@admin.action(description="Allocate seats of the selected rounds")
+def allocate_seats(modeladmin, request, queryset):
+    """Run the ballot of every selected round (see api.allocation)."""
+    for allocation_round in queryset:
+        try:
+            result = allocation.allocate(allocation_round)
+        except allocation.AllocationError as e:
+            modeladmin.message_user(request, str(e), messages.ERROR)
+            continue
+        modeladmin.message_user(
+            request,
+            f"{allocation_round}: {result['allocated']} seats for "
+            f"{result['students']} students ({result['unallocated']} got none).",
+            messages.SUCCESS,
+        )
+
+
+@admin.register(AllocationRound)
+class AllocationRoundAdmin(admin.ModelAdmin):
+    list_display = (
+        "epgp_batch",
+        "term",
+        "opens_at",
+        "closes_at",
+        "picks",
+        "allocated_at",
+    )
+    list_filter = ("epgp_batch", "term")
+    readonly_fields = ("allocated_at",)
+    actions = (allocate_seats,)
+
+
+@admin.register(AllocationPreference)
+class AllocationPreferenceAdmin(LargeTableAdmin):
+    list_display = ("allocation_round", "user", "rank", "elective_offering")
+    list_filter = ("allocation_round",)
+    search_fields = ("user__username",)
+    list_select_related = (
+        "allocation_round",
+        "user",
+        "elective_offering__course__instructor",
+    )
+    autocomplete_fields = ("user", "elective_offering")
+    actions = (export_csv,)
+    csv_fields = (
+        "allocation_round_id",
+        "user__username",
+        "rank",
+        "elective_offering_id",
+    )
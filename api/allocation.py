@@ -0,0 +1,201 @@
+"""Ballot allocation of oversubscribed electives.
+
+Instead of first come first served, the students of a batch rank the
+offerings of a term while an AllocationRound is open; enroll_electives
+refuses that term until the round is allocated. After it closes,
+allocate() hands out the seats in one run, as a draft (round-robin serial
+dictatorship): a seeded lottery orders the students, and in each of the
+round's `picks` passes every student in turn gets their best ranked
+offering that still has a seat and doesn't clash with what they already
+have (same rules as enroll_electives: one section per course, one elective
+per term and track). Every other pass runs in reverse lottery order, so
+the last student of one pass picks first in the next.
+
+Seats and clashes only ever shrink the choice, so an offering a student
+skips stays out of reach and each preference list is scanned once: a run
+is linear in the number of preferences.
+"""
+
+import random
+
+from django.db import transaction  # type: ignore
+from django.db.models import Count  # type: ignore
+from django.utils import timezone  # type: ignore
+from . import events, recommend, suggest
+from .models import (
+    AllocationRound,
+    AllocationPreference,
+    ElectiveOffering,
+    ElectiveEnrollment,
+)
+
+
+class AllocationError(Exception):
+    """The round cannot be allocated (still open, or already allocated)."""
+
+
+def draft(
+    order: list[int],
+    preferences: dict[int, list[int]],
+    seats: dict[int, int | None],
+    offerings: dict[int, tuple[int, int | None]],
+    taken: dict[int, tuple[set, set]],
+    picks: int,
+) -> dict[int, list[int]]:
+    """
+    Allocate offerings to the students of `order`, in that (lottery) order.
+
+    preferences: student -> offering ids, best first
+    seats: offering -> seats left, None for no limit
+    offerings: offering -> (course id, track)
+    taken: student -> (courses in the batch, tracks in the term) they have
+    Returns student -> offerings allocated, in the order they were.
+    """
+    allocated = {student: [] for student in order}
+    position = dict.fromkeys(order, 0)
+    for turn in range(picks):
+        for student in order if turn % 2 == 0 else reversed(order):
+            ranked, i = preferences[student], position[student]
+            courses, tracks = taken.setdefault(student, (set(), set()))
+            while i < len(ranked):
+                pk = ranked[i]
+                i += 1
+                course, track = offerings[pk]
+                if (
+                    seats[pk] == 0
+                    or course in courses
+                    or (track is not None and track in tracks)
+                ):
+                    continue
+                if seats[pk] is not None:
+                    seats[pk] -= 1
+                courses.add(course)
+                if track is not None:
+                    tracks.add(track)
+                allocated[student].append(pk)
+                break
+            position[student] = i
+    return allocated
+
+
+def ballot(allocation_round: AllocationRound) -> tuple:
+    """
+    The draft() arguments of a round, in three queries: lottery order,
+    preferences, seats left, offerings and what the students already have.
+    """
+    batch, term = allocation_round.epgp_batch, allocation_round.term
+    offerings, seats = {}, {}
+    for pk, course, track, capacity, enrolled in (
+        ElectiveOffering.objects.filter(epgp_batch=batch, term=term)
+        .annotate(enrolled=Count("electiveenrollment"))
+        .values_list("id", "course_id", "track", "capacity", "enrolled")
+    ):
+        offerings[pk] = (course, track)
+        seats[pk] = None if capacity is None else max(0, capacity - enrolled)
+
+    preferences = {}
+    for student, pk in (
+        AllocationPreference.objects.filter(
+            allocation_round=allocation_round,
+            elective_offering__epgp_batch=batch,
+            elective_offering__term=term,
+        )
+        .order_by("user_id", "rank")
+        .values_list("user_id", "elective_offering_id")
+    ):
+        preferences.setdefault(student, []).append(pk)
+
+    # Courses anywhere in the batch and tracks of this term already taken
+    taken = {}
+    for student, course, offering_term, track in ElectiveEnrollment.objects.filter(
+        user_id__in=AllocationPreference.objects.filter(
+            allocation_round=allocation_round
+        ).values("user_id"),
+        elective_offering__epgp_batch=batch,
+    ).values_list(
+        "user_id",
+        "elective_offering__course_id",
+        "elective_offering__term",
+        "elective_offering__track",
+    ):
+        courses, tracks = taken.setdefault(student, (set(), set()))
+        courses.add(course)
+        if offering_term == term and track is not None:
+            tracks.add(track)
+
+    order = sorted(preferences)
+    random.Random(allocation_round.seed).shuffle(order)
+    return order, preferences, seats, offerings, taken
+
+
+def allocate(allocation_round: AllocationRound) -> dict:
+    """
+    Allocate the seats of a closed round and enroll the students in bulk.
+    Returns counts of students, seats allocated and students left without
+    any seat.
+    """
+    with transaction.atomic():
+        allocation_round = AllocationRound.objects.select_for_update().get(
+            pk=allocation_round.pk
+        )
+        now = timezone.now()
+        if allocation_round.allocated_at is not None:
+            raise AllocationError(f"{allocation_round} is already allocated")
+        if now < allocation_round.closes_at:
+            raise AllocationError(f"{allocation_round} is open until closing time")
+
+        if allocation_round.seed is None:
+            allocation_round.seed = random.SystemRandom().randrange(2**63)
+        order, *inputs = ballot(allocation_round)
+        allocated = draft(order, *inputs, allocation_round.picks)
+
+        enrolled = [pk for offering_ids in allocated.values() for pk in offering_ids]
+        ElectiveEnrollment.objects.bulk_create(
+            [
+                ElectiveEnrollment(user_id=student, elective_offering_id=pk)
+                for student, offering_ids in allocated.items()
+                for pk in offering_ids
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        events.enrollments_changed(enrolled)  # bulk_create sends no signals
+        recommend.enrollments_changed(enrolled)
+        suggest.users_changed(student for student in allocated if allocated[student])
+
+        allocation_round.allocated_at = now
+        allocation_round.save(update_fields=["seed", "allocated_at"])
+    return {
+        "students": len(order),
+        "allocated": len(enrolled),
+        "unallocated": sum(
+            1 for offering_ids in allocated.values() if not offering_ids
+        ),
+    }
+
+
+def ballots(batch, term):
+    """Unallocated rounds of (batch, term); `batch` and `term` may be OuterRefs."""
+    return AllocationRound.objects.filter(
+        epgp_batch=batch, term=term, allocated_at__isnull=True
+    )
+
+
+def full_offerings(offering_ids) -> set[int]:
+    """
+    The offerings of `offering_ids` without a seat left. Capped ones are
+    locked until the transaction ends, so concurrent enrollments can't
+    overfill them.
+    """
+    capacities = dict(
+        ElectiveOffering.objects.select_for_update()
+        .filter(id__in=offering_ids, capacity__isnull=False)
+        .values_list("id", "capacity")
+    )
+    counts = dict(
+        ElectiveEnrollment.objects.filter(elective_offering_id__in=list(capacities))
+        .values("elective_offering_id")
+        .annotate(count=Count("id"))
+        .values_list("elective_offering_id", "count")
+    )
+    return {pk for pk, capacity in capacities.items() if counts.get(pk, 0) >= capacity}
@@ -3,3 +3,6 @@ from django.apps import AppConfig  # type: ignore
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,129 @@
+"""Archive tables for the offerings and enrollments of retired batches.
+
+Every batch the programme admits adds its offerings and enrollments, yet
+the API reads one batch at a time and only current batches change.
+archive_batch() moves a retired batch's rows, ids included, to
+ArchivedElectiveOffering and ArchivedElectiveEnrollment, so the live
+tables and their indexes only hold the batches in use; restore_batch()
+moves them back. With ARCHIVE_TABLESPACE set, the archive tables and their
+indexes live in that (cheaper) PostgreSQL tablespace (see the models and
+migration 0021).
+
+Archived batches stay readable: the batch catalog, a user's enrollments,
+offering details, takers, "also taken" recommendations and full /api/sync
+snapshots fall back to the archive (api.views, api.sync). They no longer
+change, so delta syncs skip them, and their offerings can't be enrolled in.
+"""
+
+from django.db import connections, router, transaction  # type: ignore
+from django.db.models import Q  # type: ignore
+from . import cache, suggest
+from .models import (
+    ElectiveOffering,
+    ElectiveEnrollment,
+    ElectiveRecommendation,
+    RecommendedTerm,
+    AllocationRound,
+    AllocationPreference,
+    ArchivedElectiveOffering,
+    ArchivedElectiveEnrollment,
+)
+
+CHUNK_SIZE = 2000
+
+
+class ArchiveError(Exception):
+    """The batch cannot be moved (nothing to move, or a ballot is pending)."""
+
+
+def is_archived(batch) -> bool:
+    return ArchivedElectiveOffering.objects.filter(epgp_batch=batch).exists()
+
+
+def copy_rows(rows, model):
+    """Insert `rows` into `model`, column for column (same attnames)."""
+    fields = [field.attname for field in model._meta.concrete_fields]
+    model.objects.bulk_create(
+        (model(**row) for row in rows.values(*fields).iterator(CHUNK_SIZE)),
+        batch_size=CHUNK_SIZE,
+    )
+
+
+def delete_live_rows(batch):
+    """
+    Delete the offerings of `batch` and their enrollments with two plain
+    DELETEs: the rows move rather than disappear, so they are not collected
+    first and send no per-row delete signals (tombstones, events).
+    """
+    connection = connections[router.db_for_write(ElectiveOffering)]
+    quote = connection.ops.quote_name
+    offerings = quote(ElectiveOffering._meta.db_table)
+    enrollments = quote(ElectiveEnrollment._meta.db_table)
+    offering = quote(ElectiveEnrollment._meta.get_field("elective_offering").column)
+    in_batch = f"{quote('epgp_batch')} = %s"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {enrollments} WHERE {offering} IN "
+            f"(SELECT {quote('id')} FROM {offerings} WHERE {in_batch})",
+            [batch],
+        )
+        cursor.execute(f"DELETE FROM {offerings} WHERE {in_batch}", [batch])
+
+
+def archive_batch(batch) -> dict:
+    """Move the offerings and enrollments of `batch` to the archive tables."""
+    with transaction.atomic():
+        offerings = ElectiveOffering.objects.filter(epgp_batch=batch)
+        enrollments = ElectiveEnrollment.objects.filter(
+            elective_offering__epgp_batch=batch
+        )
+        # Enrolling takes a key share lock on the offering, so this keeps
+        # new enrollments out until the batch has moved
+        if not list(offerings.select_for_update().values_list("id", flat=True)):
+            raise ArchiveError(f"Batch {batch} has no offerings to archive")
+        if AllocationRound.objects.filter(
+            epgp_batch=batch, allocated_at__isnull=True
+        ).exists():
+            raise ArchiveError(f"Batch {batch} has a ballot still to allocate")
+
+        copy_rows(offerings, ArchivedElectiveOffering)
+        copy_rows(enrollments, ArchivedElectiveEnrollment)
+        users = set(enrollments.values_list("user_id", flat=True))
+        moved = {"offerings": offerings.count(), "enrollments": enrollments.count()}
+
+        ElectiveRecommendation.objects.filter(
+            Q(elective_offering__epgp_batch=batch) | Q(recommended__epgp_batch=batch)
+        ).delete()
+        RecommendedTerm.objects.filter(epgp_batch=batch).delete()
+        AllocationPreference.objects.filter(
+            elective_offering__epgp_batch=batch
+        ).delete()
+        # The caches are refreshed once below instead of per row
+        delete_live_rows(batch)
+
+        cache.invalidate(cache.CATALOG)
+        suggest.users_changed(users)
+    return moved
+
+
+def restore_batch(batch) -> dict:
+    """Move an archived batch back to the live tables."""
+    with transaction.atomic():
+        offerings = ArchivedElectiveOffering.objects.filter(epgp_batch=batch)
+        enrollments = ArchivedElectiveEnrollment.objects.filter(
+            elective_offering__epgp_batch=batch
+        )
+        if not offerings.exists():
+            raise ArchiveError(f"Batch {batch} is not archived")
+
+        # updated_at (auto_now) becomes now, so delta syncs send them again
+        copy_rows(offerings, ElectiveOffering)
+        copy_rows(enrollments, ElectiveEnrollment)
+        users = set(enrollments.values_list("user_id", flat=True))
+        moved = {"offerings": offerings.count(), "enrollments": enrollments.count()}
+        enrollments.delete()
+        offerings.delete()
+
+        cache.invalidate(cache.CATALOG)
+        suggest.users_changed(users)
+    return moved
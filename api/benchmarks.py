@@ -0,0 +1,270 @@
+"""Synthetic data and timing helpers shared by the benchmark commands."""
+
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np  # type: ignore
+from django.conf import settings  # type: ignore
+from django.contrib.auth.hashers import make_password  # type: ignore
+from django.contrib.auth.models import User  # type: ignore
+from django.db import transaction  # type: ignore
+from django.urls import reverse  # type: ignore
+from django.utils import timezone  # type: ignore
+from rest_framework.test import APIClient  # type: ignore
+from .models import (
+    StudyCenter,
+    StudyCentrePOC,
+    BatchInfo,
+    SocialLinks,
+    Employment,
+    Professor,
+    Elective,
+    ElectiveOffering,
+    ElectiveEnrollment,
+    AllocationRound,
+    AllocationPreference,
+)
+
+BENCH_PREFIX = "bench-"
+
+
+class Rollback(Exception):
+    """Raised to throw away the synthetic rows at the end of a benchmark."""
+
+
+@contextmanager
+def synthetic_data(rows: int, batch: int = 99):
+    """
+    Create `rows` users, centres, electives and enrollments inside a
+    transaction that is always rolled back.
+
+    Point it at a development database; nothing is left behind, but the rows
+    are visible to the benchmark while it runs.
+    """
+    try:
+        with transaction.atomic():
+            yield seed_rows(rows, batch)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed_rows(rows: int, batch: int = 99, password: str | None = None) -> dict:
+    """
+    Bulk insert `rows` of every API model. Returns the created objects.
+
+    Every row is tagged with BENCH_PREFIX so `delete_synthetic()` can find
+    it again. Users get `password` if given (hashed once, shared by all).
+    """
+    hashed = make_password(password)
+    users = User.objects.bulk_create(
+        User(
+            username=f"{BENCH_PREFIX}{i}",
+            password=hashed,
+            email=f"{BENCH_PREFIX}{i}@example.com",
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+        )
+        for i in range(rows)
+    )
+    centres = StudyCenter.objects.bulk_create(
+        StudyCenter(
+            state="KL",
+            city=f"City {i}",
+            location=f"{BENCH_PREFIX}location-{i}",
+            address=f"{i} Bench Road",
+            pin=670000 + i % 1000,
+        )
+        for i in range(rows)
+    )
+    StudyCentrePOC.objects.bulk_create(
+        StudyCentrePOC(centre=centre, person=f"Person {i}", number=f"98{i:08d}")
+        for i, centre in enumerate(centres)
+    )
+    BatchInfo.objects.bulk_create(
+        BatchInfo(
+            user=user,
+            epgp_batch=batch,
+            epgp_group="ABCDEF"[i % 6],
+            roll_number=str(i),
+            homeState="KL",
+            homeTown=f"Town {i}",
+            currentCity=f"City {i % 50}",
+            studyCenter=centres[i],
+        )
+        for i, user in enumerate(users)
+    )
+    SocialLinks.objects.bulk_create(
+        SocialLinks(
+            user=user,
+            personalEmail=f"personal{i}@example.com",
+            phone=f"98{i:08d}",
+            linkedin=f"https://linkedin.com/in/{BENCH_PREFIX}{i}",
+            bio="Bench bio",
+        )
+        for i, user in enumerate(users)
+    )
+    Employment.objects.bulk_create(
+        Employment(user=user, employer=f"Employer {i % 100}", position="Manager")
+        for i, user in enumerate(users)
+    )
+    professors = Professor.objects.bulk_create(
+        Professor(salutation="Prof.", name=f"{BENCH_PREFIX}professor-{i}", area="IS")
+        for i in range(rows)
+    )
+    electives = Elective.objects.bulk_create(
+        Elective(
+            area="IS",
+            course_code=f"{BENCH_PREFIX}{i}",
+            course_name=f"Bench elective {i}",
+            instructor=professors[i],
+            credits=3.0,
+        )
+        for i in range(rows)
+    )
+    offerings = ElectiveOffering.objects.bulk_create(
+        ElectiveOffering(
+            epgp_batch=batch, term=1 + i % 6, course=elective, track=1, section="A"
+        )
+        for i, elective in enumerate(electives)
+    )
+    ElectiveEnrollment.objects.bulk_create(
+        ElectiveEnrollment(user=user, elective_offering=offerings[i])
+        for i, user in enumerate(users)
+    )
+    return {
+        "users": users,
+        "centres": centres,
+        "electives": electives,
+        "offerings": offerings,
+        "batch": batch,
+    }
+
+
+@contextmanager
+def synthetic_ballot(
+    students: int, offerings: int, ranked: int, picks: int, batch: int = 99
+):
+    """
+    A closed AllocationRound of `students` who each rank `ranked` of
+    `offerings` (spread over four tracks), inside a transaction that is
+    always rolled back. Popular offerings are ranked higher and more often,
+    and each seats only its fair share, so the top ones are oversubscribed.
+    """
+    try:
+        with transaction.atomic():
+            yield seed_ballot(students, offerings, ranked, picks, batch)
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def seed_ballot(
+    students: int, offerings: int, ranked: int, picks: int, batch: int = 99
+) -> AllocationRound:
+    users = User.objects.bulk_create(
+        User(username=f"{BENCH_PREFIX}{i}", password=make_password(None))
+        for i in range(students)
+    )
+    BatchInfo.objects.bulk_create(
+        BatchInfo(user=user, epgp_batch=batch) for user in users
+    )
+    electives = Elective.objects.bulk_create(
+        Elective(course_code=f"{BENCH_PREFIX}{i}", course_name=f"Bench elective {i}")
+        for i in range(offerings)
+    )
+    capacity = -(-students * picks // offerings)
+    sections = ElectiveOffering.objects.bulk_create(
+        ElectiveOffering(
+            epgp_batch=batch,
+            term=1,
+            course=elective,
+            track=1 + i % 4,
+            section="A",
+            capacity=capacity,
+        )
+        for i, elective in enumerate(electives)
+    )
+    now = timezone.now()
+    allocation_round = AllocationRound.objects.create(
+        epgp_batch=batch,
+        term=1,
+        opens_at=now - timedelta(days=2),
+        closes_at=now - timedelta(days=1),
+        picks=picks,
+        seed=0,
+    )
+    # Weighted sampling without replacement: the `ranked` largest keys u ** (1 / w)
+    rng = np.random.default_rng(0)
+    popularity = 1.0 / np.arange(1, offerings + 1)
+    keys = rng.random((students, offerings)) ** (1.0 / popularity)
+    choices = np.argsort(-keys, axis=1)[:, :ranked]
+    AllocationPreference.objects.bulk_create(
+        (
+            AllocationPreference(
+                allocation_round=allocation_round,
+                user=user,
+                elective_offering=sections[choice],
+                rank=rank,
+            )
+            for user, row in zip(users, choices.tolist())
+            for rank, choice in enumerate(row, 1)
+        ),
+        batch_size=5000,
+    )
+    return allocation_round
+
+
+def delete_synthetic() -> None:
+    """Remove rows left behind by `seed_rows()` outside a rolled back transaction."""
+    with transaction.atomic():
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        Elective.objects.filter(course_code__startswith=BENCH_PREFIX).delete()
+        Professor.objects.filter(name__startswith=BENCH_PREFIX).delete()
+        StudyCenter.objects.filter(location__startswith=BENCH_PREFIX).delete()
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall clock time of `repeat` calls to `func`, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def read_endpoints(data: dict) -> list[tuple[str, str]]:
+    """`(url name, path)` of the GET endpoints, pointed at synthetic rows."""
+    user = data["users"][0]
+    offering = data["offerings"][0]
+    centre = data["centres"][0]
+    return [
+        ("user-info", reverse("user-info")),
+        ("user-info-id", reverse("user-info-id", args=[user.pk])),
+        ("batch-info", reverse("batch-info")),
+        ("social-links", reverse("social-links")),
+        ("elective-list", reverse("elective-list")),
+        ("all_elective-list", reverse("all_elective-list")),
+        ("elective-detail", reverse("elective-detail", args=[offering.pk])),
+        ("elective-takers", reverse("elective-takers", args=[offering.pk])),
+        ("elective-enrolled", reverse("elective-enrolled")),
+        ("elective-enroll", reverse("elective-enroll", args=[offering.pk])),
+        ("centres", reverse("centres")),
+        ("centre-poc", reverse("centre-poc", args=[centre.pk])),
+    ]
+
+
+def server_name() -> str:
+    """A host name that passes ALLOWED_HOSTS."""
+    host = next(iter(settings.ALLOWED_HOSTS), "").lstrip(".")
+    return host if host not in ("", "*") else "localhost"
+
+
+def api_client(user=None) -> APIClient:
+    """In-process client that passes ALLOWED_HOSTS, optionally authenticated."""
+    client = APIClient(SERVER_NAME=server_name())
+    if user is not None:
+        client.force_authenticate(user)
+    return client
@@ -0,0 +1,103 @@
+"""Response caching for the API app."""
+
+import orjson  # type: ignore
+from django.conf import settings  # type: ignore
+from django.core.cache import cache, caches  # type: ignore
+from django.http import HttpResponse  # type: ignore
+from rest_framework.response import Response  # type: ignore
+from . import metrics
+from .compression import precompress
+from .routers import use_primary
+from .renderers import ORJSONRenderer
+
+CATALOG = "catalog"
+CENTRES = "centres"
+
+# Per-user profile payloads, see cached_profile()
+PROFILE_DETAIL = "detail"
+PROFILE_BATCH = "batch"
+PROFILE_SOCIAL = "social"
+PROFILES = (PROFILE_DETAIL, PROFILE_BATCH, PROFILE_SOCIAL)
+
+
+def namespace_version(namespace: str) -> int:
+    """Current generation of a cache namespace."""
+    return cache.get_or_set(f"{namespace}:version", 1, None)
+
+
+def invalidate(namespace: str) -> None:
+    """Drop every payload in `namespace` by moving to the next generation."""
+    try:
+        cache.incr(f"{namespace}:version")
+    except ValueError:
+        cache.set(f"{namespace}:version", 2, None)
+
+
+def cached_payload(namespace: str, key: str, build, precompute: bool = True) -> dict:
+    """
+    Rendered JSON for `key`, with its brotli and gzip variants unless
+    `precompute` is false (CompressionMiddleware then compresses each
+    response on the fly, at the cheaper level).
+
+    `build` returns the data to render and is only called on a miss.
+    """
+    cache_key = f"{namespace}:{namespace_version(namespace)}:{key}"
+    variants = cache.get(cache_key)
+    metrics.observe_cache(namespace, hit=variants is not None)
+    if variants is None:
+        # Shared entries outlive the request: never cache replica lag
+        with use_primary():
+            data = build()
+        content = ORJSONRenderer().render(data)
+        variants = precompress(content) if precompute else {"identity": content}
+        cache.set(cache_key, variants, settings.API_PAYLOAD_CACHE_TIMEOUT)
+    return variants
+
+
+class CachedJSONResponse(HttpResponse):
+    """JSON response that carries its pre-compressed variants."""
+
+    def __init__(self, variants: dict, **kwargs):
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(variants["identity"], **kwargs)
+        self.variants = variants
+
+
+def cached_response(request, namespace: str, key: str, build, precompute: bool = True):
+    """
+    Serve a cached payload. Non-JSON renderers (the browsable API) get a
+    regular DRF Response built from the same cached bytes.
+    """
+    variants = cached_payload(namespace, key, build, precompute)
+    if request.accepted_renderer.format != "json":
+        return Response(orjson.loads(variants["identity"]))
+    return CachedJSONResponse(variants)
+
+
+def profile_key(kind: str, user_id) -> str:
+    return f"profile:{kind}:{user_id}"
+
+
+def cached_profile(kind: str, user_id, build) -> dict:
+    """
+    Read-through cache of one user's serialized profile payload.
+
+    `build` is only called on a miss; exceptions it raises (DoesNotExist)
+    propagate and nothing is cached.
+    """
+    profiles = caches["profiles"]
+    key = profile_key(kind, user_id)
+    data = profiles.get(key)
+    metrics.observe_cache(f"profile:{kind}", hit=data is not None)
+    if data is None:
+        with use_primary():
+            data = dict(build())
+        profiles.set(key, data)
+    return data
+
+
+def invalidate_profile(user_id, *kinds: str) -> None:
+    """Forget the cached `kinds` (all by default) of a user's profile."""
+    caches["profiles"].delete_many(
+        [profile_key(kind, user_id) for kind in kinds or PROFILES]
+    )
@@ -0,0 +1,59 @@
+"""System checks for settings that only work with a single worker process."""
+
+from django.conf import settings  # type: ignore
+from django.core.checks import Tags, Warning, register  # type: ignore
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    """Token buckets in local memory are per worker: each allows the full rate."""
+    if settings.DEBUG or settings.CACHES["throttles"]["BACKEND"] != LOCMEM:
+        return []
+    return [
+        Warning(
+            "The 'throttles' cache is in local memory, so every worker process "
+            "keeps its own token buckets and the rate limits multiply with them.",
+            hint="Set THROTTLE_CACHE_BACKEND and THROTTLE_CACHE_LOCATION to a "
+            "shared cache, e.g. redis.",
+            id="api.W001",
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_profile_cache(app_configs, **kwargs):
+    """Profile invalidations only reach the worker that made the change."""
+    if settings.DEBUG or settings.CACHES["profiles"]["BACKEND"] != LOCMEM:
+        return []
+    return [
+        Warning(
+            "The 'profiles' cache is in local memory, so the other worker "
+            "processes serve a changed profile until their copy expires.",
+            hint="Set PROFILE_CACHE_BACKEND and PROFILE_CACHE_LOCATION to a "
+            "shared cache, e.g. redis.",
+            id="api.W002",
+        )
+    ]
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Replica pins left by a write must be seen by every worker."""
+    if (
+        settings.DEBUG
+        or not settings.DATABASE_REPLICA
+        or settings.CACHES["default"]["BACKEND"] != LOCMEM
+    ):
+        return []
+    return [
+        Warning(
+            "The default cache is in local memory, so a user's next request "
+            "may reach a worker that does not know they just wrote and read "
+            "their change from the lagging replica.",
+            hint="Set CACHE_BACKEND and CACHE_LOCATION to a shared cache, e.g. "
+            "redis.",
+            id="api.W003",
+        )
+    ]
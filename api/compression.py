@@ -0,0 +1,63 @@
+"""Brotli/gzip helpers for API responses."""
+
+import gzip
+
+import brotli  # type: ignore
+from django.conf import settings  # type: ignore
+
+# Preferred first when the client rates them equally.
+ENCODINGS = ("br", "gzip")
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick `br` or `gzip` from an Accept-Encoding header, honouring q-values.
+    `*` only stands for the codings the header does not name.
+    """
+    qualities, wildcard = {}, None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        if coding == "*":
+            wildcard = q
+        elif coding in ENCODINGS:
+            qualities[coding] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:  # preferred first, so ties keep it
+        q = qualities.get(encoding, wildcard) or 0.0
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(content: bytes, encoding: str, precompute: bool = False) -> bytes:
+    """
+    Compress `content` with `encoding`.
+
+    `precompute` trades CPU for size and is meant for payloads that are
+    compressed once and served many times from the cache.
+    """
+    if encoding == "br":
+        quality = 11 if precompute else settings.API_BROTLI_QUALITY
+        return brotli.compress(content, quality=quality, mode=brotli.MODE_TEXT)
+    if encoding == "gzip":
+        level = 9 if precompute else settings.API_GZIP_LEVEL
+        return gzip.compress(content, compresslevel=level, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+def precompress(content: bytes) -> dict:
+    """All representations of `content`, keyed by encoding (`identity` = raw)."""
+    variants = {"identity": content}
+    if len(content) >= settings.API_COMPRESSION_MIN_SIZE:
+        for encoding in ENCODINGS:
+            variants[encoding] = compress(content, encoding, precompute=True)
+    return variants
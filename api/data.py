@@ -152,3 +152,148 @@ electives_details_q5 = [
         "Faculty": "Prof. Sidhartha S Padhi",
     },
 ]
+
+
+# Approximate (lat, lng) per PIN code prefix: the main town of the postal
+# region for 2-digit prefixes, with 3-digit entries where a region spans
+# far-apart places. Good to ~100-200 km, enough to rank study centres.
+pincode_prefix_coordinates = {
+    "11": (28.61, 77.21),  # Delhi
+    "12": (28.90, 76.61),  # Haryana (Rohtak)
+    "121": (28.41, 77.32),  # Faridabad
+    "122": (28.46, 77.03),  # Gurugram
+    "13": (30.38, 76.78),  # Haryana (Ambala)
+    "14": (30.90, 75.85),  # Punjab (Ludhiana)
+    "143": (31.63, 74.87),  # Amritsar
+    "15": (30.21, 74.95),  # Punjab (Bathinda)
+    "16": (30.73, 76.78),  # Chandigarh
+    "17": (31.10, 77.17),  # Himachal Pradesh (Shimla)
+    "18": (32.73, 74.86),  # Jammu
+    "19": (34.08, 74.80),  # Kashmir (Srinagar)
+    "194": (34.15, 77.58),  # Ladakh (Leh)
+    "20": (27.88, 78.08),  # Western UP (Aligarh)
+    "201": (28.67, 77.45),  # Ghaziabad / Noida
+    "208": (26.45, 80.33),  # Kanpur
+    "21": (25.44, 81.85),  # Prayagraj
+    "22": (26.85, 80.95),  # Lucknow
+    "23": (25.32, 82.97),  # Varanasi
+    "24": (28.84, 78.77),  # Moradabad
+    "243": (28.37, 79.43),  # Bareilly
+    "246": (30.15, 78.78),  # Garhwal
+    "247": (29.96, 77.55),  # Saharanpur
+    "248": (30.32, 78.03),  # Dehradun
+    "249": (29.95, 78.16),  # Haridwar
+    "25": (28.98, 77.71),  # Meerut
+    "26": (29.22, 79.51),  # Kumaon (Haldwani)
+    "27": (26.76, 83.37),  # Gorakhpur
+    "28": (27.18, 78.01),  # Agra
+    "284": (25.45, 78.57),  # Jhansi
+    "30": (26.91, 75.79),  # Jaipur
+    "31": (24.58, 73.71),  # Udaipur
+    "32": (25.18, 75.83),  # Kota
+    "33": (28.02, 73.31),  # Bikaner
+    "34": (26.24, 73.02),  # Jodhpur
+    "36": (22.30, 70.80),  # Saurashtra (Rajkot)
+    "37": (23.24, 69.67),  # Kutch (Bhuj)
+    "38": (23.02, 72.57),  # Ahmedabad
+    "39": (22.31, 73.18),  # Vadodara
+    "394": (21.17, 72.83),  # Surat
+    "395": (21.17, 72.83),  # Surat
+    "396": (20.61, 72.93),  # Valsad
+    "40": (19.08, 72.88),  # Mumbai
+    "403": (15.49, 73.83),  # Goa
+    "41": (18.52, 73.86),  # Pune
+    "413": (17.66, 75.91),  # Solapur
+    "415": (17.69, 74.00),  # Satara
+    "416": (16.70, 74.24),  # Kolhapur
+    "42": (20.00, 73.79),  # Nashik
+    "425": (21.00, 75.56),  # Jalgaon
+    "43": (19.88, 75.34),  # Aurangabad
+    "431": (19.88, 75.34),  # Aurangabad
+    "44": (21.15, 79.09),  # Nagpur
+    "444": (20.93, 77.75),  # Amravati
+    "45": (22.72, 75.86),  # Indore
+    "456": (23.18, 75.78),  # Ujjain
+    "46": (23.26, 77.41),  # Bhopal
+    "47": (26.22, 78.18),  # Gwalior
+    "48": (23.18, 79.99),  # Jabalpur
+    "49": (21.25, 81.63),  # Raipur
+    "495": (22.08, 82.15),  # Bilaspur
+    "50": (17.39, 78.49),  # Hyderabad
+    "506": (17.97, 79.59),  # Warangal
+    "51": (15.83, 78.04),  # Rayalaseema (Kurnool)
+    "515": (14.68, 77.60),  # Anantapur
+    "517": (13.63, 79.42),  # Tirupati
+    "52": (16.51, 80.65),  # Vijayawada
+    "522": (16.31, 80.44),  # Guntur
+    "524": (14.44, 79.99),  # Nellore
+    "53": (17.69, 83.22),  # Visakhapatnam
+    "533": (16.99, 81.78),  # Rajahmundry
+    "56": (12.97, 77.59),  # Bengaluru
+    "57": (12.30, 76.64),  # Mysuru
+    "574": (12.91, 74.86),  # Mangaluru
+    "575": (12.91, 74.86),  # Mangaluru
+    "577": (13.93, 75.57),  # Shivamogga
+    "58": (15.36, 75.12),  # Hubballi-Dharwad
+    "585": (17.33, 76.83),  # Kalaburagi
+    "59": (15.85, 74.50),  # Belagavi
+    "60": (13.08, 80.27),  # Chennai
+    "605": (11.94, 79.81),  # Puducherry
+    "61": (10.79, 78.70),  # Tiruchirappalli
+    "613": (10.79, 79.14),  # Thanjavur
+    "62": (9.93, 78.12),  # Madurai
+    "627": (8.71, 77.76),  # Tirunelveli
+    "628": (8.76, 78.13),  # Thoothukudi
+    "629": (8.18, 77.41),  # Nagercoil
+    "63": (11.66, 78.15),  # Salem
+    "632": (12.92, 79.13),  # Vellore
+    "64": (11.02, 76.96),  # Coimbatore
+    "643": (11.41, 76.70),  # Ooty
+    "67": (11.26, 75.78),  # Kozhikode
+    "670": (11.87, 75.37),  # Kannur
+    "678": (10.79, 76.65),  # Palakkad
+    "68": (9.93, 76.27),  # Kochi
+    "680": (10.53, 76.21),  # Thrissur
+    "686": (9.59, 76.52),  # Kottayam
+    "69": (8.52, 76.94),  # Thiruvananthapuram
+    "691": (8.89, 76.61),  # Kollam
+    "70": (22.57, 88.36),  # Kolkata
+    "71": (22.59, 88.31),  # Howrah / Hooghly
+    "713": (23.23, 87.86),  # Bardhaman
+    "72": (22.42, 87.32),  # Medinipur
+    "73": (26.73, 88.40),  # Siliguri
+    "737": (27.33, 88.61),  # Sikkim (Gangtok)
+    "74": (23.40, 88.50),  # Nadia
+    "744": (11.62, 92.73),  # Andaman (Port Blair)
+    "75": (20.30, 85.82),  # Bhubaneswar
+    "753": (20.46, 85.88),  # Cuttack
+    "76": (19.31, 84.79),  # Berhampur
+    "764": (18.81, 82.71),  # Koraput
+    "77": (21.47, 83.97),  # Sambalpur
+    "769": (22.26, 84.85),  # Rourkela
+    "78": (26.14, 91.74),  # Guwahati
+    "786": (27.47, 94.91),  # Dibrugarh
+    "788": (24.83, 92.78),  # Silchar
+    "79": (25.58, 91.89),  # Shillong
+    "790": (27.08, 93.61),  # Arunachal Pradesh (Itanagar)
+    "791": (27.08, 93.61),  # Arunachal Pradesh (Itanagar)
+    "795": (24.82, 93.94),  # Manipur (Imphal)
+    "796": (23.73, 92.72),  # Mizoram (Aizawl)
+    "797": (25.67, 94.11),  # Nagaland (Kohima)
+    "798": (25.67, 94.11),  # Nagaland (Kohima)
+    "799": (23.83, 91.28),  # Tripura (Agartala)
+    "80": (25.59, 85.14),  # Patna
+    "81": (25.25, 86.98),  # Bhagalpur
+    "814": (24.48, 86.70),  # Deoghar
+    "815": (24.19, 86.30),  # Giridih
+    "82": (24.79, 85.00),  # Gaya
+    "825": (23.99, 85.36),  # Hazaribagh
+    "826": (23.80, 86.43),  # Dhanbad
+    "827": (23.67, 86.15),  # Bokaro
+    "83": (23.34, 85.31),  # Ranchi
+    "831": (22.80, 86.20),  # Jamshedpur
+    "84": (26.12, 85.39),  # Muzaffarpur
+    "846": (26.15, 85.90),  # Darbhanga
+    "85": (25.88, 86.60),  # Kosi (Saharsa)
+    "854": (25.78, 87.47),  # Purnia
+}
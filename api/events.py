@@ -0,0 +1,275 @@
+"""Server-sent events for enrollment counts and catalog changes.
+
+Model signals (api.signals) publish an event once their transaction commits
+and the broker hands it to every open /api/events stream of this worker
+subscribed to one of the event's channels: `offering:<id>`, `batch:<batch>`
+or `catalog`.
+
+Signals only fire in the worker that made the change; EVENTS_FANOUT decides
+how an event reaches the streams held by the other workers:
+
+    "local"  deliver in this process only (one worker, or development)
+    "cache"  append to a log in the default cache that every worker polls
+             every EVENTS_POLL_SECONDS. Needs a shared cache backend (file
+             based, redis...); a stand-in for a real pub/sub channel.
+"""
+
+import asyncio
+import threading
+import time
+
+import orjson  # type: ignore
+from asgiref.sync import sync_to_async  # type: ignore
+from django.conf import settings  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Count, Q  # type: ignore
+from .models import Professor, Elective, ElectiveOffering
+
+ENROLLMENT = "enrollment"
+CATALOG = "catalog"
+RESYNC = "resync"  # the stream fell behind and dropped events
+
+MAX_CHANNELS = 100  # per stream
+
+LOG_TTL = 60  # seconds an event stays in the cache log
+
+
+def offering_channel(pk) -> str:
+    return f"offering:{pk}"
+
+
+def batch_channel(batch) -> str:
+    return f"batch:{batch}"
+
+
+def format_event(event: dict) -> bytes:
+    """One event in the text/event-stream format."""
+    data = orjson.dumps(event["data"])
+    return b"event: %s\ndata: %s\n\n" % (event["event"].encode(), data)
+
+
+class Subscription:
+    """The event queue of one stream. Fed from any thread, read on `loop`."""
+
+    def __init__(self, channels, loop):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client this far behind refetches instead of catching up
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> dict | None:
+        """The next event, a resync marker, or None after `timeout` seconds."""
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"event": RESYNC, "data": {}}
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class Broker:
+    """Open streams of this worker by channel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, channels) -> Subscription:
+        subscription = Subscription(channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        fanout.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def __bool__(self):
+        return bool(self._channels)
+
+    def deliver(self, event: dict):
+        """Queue `event` on every subscribed stream; safe from any thread."""
+        with self._lock:
+            subscriptions = set().union(
+                *(self._channels.get(channel, ()) for channel in event["channels"])
+            )
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:  # the stream's loop has closed
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+class LocalFanout:
+    """Deliver to the streams of this worker only."""
+
+    def start(self):
+        pass
+
+    def publish(self, event: dict):
+        broker.deliver(event)
+
+
+class CacheFanout:
+    """
+    Relay events between workers through a numbered log in the default
+    cache. Publishing appends; a daemon thread per worker, started with the
+    first stream, delivers whatever was appended since it last looked.
+    """
+
+    SEQUENCE = "events:seq"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._relay, name="events-relay", daemon=True
+                )
+                self._thread.start()
+
+    def publish(self, event: dict):
+        cache.add(self.SEQUENCE, 0, None)
+        seq = cache.incr(self.SEQUENCE)
+        cache.set(f"events:{seq}", event, LOG_TTL)
+
+    def _relay(self):
+        last = cache.get_or_set(self.SEQUENCE, 0, None)
+        while True:
+            time.sleep(settings.EVENTS_POLL_SECONDS)
+            head = cache.get(self.SEQUENCE, 0)
+            if broker and head > last:
+                keys = [f"events:{seq}" for seq in range(last + 1, head + 1)]
+                found = cache.get_many(keys)
+                for key in keys:
+                    if key in found:
+                        broker.deliver(found[key])
+            last = head  # also when the log was cleared and restarted lower
+
+
+fanout = CacheFanout() if settings.EVENTS_FANOUT == "cache" else LocalFanout()
+
+
+def listening() -> bool:
+    """
+    Whether an event can reach any stream. Local fan-out only reaches this
+    worker's, so with none open (always, under sync workers) events are
+    dropped before they cost anything.
+    """
+    return not isinstance(fanout, LocalFanout) or bool(broker)
+
+
+def publish(event: str, data: dict, *channels: str):
+    """Send an event to `channels` once the current transaction commits."""
+    if not listening():
+        return
+    transaction.on_commit(
+        lambda: fanout.publish({"event": event, "data": data, "channels": channels})
+    )
+
+
+def enrollment_counts(offering_ids=(), batches=()) -> list[dict]:
+    """Enrollment count events of `offering_ids` and every offering of `batches`."""
+    rows = (
+        ElectiveOffering.objects.filter(
+            Q(id__in=offering_ids) | Q(epgp_batch__in=batches)
+        )
+        .annotate(enrolled=Count("electiveenrollment"))
+        .values("id", "epgp_batch", "enrolled")
+        .order_by("id")
+    )
+    return [
+        {
+            "event": ENROLLMENT,
+            "data": {
+                "offering": row["id"],
+                "batch": row["epgp_batch"],
+                "enrolled": row["enrolled"],
+            },
+            "channels": (
+                offering_channel(row["id"]),
+                batch_channel(row["epgp_batch"]),
+            ),
+        }
+        for row in rows
+    ]
+
+
+def enrollments_changed(offering_ids):
+    """Publish new enrollment counts of `offering_ids` after the commit."""
+    offering_ids = set(offering_ids)
+
+    def send():
+        for event in enrollment_counts(offering_ids):
+            fanout.publish(event)
+
+    if offering_ids and listening():
+        transaction.on_commit(send)
+
+
+CATALOG_RESOURCES = {
+    Professor: "professor",
+    Elective: "elective",
+    ElectiveOffering: "offering",
+}
+
+
+def catalog_changed(instance, action: str):
+    """Publish that a catalog row was saved or deleted."""
+    channels = [CATALOG]
+    if isinstance(instance, ElectiveOffering):
+        channels += [offering_channel(instance.pk), batch_channel(instance.epgp_batch)]
+    data = {
+        "resource": CATALOG_RESOURCES[type(instance)],
+        "id": instance.pk,
+        "action": action,
+    }
+    publish(CATALOG, data, *channels)
+
+
+async def stream(channels, snapshot):
+    """
+    The text/event-stream body of one client. Opens with `snapshot()`
+    (events as of now, e.g. current counts) so a reconnecting client is
+    up to date, sends a comment as heartbeat when idle and ends after
+    EVENTS_STREAM_SECONDS; EventSource reconnects on its own.
+    """
+    subscription = broker.subscribe(channels)
+    try:
+        yield b"retry: %d\n\n" % settings.EVENTS_RETRY_MS
+        # Subscribed first so nothing committed after the snapshot is missed
+        for event in await sync_to_async(snapshot)():
+            yield format_event(event)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENTS_STREAM_SECONDS
+        while (remaining := deadline - loop.time()) > 0:
+            event = await subscription.get(
+                min(settings.EVENTS_HEARTBEAT_SECONDS, remaining)
+            )
+            yield b": ping\n\n" if event is None else format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,146 @@
+"""Nearest study centre lookup with an in-memory k-d tree.
+
+Centre coordinates come from their Google Maps `geo` URL when it carries
+them, else from the bundled PIN prefix table in api.data. Points are stored
+as unit vectors, so straight-line (chord) distance orders centres exactly
+like great-circle distance and there is no wrap-around at the poles or the
+antimeridian. The tree is rebuilt in each worker when the CENTRES cache
+namespace changes (api.signals bumps it on every StudyCenter save).
+"""
+
+import heapq
+import math
+import re
+
+from . import cache
+from .data import pincode_prefix_coordinates
+from .routers import use_primary
+
+EARTH_RADIUS_KM = 6371.0
+
+# @lat,lng / q=lat,lng / ll=lat,lng / !3dlat!4dlng in Google Maps URLs
+GEO_PATTERNS = (
+    re.compile(r"!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)"),
+    re.compile(r"@(-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)"),
+    re.compile(
+        r"[?&](?:q|query|ll|destination)=(-?\d+(?:\.\d+)?)(?:,|%2C)\s*(-?\d+(?:\.\d+)?)"
+    ),
+)
+
+
+def coordinates_from_geo(url: str | None) -> tuple[float, float] | None:
+    """(lat, lng) embedded in a map URL, if any (short links carry none)."""
+    for pattern in GEO_PATTERNS:
+        match = pattern.search(url or "")
+        if match:
+            lat, lng = float(match[1]), float(match[2])
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                return lat, lng
+    return None
+
+
+def coordinates_from_pin(pin) -> tuple[float, float] | None:
+    """Approximate (lat, lng) of a 6 digit PIN code from its prefix."""
+    pin = str(pin or "").strip()
+    if not re.fullmatch(r"[1-8]\d{5}", pin):
+        return None
+    return pincode_prefix_coordinates.get(
+        pin[:3], pincode_prefix_coordinates.get(pin[:2])
+    )
+
+
+def unit_vector(lat: float, lng: float) -> tuple[float, float, float]:
+    lat, lng = math.radians(lat), math.radians(lng)
+    return (
+        math.cos(lat) * math.cos(lng),
+        math.cos(lat) * math.sin(lng),
+        math.sin(lat),
+    )
+
+
+def chord_to_km(chord: float) -> float:
+    """Great-circle distance for a chord between two unit vectors."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class KDTree:
+    """Static 3-d tree over (point, item) pairs, stored as nested tuples."""
+
+    def __init__(self, entries: list[tuple[tuple[float, ...], object]]):
+        self.size = len(entries)
+        self.root = self._build(entries, 0)
+
+    def _build(self, entries, depth):
+        if not entries:
+            return None
+        axis = depth % 3
+        entries = sorted(entries, key=lambda entry: entry[0][axis])
+        mid = len(entries) // 2
+        return (
+            entries[mid],
+            axis,
+            self._build(entries[:mid], depth + 1),
+            self._build(entries[mid + 1 :], depth + 1),
+        )
+
+    def nearest(self, point, k: int) -> list[tuple[float, object]]:
+        """The `k` closest items as (distance, item), closest first."""
+        best: list[tuple[float, int, object]] = []  # max-heap via negation
+        stack = [(self.root, 0.0)]  # (subtree, distance to its splitting plane)
+        while stack:
+            node, reach = stack.pop()
+            if node is None or (len(best) == k and reach >= -best[0][0]):
+                continue
+            (node_point, item), axis, left, right = node
+            distance = math.dist(point, node_point)
+            if len(best) < k:
+                heapq.heappush(best, (-distance, id(item), item))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, id(item), item))
+            diff = point[axis] - node_point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, abs(diff)))
+            stack.append((near, 0.0))
+        return [(-negated, item) for negated, _, item in sorted(best, reverse=True)]
+
+
+def locate(centre: dict) -> tuple[tuple[float, float] | None, str | None]:
+    """Coordinates of a serialized centre and where they came from."""
+    coordinates = coordinates_from_geo(centre.get("geo"))
+    if coordinates:
+        return coordinates, "geo"
+    coordinates = coordinates_from_pin(centre.get("pin"))
+    if coordinates:
+        return coordinates, "pin"
+    return None, None
+
+
+_index: tuple[int, KDTree] | None = None
+
+
+def centre_index() -> KDTree:
+    """The k-d tree of located centres for the current CENTRES version."""
+    global _index
+    from .views import centres_data
+
+    version = cache.namespace_version(cache.CENTRES)
+    if _index is None or _index[0] != version:
+        entries = []
+        with use_primary():
+            centres = centres_data()
+        for centre in centres:
+            coordinates, source = locate(centre)
+            if coordinates:
+                entries.append(
+                    (unit_vector(*coordinates), {**centre, "located_by": source})
+                )
+        _index = (version, KDTree(entries))
+    return _index[1]
+
+
+def nearest_centres(lat: float, lng: float, k: int) -> list[dict]:
+    """The `k` closest centres to (lat, lng) with their distance in km."""
+    return [
+        {"distance_km": round(chord_to_km(chord), 1), **centre}
+        for chord, centre in centre_index().nearest(unit_vector(lat, lng), k)
+    ]
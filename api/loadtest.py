@@ -0,0 +1,317 @@
+"""In-process load harness for the WSGI and ASGI applications.
+
+A mix is a list of weighted request templates::
+
+    {"name": "elective-enroll", "method": "POST",
+     "path": "/api/electives/enroll/{offering}", "data": {}, "weight": 10}
+
+`{user}`, `{offering}` and `{centre}` in paths are filled per request from
+the synthetic rows. Each virtual user logs in through /auth/token/ and then
+draws requests from the mix with its access token until the run ends.
+"""
+
+import asyncio
+import io
+import math
+import random
+import sys
+import threading
+import time
+
+import orjson  # type: ignore
+from django.db import connections  # type: ignore
+from .benchmarks import server_name
+
+LOGIN = {"name": "token_obtain_pair", "method": "POST", "path": "/auth/token/"}
+
+DEFAULT_MIX = [
+    dict(LOGIN, weight=2),
+    {"name": "elective-list", "method": "GET", "path": "/api/electives/", "weight": 20},
+    {
+        "name": "all_elective-list",
+        "method": "GET",
+        "path": "/api/electives/all",
+        "weight": 10,
+    },
+    {
+        "name": "elective-detail",
+        "method": "GET",
+        "path": "/api/electives/{offering}",
+        "weight": 10,
+    },
+    {
+        "name": "elective-takers",
+        "method": "GET",
+        "path": "/api/electives/{offering}/takers",
+        "weight": 10,
+    },
+    {"name": "centres", "method": "GET", "path": "/api/centres", "weight": 5},
+    {"name": "user-info", "method": "GET", "path": "/api/users/", "weight": 10},
+    {
+        "name": "elective-enroll",
+        "method": "POST",
+        "path": "/api/electives/enroll/{offering}",
+        "weight": 15,
+    },
+    {
+        "name": "elective-enrolled",
+        "method": "GET",
+        "path": "/api/electives/enrolled/",
+        "weight": 10,
+    },
+    {
+        "name": "batch-info",
+        "method": "POST",
+        "path": "/api/user/batch",
+        "data": {"homeTown": "Kozhikode"},
+        "weight": 3,
+    },
+    {
+        "name": "social-links",
+        "method": "POST",
+        "path": "/api/user/social",
+        "data": {"bio": "Load test"},
+        "weight": 3,
+    },
+    {
+        "name": "update-user",
+        "method": "PATCH",
+        "path": "/api/user/update/",
+        "data": {"first_name": "Load"},
+        "weight": 2,
+    },
+]
+
+
+def load_mix(path: str) -> list[dict]:
+    """Read a recorded mix, one JSON request template per line."""
+    with open(path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+
+class Stats:
+    """Latencies and statuses per route name."""
+
+    def __init__(self):
+        self.samples: dict[str, list[tuple[float, int]]] = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, status: int) -> None:
+        with self.lock:
+            self.samples.setdefault(name, []).append((seconds, status))
+
+    def report(self, elapsed: float) -> list[dict]:
+        rows = []
+        for name, samples in sorted(self.samples.items()):
+            latencies = sorted(seconds for seconds, _ in samples)
+            rows.append(
+                {
+                    "route": name,
+                    "requests": len(samples),
+                    "rps": len(samples) / elapsed,
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99),
+                    "4xx": sum(1 for _, status in samples if 400 <= status < 500),
+                    "errors": sum(1 for _, status in samples if status >= 500),
+                }
+            )
+        return rows
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    index = max(math.ceil(pct * len(ordered) / 100) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class VirtualUser:
+    """Credentials and request drawing for one simulated student."""
+
+    def __init__(self, username, password, data, mix, seed):
+        self.username = username
+        self.password = password
+        self.data = data
+        self.mix = mix
+        self.weights = [item.get("weight", 1) for item in mix]
+        self.random = random.Random(seed)
+        self.token = None
+
+    def next_request(self) -> tuple[dict, str, bytes, dict]:
+        if self.token is None:
+            item = LOGIN
+        else:
+            item = self.random.choices(self.mix, self.weights)[0]
+        path = item["path"].format(
+            user=self.random.choice(self.data["users"]).pk,
+            offering=self.random.choice(self.data["offerings"]).pk,
+            centre=self.random.choice(self.data["centres"]).pk,
+        )
+        if item["path"] == LOGIN["path"]:
+            body = {"username": self.username, "password": self.password}
+            headers = {}
+        else:
+            body = item.get("data")
+            headers = {"authorization": f"Bearer {self.token}"}
+        content = orjson.dumps(body) if body is not None else b""
+        return item, path, content, headers
+
+    def handle_response(self, item, status, content) -> None:
+        if item["path"] == LOGIN["path"] and status == 200:
+            self.token = orjson.loads(content)["access"]
+        elif status == 401:
+            self.token = None
+
+
+################################################################################
+## WSGI
+################################################################################
+
+
+def wsgi_request(app, method, path, body, headers) -> tuple[int, bytes]:
+    """Call a WSGI application directly and return (status, body)."""
+    host = server_name()
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_HOST": host,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for key, value in headers.items():
+        environ["HTTP_" + key.upper().replace("-", "_")] = value
+
+    status = []
+
+    def start_response(status_line, response_headers, exc_info=None):
+        status.append(int(status_line.split(" ", 1)[0]))
+
+    result = app(environ, start_response)
+    try:
+        content = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return status[0], content
+
+
+def run_wsgi(app, users: list[VirtualUser], duration: float) -> Stats:
+    """One thread per virtual user, like a threaded WSGI server."""
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+
+    def worker(user):
+        try:
+            while time.perf_counter() < deadline:
+                item, path, body, headers = user.next_request()
+                start = time.perf_counter()
+                try:
+                    status, content = wsgi_request(
+                        app, item["method"], path, body, headers
+                    )
+                except Exception:
+                    status, content = 599, b""
+                stats.add(item["name"], time.perf_counter() - start, status)
+                user.handle_response(item, status, content)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+################################################################################
+## ASGI
+################################################################################
+
+
+async def asgi_request(app, method, path, body, headers) -> tuple[int, bytes]:
+    """Call an ASGI application directly and return (status, body)."""
+    host = server_name()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", host.encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        + [(key.encode(), value.encode()) for key, value in headers.items()],
+        "client": ("127.0.0.1", 0),
+        "server": (host, 80),
+    }
+    finished = asyncio.Event()
+    sent_body = False
+    status = 0
+    chunks = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                finished.set()
+
+    await app(scope, receive, send)
+    finished.set()
+    return status, b"".join(chunks)
+
+
+def run_asgi(app, users: list[VirtualUser], duration: float) -> Stats:
+    """One task per virtual user on a single event loop, like uvicorn."""
+    stats = Stats()
+
+    async def worker(user, deadline):
+        while time.perf_counter() < deadline:
+            item, path, body, headers = user.next_request()
+            start = time.perf_counter()
+            try:
+                status, content = await asgi_request(
+                    app, item["method"], path, body, headers
+                )
+            except Exception:
+                status, content = 599, b""
+            stats.add(item["name"], time.perf_counter() - start, status)
+            user.handle_response(item, status, content)
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(worker(user, deadline) for user in users))
+
+    asyncio.run(main())
+    return stats
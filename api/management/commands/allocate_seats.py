@@ -0,0 +1,28 @@
+"""Run the ballot of an allocation round."""
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from api import allocation
+from api.models import AllocationRound
+
+
+class Command(BaseCommand):
+    help = (
+        "Allocate the seats of a closed allocation round from the students' "
+        "ranked preferences and enroll them (see api.allocation)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("round", type=int, help="AllocationRound id")
+
+    def handle(self, *args, **options):
+        try:
+            allocation_round = AllocationRound.objects.get(pk=options["round"])
+            result = allocation.allocate(allocation_round)
+        except AllocationRound.DoesNotExist:
+            raise CommandError(f"AllocationRound {options['round']} does not exist")
+        except allocation.AllocationError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"{allocation_round}: {result['allocated']} seats for "
+            f"{result['students']} students ({result['unallocated']} got none)"
+        )
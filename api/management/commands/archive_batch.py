@@ -0,0 +1,29 @@
+"""Move a retired batch's offerings and enrollments to the archive tables."""
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from api import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the offerings and enrollments of a retired batch out of the live "
+        "tables into the archive tables (see api.archive), or back with --restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("batch", type=int, help="EPGP batch number")
+        parser.add_argument(
+            "--restore", action="store_true", help="Move the batch back to live"
+        )
+
+    def handle(self, *args, **options):
+        move = archive.restore_batch if options["restore"] else archive.archive_batch
+        try:
+            moved = move(options["batch"])
+        except archive.ArchiveError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"{'Restored' if options['restore'] else 'Archived'} batch "
+            f"{options['batch']}: {moved['offerings']} offerings, "
+            f"{moved['enrollments']} enrollments"
+        )
@@ -0,0 +1,60 @@
+"""Time a ballot allocation of oversubscribed electives end to end."""
+
+import time
+
+from django.core.management.base import BaseCommand  # type: ignore
+from api import allocation
+from api.benchmarks import synthetic_ballot, best_of
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark api.allocation on a synthetic round: loading the ballot, "
+        "the draft alone and allocate() with its bulk enrollment. Synthetic "
+        "rows are created in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=5000)
+        parser.add_argument("--offerings", type=int, default=60)
+        parser.add_argument("--ranked", type=int, default=10)
+        parser.add_argument("--picks", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        students, offerings = options["students"], options["offerings"]
+        ranked, picks = options["ranked"], options["picks"]
+        start = time.perf_counter()
+        with synthetic_ballot(students, offerings, ranked, picks) as allocation_round:
+            self.stdout.write(
+                f"{students:,} students x {offerings} offerings, {ranked} ranked, "
+                f"{picks} picks (setup {time.perf_counter() - start:.1f}s)"
+            )
+            order, preferences, seats, sections, taken = allocation.ballot(
+                allocation_round
+            )
+
+            def draft():
+                # draft() uses up the seats and fills in `taken`
+                return allocation.draft(
+                    order, preferences, dict(seats), sections, {}, picks
+                )
+
+            load = best_of(
+                lambda: allocation.ballot(allocation_round), options["repeat"]
+            )
+            drafting = best_of(draft, options["repeat"])
+            start = time.perf_counter()
+            result = allocation.allocate(allocation_round)
+            total = time.perf_counter() - start
+
+            allocated = draft()
+            first = sum(1 for s in order if allocated[s][:1] == preferences[s][:1])
+            self.stdout.write(f"{'load ballot':<24}{load * 1000:>10.1f} ms")
+            self.stdout.write(f"{'draft':<24}{drafting * 1000:>10.1f} ms")
+            self.stdout.write(f"{'allocate (with writes)':<24}{total * 1000:>10.1f} ms")
+            self.stdout.write(
+                f"{result['allocated']:,} seats allocated, "
+                f"{result['unallocated']:,} students without a seat, "
+                f"{first / len(order):.0%} got their first choice"
+            )
@@ -0,0 +1,104 @@
+"""Import-time profile and time-to-first-response of a fresh worker."""
+
+import os
+import subprocess
+import sys
+
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+
+# Runs in a fresh interpreter, like a newly started worker.
+FIRST_RESPONSE = """
+import asyncio, sys, time
+start = time.perf_counter()
+if sys.argv[1] == "wsgi":
+    from EPGP.wsgi import application
+else:
+    from EPGP.asgi import application
+from api.warmup import warm_up
+warm_up()  # as gunicorn's post_worker_init does
+ready = time.perf_counter()
+from api.loadtest import asgi_request, wsgi_request
+request = ("GET", sys.argv[2], b"", {})
+sent = time.perf_counter()
+if sys.argv[1] == "wsgi":
+    status, _ = wsgi_request(application, *request)
+else:
+    status, _ = asyncio.run(asgi_request(application, *request))
+done = time.perf_counter()
+print(ready - start, done - sent, status)
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile the import of EPGP.wsgi / EPGP.asgi (python -X importtime) and "
+        "measure time-to-first-response of a fresh process with and without "
+        "the warm-up phase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--app", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--path", default="/api/electives/all")
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--top", type=int, default=15)
+
+    def handle(self, *args, **options):
+        module = f"EPGP.{options['app']}"
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+
+        self.stdout.write(f"Slowest imports under {module} (cumulative, ms):")
+        for cumulative, name in self.import_profile(module, env)[: options["top"]]:
+            self.stdout.write(f"{cumulative / 1000:>10.1f}  {name}")
+
+        self.stdout.write(f"\nTime to first response for GET {options['path']} (ms):")
+        self.stdout.write(
+            f"{'warm-up':<10}{'import':>10}{'first req':>12}{'total':>10}"
+        )
+        for warm in ("0", "1"):
+            runs = [
+                self.first_response(
+                    options["app"], options["path"], dict(env, WARM_UP=warm)
+                )
+                for _ in range(options["runs"])
+            ]
+            best = min(runs, key=lambda run: run["import"] + run["first"])
+            self.stdout.write(
+                f"{'on' if warm == '1' else 'off':<10}{best['import'] * 1000:>10.1f}"
+                f"{best['first'] * 1000:>12.1f}"
+                f"{(best['import'] + best['first']) * 1000:>10.1f}"
+                f"  (HTTP {best['status']})"
+            )
+
+    def import_profile(self, module, env) -> list[tuple[int, str]]:
+        """Top level packages by cumulative import time, in microseconds."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=dict(env, WARM_UP="0"),
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        packages: dict[str, int] = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = (part.strip() for part in line[12:].split("|"))
+            if not cumulative.isdigit():
+                continue
+            top = name.strip().split(".")[0]
+            packages[top] = max(packages.get(top, 0), int(cumulative))
+        return sorted(((us, name) for name, us in packages.items()), reverse=True)
+
+    def first_response(self, app, path, env) -> dict:
+        result = subprocess.run(
+            [sys.executable, "-c", FIRST_RESPONSE, app, path],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        ready, first, status = result.stdout.split()[-3:]
+        return {"import": float(ready), "first": float(first), "status": status}
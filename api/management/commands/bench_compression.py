@@ -0,0 +1,46 @@
+"""Response size and latency per endpoint, uncompressed vs gzip vs brotli."""
+
+from django.core.management.base import BaseCommand  # type: ignore
+from api.benchmarks import synthetic_data, best_of, read_endpoints, api_client
+
+ENCODINGS = ("identity", "gzip", "br")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare response size and latency of the GET endpoints for each "
+        "Accept-Encoding. Synthetic rows are created in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+
+        with synthetic_data(options["rows"]) as data:
+            client = api_client(data["users"][0])
+            header = f"{'endpoint':<20}"
+            for encoding in ENCODINGS:
+                header += f"{encoding + ' bytes':>15}{'ms':>8}"
+            self.stdout.write(header)
+
+            for name, path in read_endpoints(data):
+                line = f"{name:<20}"
+                for encoding in ENCODINGS:
+                    response = client.get(path, HTTP_ACCEPT_ENCODING=encoding)
+                    served = response.get("Content-Encoding", "identity")
+                    size = f"{len(response.content):,}"
+                    if served != encoding:
+                        size += "*"
+                    seconds = best_of(
+                        lambda: client.get(path, HTTP_ACCEPT_ENCODING=encoding),
+                        repeat,
+                    )
+                    line += f"{size:>15}{seconds * 1000:>8.2f}"
+                self.stdout.write(line)
+
+            self.stdout.write(
+                "* sent uncompressed (below API_COMPRESSION_MIN_SIZE or not JSON)"
+            )
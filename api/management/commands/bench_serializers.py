@@ -0,0 +1,100 @@
+"""Rows/sec of every serializer, regular path vs values() + orjson."""
+
+from django.contrib.auth.models import User, Group  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+from rest_framework import serializers as drf_serializers  # type: ignore
+from rest_framework.renderers import JSONRenderer  # type: ignore
+from rest_framework.test import APIRequestFactory  # type: ignore
+from api import serializers
+from api.benchmarks import synthetic_data, best_of
+from api.renderers import ORJSONRenderer
+from api.models import (
+    StudyCenter,
+    StudyCentrePOC,
+    BatchInfo,
+    SocialLinks,
+    Employment,
+    Professor,
+    Elective,
+    ElectiveOffering,
+    ElectiveEnrollment,
+)
+
+CASES = [
+    (serializers.POCSerializer, StudyCentrePOC),
+    (serializers.SCSerilazer, StudyCenter),
+    (serializers.BatchInfoSerializer, BatchInfo),
+    (serializers.SocialLinksSerializer, SocialLinks),
+    (serializers.EmploymentSerializer, Employment),
+    (serializers.UserSerializer, User),
+    (serializers.GroupSerializer, Group),
+    (serializers.DetailUserSerializer, User),
+    (serializers.UserBatchSerializer, User),
+    (serializers.InstructorSerializer, Professor),
+    (serializers.ElectiveSerializer, Elective),
+    (serializers.ElectiveDetailSerializer, ElectiveOffering),
+    (serializers.ElectiveOfferingSerializer, ElectiveOffering),
+    (serializers.ElectiveOfferingSmallSerializer, ElectiveOffering),
+    (serializers.ElectiveEnrollmentSerializer, ElectiveEnrollment),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rows/sec for each serializer in api/serializers.py, "
+        "before (ModelSerializer + JSONRenderer) and after (values() + orjson). "
+        "Synthetic rows are created in a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        context = {"request": APIRequestFactory().get("/api/")}
+
+        with synthetic_data(rows):
+            self.stdout.write(
+                f"{'serializer':<34}{'rows':>7}{'before r/s':>13}"
+                f"{'after r/s':>13}{'speedup':>9}  path"
+            )
+            for serializer_class, model in CASES:
+                queryset = model.objects.all()
+                count = queryset.count()
+
+                def before():
+                    serializer = drf_serializers.ListSerializer(
+                        queryset.all(), child=serializer_class(), context=context
+                    )
+                    JSONRenderer().render(serializer.data)
+
+                def after():
+                    serializer = serializer_class(
+                        queryset.all(), many=True, context=context
+                    )
+                    ORJSONRenderer().render(serializer.data)
+
+                name = serializer_class.__name__
+                try:
+                    slow = best_of(before, repeat)
+                    fast = best_of(after, repeat)
+                except Exception as e:
+                    self.stdout.write(f"{name:<34}{count:>7}  skipped: {e}")
+                    continue
+
+                fast_path = self.uses_values(serializer_class, model)
+                self.stdout.write(
+                    f"{name:<34}{count:>7}{count / slow:>13,.0f}"
+                    f"{count / fast:>13,.0f}{slow / fast:>8.1f}x  "
+                    f"{'values()' if fast_path else 'instances'}"
+                )
+
+    def uses_values(self, serializer_class, model):
+        """Whether the list serializer takes the values() fast path."""
+        meta = getattr(serializer_class, "Meta", None)
+        if getattr(meta, "list_serializer_class", None) is not (
+            serializers.ValuesListSerializer
+        ):
+            return False
+        return serializers.values_plan(serializer_class(), model) is not None
@@ -0,0 +1,25 @@
+"""Rebuild the co-enrollment recommendations of the changed terms."""
+
+from django.core.management.base import BaseCommand  # type: ignore
+from api import recommend
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the 'also taken' recommendations of the terms whose "
+        "enrollments changed since the last run. Run it every few minutes; "
+        "--all recomputes every term, e.g. after changing RECOMMEND_TOP_K."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every batch and term, changed or not.",
+        )
+
+    def handle(self, *args, **options):
+        for batch, term, rewritten in recommend.rebuild_changed(options["all"]):
+            self.stdout.write(
+                f"Batch {batch} term {term}: {rewritten} offerings rewritten"
+            )
@@ -0,0 +1,23 @@
+"""Generate the OpenAPI schema for the current code version."""
+
+from pathlib import Path
+
+from django.conf import settings  # type: ignore
+from django.core.management.base import BaseCommand  # type: ignore
+from api import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema to SCHEMA_FILE, stamped with the code version, "
+        "so workers serve it without walking the URLconf."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="defaults to settings.SCHEMA_FILE")
+
+    def handle(self, *args, **options):
+        path = Path(options["output"] or settings.SCHEMA_FILE)
+        version = schema.code_version()
+        content = schema.write(path, version)
+        self.stdout.write(f"Wrote {path} ({len(content):,} bytes, version {version})")
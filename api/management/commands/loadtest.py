@@ -0,0 +1,96 @@
+"""Replay a request mix against the WSGI or ASGI application in process."""
+
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from django.db import connection  # type: ignore
+from api import loadtest
+from api.benchmarks import seed_rows, delete_synthetic
+from api.throttles import TokenBucketThrottle
+
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+PASSWORD = "bench-load-test"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a login / catalog / enroll / profile-edit mix against EPGP.wsgi or "
+        "EPGP.asgi with N concurrent virtual users and report throughput, "
+        "p50/p95/p99 latency and error rate per route. Synthetic rows are "
+        "committed for the run and deleted afterwards, so use a local database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--app", choices=["wsgi", "asgi"], default="wsgi")
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+        parser.add_argument("--rows", type=int, default=200)
+        parser.add_argument("--mix", help="JSON lines file with a recorded mix")
+        parser.add_argument(
+            "--throttle",
+            action="store_true",
+            help="keep the API throttles on (all virtual users share one IP)",
+        )
+        parser.add_argument(
+            "--allow-remote",
+            action="store_true",
+            help="run even though the database is not on this machine",
+        )
+
+    def handle(self, *args, **options):
+        host = connection.settings_dict.get("HOST") or ""
+        if host not in LOCAL_HOSTS and not options["allow_remote"]:
+            raise CommandError(
+                f"Database host {host} is not local; pass --allow-remote to insist."
+            )
+
+        if not options["throttle"]:
+            TokenBucketThrottle.THROTTLE_RATES = dict.fromkeys(
+                TokenBucketThrottle.THROTTLE_RATES
+            )
+
+        mix = (
+            loadtest.load_mix(options["mix"])
+            if options["mix"]
+            else loadtest.DEFAULT_MIX
+        )
+        if options["app"] == "wsgi":
+            from EPGP.wsgi import application
+
+            run = loadtest.run_wsgi
+        else:
+            from EPGP.asgi import application
+
+            run = loadtest.run_asgi
+
+        delete_synthetic()
+        try:
+            data = seed_rows(options["rows"], password=PASSWORD)
+            users = [
+                loadtest.VirtualUser(user.username, PASSWORD, data, mix, seed=i)
+                for i, user in enumerate(data["users"][: options["concurrency"]])
+            ]
+            connection.close()
+            stats = run(application, users, options["duration"])
+        finally:
+            delete_synthetic()
+
+        self.stdout.write(
+            f"{options['app']}: {len(users)} users for {options['duration']:.0f}s"
+        )
+        self.stdout.write(
+            f"{'route':<20}{'reqs':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'4xx':>6}{'err %':>7}"
+        )
+        total = errors = 0
+        for row in stats.report(options["duration"]):
+            total += row["requests"]
+            errors += row["errors"]
+            self.stdout.write(
+                f"{row['route']:<20}{row['requests']:>7}{row['rps']:>9.1f}"
+                f"{row['p50'] * 1000:>9.1f}{row['p95'] * 1000:>9.1f}"
+                f"{row['p99'] * 1000:>9.1f}{row['4xx']:>6}"
+                f"{100 * row['errors'] / row['requests']:>7.2f}"
+            )
+        self.stdout.write(
+            f"{'total':<20}{total:>7}{total / options['duration']:>9.1f}"
+            f"{'':>33}{100 * errors / max(total, 1):>7.2f}"
+        )
@@ -0,0 +1,25 @@
+"""Delete sync tombstones and suggestion changes past their retention."""
+
+from django.core.management.base import BaseCommand  # type: ignore
+from django.utils import timezone  # type: ignore
+from api.models import Tombstone, SuggestionChange
+from api.suggest import LOG_RETENTION
+from api.sync import retention_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the tombstones /api/sync no longer needs: clients with older "
+        "cursors get a full snapshot anyway. Also deletes the suggestion "
+        "changes older than api.suggest.LOG_RETENTION."
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(
+            deleted_at__lt=retention_cutoff()
+        ).delete()
+        self.stdout.write(f"Deleted {deleted} tombstones")
+        deleted, _ = SuggestionChange.objects.filter(
+            changed_at__lt=timezone.now() - LOG_RETENTION
+        ).delete()
+        self.stdout.write(f"Deleted {deleted} suggestion changes")
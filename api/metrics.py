@@ -0,0 +1,125 @@
+"""Prometheus metrics for the API app.
+
+With several gunicorn/uvicorn workers, set PROMETHEUS_MULTIPROC_DIR (see
+gunicorn.conf.py) before Django starts so every worker writes its samples
+to a shared directory and /metrics aggregates all of them.
+"""
+
+import os
+
+from django.conf import settings  # type: ignore
+from django.db.backends.signals import connection_created  # type: ignore
+from django.http import Http404, HttpResponse  # type: ignore
+from prometheus_client import (  # type: ignore
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REQUESTS = Counter(
+    "epgp_http_requests_total",
+    "HTTP requests by route, method and status.",
+    ["route", "method", "status"],
+)
+LATENCY = Histogram(
+    "epgp_http_request_duration_seconds",
+    "Time to serve a request, by route.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "epgp_http_requests_in_flight",
+    "Requests currently being served, by route.",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "epgp_db_queries_total",
+    "SQL queries run while serving requests, by route.",
+    ["route"],
+)
+DB_TIME = Counter(
+    "epgp_db_query_seconds_total",
+    "Time spent in SQL while serving requests, by route.",
+    ["route"],
+)
+DB_CONNECTIONS = Counter(
+    "epgp_db_connections_opened_total",
+    "New database connections, by alias.",
+    ["alias"],
+)
+CACHE_REQUESTS = Counter(
+    "epgp_cache_requests_total",
+    "Payload cache lookups, by namespace and result (hit or miss).",
+    ["namespace", "result"],
+)
+
+
+def route_name(request) -> str:
+    """URL name of the matched route, `unmatched` for 404s."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route or "unnamed"
+
+
+def observe_request(request, response, timing, duration: float) -> None:
+    """Record one finished request."""
+    route = route_name(request)
+    REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+    LATENCY.labels(route, request.method).observe(duration)
+    if timing.queries:
+        DB_QUERIES.labels(route).inc(timing.queries)
+        DB_TIME.labels(route).inc(timing.db)
+
+
+def observe_cache(namespace: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(namespace, "hit" if hit else "miss").inc()
+
+
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+connection_created.connect(count_connection)
+
+
+## /metrics
+def metrics_view(request):
+    """
+    Prometheus text exposition of all workers' metrics. Without a
+    METRICS_TOKEN it is only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        raise Http404
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,187 @@
+"""Middleware for the API app."""
+
+import logging
+import time
+from contextlib import ExitStack
+
+import orjson  # type: ignore
+from django.conf import settings  # type: ignore
+from django.db import connections  # type: ignore
+from django.utils.cache import patch_vary_headers  # type: ignore
+from django.utils.deprecation import MiddlewareMixin  # type: ignore
+from . import metrics
+from .compression import compress, negotiate_encoding
+from .routers import routing_scope
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Brotli/gzip compress JSON responses under API_COMPRESSION_PATHS.
+
+    Responses carrying a `variants` dict (see `api.cache.cached_response`)
+    are served from their pre-compressed bytes, when it has the negotiated
+    encoding, instead of being compressed again on every request.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not request.path.startswith(settings.API_COMPRESSION_PATHS):
+            return response
+        media_type = response.get("Content-Type", "").partition(";")[0].strip()
+        if media_type != "application/json" and not media_type.endswith("+json"):
+            return response
+
+        variants = getattr(response, "variants", None)
+        if (
+            variants is None
+            and len(response.content) < settings.API_COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if variants is not None and encoding in variants:
+            content = variants[encoding]
+        elif len(response.content) >= settings.API_COMPRESSION_MIN_SIZE:
+            content = compress(response.content, encoding)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response.headers["Content-Length"] = str(len(content))
+        response.headers["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
+
+
+timing_logger = logging.getLogger("api.timing")
+
+
+class RequestTiming:
+    """Per-request counters, also used as the DB execute wrapper."""
+
+    __slots__ = ("queries", "db", "route", "view_start", "view_end", "render_end")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.route = None
+        self.view_start = self.view_end = self.render_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def rendered(self, response):
+        self.render_end = time.perf_counter()
+
+
+class ServerTimingMiddleware:
+    """
+    Measure SQL queries, DB time, view time and render time per request.
+
+    The numbers go out as a `Server-Timing` header, as one JSON log line
+    on the `api.timing` logger tagged with the URL name (at WARNING for
+    requests slower than API_SLOW_REQUEST_MS, else at INFO), and into the
+    Prometheus metrics. Keep this first in MIDDLEWARE so `total` covers the
+    whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            if timing.route is not None:
+                metrics.IN_FLIGHT.labels(timing.route).dec()
+        end = time.perf_counter()
+
+        view_start = timing.view_start or start
+        view_end = timing.view_end or end
+        render_end = timing.render_end or view_end
+        view = max(view_end - view_start - timing.db, 0.0)
+        render = render_end - view_end
+        total = end - start
+        size = 0 if response.streaming else len(response.content)
+        metrics.observe_request(request, response, timing, total)
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={timing.db * 1000:.2f};desc="{timing.queries} queries", '
+            f"view;dur={view * 1000:.2f}, "
+            f"render;dur={render * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+        match = request.resolver_match
+        slow = total * 1000 >= settings.API_SLOW_REQUEST_MS
+        timing_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            orjson.dumps(
+                {
+                    "url_name": match.url_name if match else None,
+                    "route": match.route if match else None,
+                    "method": request.method,
+                    "status": response.status_code,
+                    "queries": timing.queries,
+                    "db_ms": round(timing.db * 1000, 2),
+                    "view_ms": round(view * 1000, 2),
+                    "render_ms": round(render * 1000, 2),
+                    "total_ms": round(total * 1000, 2),
+                    "bytes": size,
+                }
+            ).decode(),
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.route = metrics.route_name(request)
+        metrics.IN_FLIGHT.labels(request.timing.route).inc()
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timing.view_end = time.perf_counter()
+        response.add_post_render_callback(request.timing.rendered)
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Route the reads of safe requests to @read_replica views to the replica
+    (see api.routers), and pin a user to the primary after they write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing_scope(request) as scope:
+            request.routing = scope
+            response = self.get_response(request)
+        scope.pin_writer()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            view_class = getattr(view_func, "cls", None)
+            request.routing.replica = getattr(
+                view_func, "read_replica", False
+            ) or getattr(view_class, "read_replica", False)
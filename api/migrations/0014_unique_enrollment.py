@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-19 14:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_enrollments(apps, schema_editor):
+    """Keep the first enrollment of each (user, offering) pair."""
+    ElectiveEnrollment = apps.get_model("api", "ElectiveEnrollment")
+    keep = (
+        ElectiveEnrollment.objects.values("user", "elective_offering")
+        .annotate(first=Min("id"))
+        .values("first")
+    )
+    ElectiveEnrollment.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_remove_batchinfo_studycentercity_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="studycenter",
+            options={"ordering": ["state", "city", "location"]},
+        ),
+        migrations.RunPython(remove_duplicate_enrollments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="electiveenrollment",
+            constraint=models.UniqueConstraint(
+                fields=("user", "elective_offering"), name="unique_enrollment"
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0016_elective_recommendation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AllocationRound",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("epgp_batch", models.IntegerField(verbose_name="EPGP Batch")),
+                ("term", models.IntegerField()),
+                ("opens_at", models.DateTimeField()),
+                ("closes_at", models.DateTimeField()),
+                (
+                    "picks",
+                    models.PositiveIntegerField(
+                        default=1,
+                        help_text="Offerings allocated to each student at most",
+                    ),
+                ),
+                ("seed", models.BigIntegerField(blank=True, null=True)),
+                ("allocated_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-epgp_batch", "term", "-opens_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="electiveoffering",
+            name="capacity",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="AllocationPreference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveIntegerField()),
+                (
+                    "elective_offering",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="api.electiveoffering",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "allocation_round",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="preferences",
+                        to="api.allocationround",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("allocation_round", "user", "elective_offering"),
+                        name="unique_preference",
+                    ),
+                    models.UniqueConstraint(
+                        fields=("allocation_round", "user", "rank"),
+                        name="unique_preference_rank",
+                    ),
+                ],
+            },
+        ),
+    ]
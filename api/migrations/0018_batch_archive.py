@@ -0,0 +1,70 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0017_allocation_round"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedElectiveEnrollment",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("updated_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedElectiveOffering",
+            fields=[
+                ("id", models.IntegerField(primary_key=True, serialize=False)),
+                ("epgp_batch", models.IntegerField(db_index=True)),
+                ("term", models.IntegerField()),
+                ("track", models.IntegerField(blank=True, null=True)),
+                (
+                    "section",
+                    models.CharField(blank=True, default="", max_length=10, null=True),
+                ),
+                ("capacity", models.PositiveIntegerField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="electiveoffering",
+            index=models.Index(
+                fields=["epgp_batch", "term"], name="offering_batch_term"
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedelectiveenrollment",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedelectiveoffering",
+            name="course",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="api.elective",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedelectiveenrollment",
+            name="elective_offering",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="api.archivedelectiveoffering",
+            ),
+        ),
+    ]
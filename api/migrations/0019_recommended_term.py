@@ -0,0 +1,37 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0018_batch_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecommendedTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("epgp_batch", models.IntegerField()),
+                ("term", models.IntegerField()),
+                ("fingerprint", models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("epgp_batch", "term"), name="unique_recommended_term"
+                    )
+                ],
+            },
+        ),
+    ]
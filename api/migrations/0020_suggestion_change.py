@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0019_recommended_term"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SuggestionChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("user_id", models.IntegerField()),
+                ("changed_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
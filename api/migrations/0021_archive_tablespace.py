@@ -0,0 +1,39 @@
+# Moves the archive tables, created before they had a db_tablespace, and
+# their indexes to ARCHIVE_TABLESPACE. Tables created from now on get it
+# from the models' Meta.
+
+from django.conf import settings
+from django.db import migrations
+
+ARCHIVE_TABLES = ("api_archivedelectiveoffering", "api_archivedelectiveenrollment")
+
+
+def move_to_tablespace(apps, schema_editor):
+    tablespace = settings.ARCHIVE_TABLESPACE
+    if not tablespace or schema_editor.connection.vendor != "postgresql":
+        return
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in ARCHIVE_TABLES:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s", [table]
+            )
+            indexes = [name for (name,) in cursor.fetchall()]
+            schema_editor.execute(
+                f"ALTER TABLE {quote(table)} SET TABLESPACE {quote(tablespace)}"
+            )
+            for index in indexes:
+                schema_editor.execute(
+                    f"ALTER INDEX {quote(index)} SET TABLESPACE {quote(tablespace)}"
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0020_suggestion_change"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_tablespace, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0021_archive_tablespace"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tombstone",
+            name="epgp_batch",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.1.2 on 2026-10-19 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0022_tombstone_epgp_batch"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="recommendedterm",
+            name="fingerprint",
+        ),
+        migrations.AddField(
+            model_name="recommendedterm",
+            name="dirty",
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 """Models for the API app"""
 
+from django.conf import settings  # type: ignore
 from django.db import models  # type: ignore
 from django.contrib.auth.models import User  # type: ignore
 
@@ -84,6 +85,7 @@ class StudyCenter(models.Model):
     address = models.TextField()
     pin = models.IntegerField(null=True, blank=True)
     geo = models.URLField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["state", "city", "location"]
@@ -126,6 +128,7 @@ class BatchInfo(models.Model):
         blank=True,
         related_name="batch_info_sc",
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
 
 class SocialLinks(models.Model):
@@ -195,6 +198,7 @@ class Professor(models.Model):
     area = models.CharField(max_length=50, choices=AREAS, null=True, blank=True)
     email = models.EmailField(null=True, blank=True)
     phone = models.CharField(max_length=15, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.salutation} {self.name}"
@@ -210,6 +214,7 @@ class Elective(models.Model):
         Professor, on_delete=models.SET_NULL, null=True, blank=True
     )
     credits = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.course_code} - {self.course_name} - {self.instructor}"
@@ -225,6 +230,15 @@ class ElectiveOffering(models.Model):
     )
     track = models.IntegerField(null=True, blank=True)
     section = models.CharField(max_length=10, null=True, blank=True, default="")
+    # Seats handed out by an allocation round; blank for no limit
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Nearly every read is scoped to one batch (and often one term)
+        indexes = [
+            models.Index(fields=["epgp_batch", "term"], name="offering_batch_term")
+        ]
 
     def __str__(self):
         return f"Batch {self.epgp_batch} - Q{self.term} - {self.course} - Track {self.track} - Section {self.section}"
@@ -235,6 +249,171 @@ class ElectiveEnrollment(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     elective_offering = models.ForeignKey(ElectiveOffering, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "elective_offering"], name="unique_enrollment"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} enrolled in {self.elective_offering}"
+
+
+class Tombstone(models.Model):
+    """A deleted row, kept so /api/sync can tell clients to drop it"""
+
+    resource = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Owner of per-user resources (enrollments); null for shared ones
+    user_id = models.IntegerField(null=True, blank=True)
+    # Batch of per-batch resources (offerings, directory); null for the others
+    epgp_batch = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["resource", "deleted_at"])]
+
+    def __str__(self):
+        return f"{self.resource} {self.object_id} deleted at {self.deleted_at}"
+
+
+class ElectiveRecommendation(models.Model):
+    """An offering often taken together with another one (see api.recommend)"""
+
+    elective_offering = models.ForeignKey(
+        ElectiveOffering, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    recommended = models.ForeignKey(
+        ElectiveOffering, on_delete=models.CASCADE, related_name="+"
+    )
+    score = models.FloatField()  # cosine similarity of the two enrollment lists
+    together = models.IntegerField()  # students enrolled in both
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["elective_offering", "recommended"],
+                name="unique_recommendation",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.elective_offering} -> {self.recommended} ({self.score:.2f})"
+
+
+class RecommendedTerm(models.Model):
+    """Whether a term's recommendations are out of date (see api.recommend)"""
+
+    epgp_batch = models.IntegerField()
+    term = models.IntegerField()
+    # Enrollments or offerings changed since the term was last computed
+    dirty = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["epgp_batch", "term"], name="unique_recommended_term"
+            )
+        ]
+
+    def __str__(self):
+        return f"Batch {self.epgp_batch} - Q{self.term} recommendations"
+
+
+class SuggestionChange(models.Model):
+    """A user whose classmate suggestion features changed (see api.suggest)"""
+
+    user_id = models.IntegerField()  # not a key: deleted users are logged too
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"User {self.user_id} changed at {self.changed_at}"
+
+
+class AllocationRound(models.Model):
+    """A ballot for the offerings of one batch and term (see api.allocation)"""
+
+    epgp_batch = models.IntegerField(verbose_name="EPGP Batch")
+    term = models.IntegerField()
+    opens_at = models.DateTimeField()
+    closes_at = models.DateTimeField()
+    picks = models.PositiveIntegerField(
+        default=1, help_text="Offerings allocated to each student at most"
+    )
+    # Lottery seed, drawn at allocation unless set beforehand
+    seed = models.BigIntegerField(null=True, blank=True)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-epgp_batch", "term", "-opens_at"]
+
+    def __str__(self):
+        return (
+            f"Batch {self.epgp_batch} - Q{self.term} ballot ({self.opens_at:%Y-%m-%d})"
+        )
+
+
+class AllocationPreference(models.Model):
+    """A student's ranked choice in an allocation round"""
+
+    allocation_round = models.ForeignKey(
+        AllocationRound, on_delete=models.CASCADE, related_name="preferences"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    elective_offering = models.ForeignKey(ElectiveOffering, on_delete=models.CASCADE)
+    rank = models.PositiveIntegerField()  # 1 is the first choice
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["allocation_round", "user", "elective_offering"],
+                name="unique_preference",
+            ),
+            models.UniqueConstraint(
+                fields=["allocation_round", "user", "rank"],
+                name="unique_preference_rank",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} #{self.rank}: {self.elective_offering}"
+
+
+class ArchivedElectiveOffering(models.Model):
+    """An ElectiveOffering of a retired batch (see api.archive)"""
+
+    id = models.IntegerField(primary_key=True)  # the live row's, kept on restore
+    epgp_batch = models.IntegerField(db_index=True)
+    term = models.IntegerField()
+    course = models.ForeignKey(Elective, on_delete=models.CASCADE, related_name="+")
+    track = models.IntegerField(null=True, blank=True)
+    section = models.CharField(max_length=10, null=True, blank=True, default="")
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        # Tables and indexes; migration 0021 moves ones created before
+        db_tablespace = settings.ARCHIVE_TABLESPACE
+
+    def __str__(self):
+        return f"Batch {self.epgp_batch} - Q{self.term} - {self.course} (archived)"
+
+
+class ArchivedElectiveEnrollment(models.Model):
+    """An ElectiveEnrollment of a retired batch (see api.archive)"""
+
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    elective_offering = models.ForeignKey(
+        ArchivedElectiveOffering, on_delete=models.CASCADE
+    )
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_tablespace = settings.ARCHIVE_TABLESPACE
 
     def __str__(self):
         return f"{self.user.username} enrolled in {self.elective_offering}"
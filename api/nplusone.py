@@ -0,0 +1,157 @@
+"""N+1 query detection for tests and development.
+
+Queries are fingerprinted by their SQL (parameters are already separate, and
+`IN (%s, %s, ...)` lists are collapsed), and counted per request or per
+`with NPlusOneGuard():` block. A shape that runs more than `threshold`
+times is reported together with the serializer field or model `__str__`
+that triggered it.
+"""
+
+import logging
+import re
+import sys
+from contextlib import ExitStack
+
+from django.conf import settings  # type: ignore
+from django.core.exceptions import MiddlewareNotUsed  # type: ignore
+from django.db import connections  # type: ignore
+from django.db.models import Model  # type: ignore
+
+logger = logging.getLogger("api.nplusone")
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+# Frames that are never the trigger: frameworks and our own execute wrappers.
+_LIBRARY_PATHS = (
+    "/django/",
+    "/rest_framework/",
+    "/asgiref/",
+    "/api/middleware.py",
+    "/api/nplusone.py",
+)
+
+
+class NPlusOneError(Exception):
+    """Raised when a query shape repeats more than the threshold allows."""
+
+
+def fingerprint(sql: str) -> str:
+    """Query shape: the parameterised SQL with IN lists collapsed."""
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def find_trigger(frame) -> str:
+    """
+    Best guess at what caused a query: the model `__str__` and/or serializer
+    field being rendered, or failing that the innermost project frame.
+    """
+    model_str = serializer_field = project_frame = None
+    while frame is not None and serializer_field is None:
+        code = frame.f_code
+        self = frame.f_locals.get("self")
+        if model_str is None and code.co_name == "__str__" and isinstance(self, Model):
+            model_str = f"{type(self).__name__}.__str__"
+        elif code.co_name == "to_representation" and "field" in frame.f_locals:
+            field = frame.f_locals["field"]
+            serializer_field = f"{type(self).__name__}.{field.field_name}"
+        elif project_frame is None and not any(
+            part in code.co_filename for part in _LIBRARY_PATHS
+        ):
+            project_frame = f"{code.co_filename}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+
+    if model_str and serializer_field:
+        return f"{model_str} via {serializer_field}"
+    return model_str or serializer_field or project_frame or "unknown"
+
+
+class QueryCounter:
+    """Execute wrapper counting queries per fingerprint."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.counts: dict[str, int] = {}
+        self.triggers: dict[str, str] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = fingerprint(sql)
+        count = self.counts[shape] = self.counts.get(shape, 0) + 1
+        if count == self.threshold + 1:
+            self.triggers[shape] = find_trigger(sys._getframe(1))
+        return execute(sql, params, many, context)
+
+    @property
+    def violations(self) -> list[tuple[str, int, str]]:
+        """`(sql, count, trigger)` for every shape over the threshold."""
+        return [
+            (shape, self.counts[shape], trigger)
+            for shape, trigger in self.triggers.items()
+        ]
+
+    def report(self) -> str:
+        return "\n".join(
+            f"{count}x {sql}\n    triggered by {trigger}"
+            for sql, count, trigger in self.violations
+        )
+
+
+class NPlusOneGuard:
+    """
+    Context manager for tests::
+
+        with NPlusOneGuard(threshold=3):
+            client.get("/api/electives/")
+
+    Raises NPlusOneError on exit when a query shape ran more than `threshold`
+    times; pass `raise_exception=False` and inspect `.violations` instead.
+    """
+
+    def __init__(self, threshold: int | None = None, raise_exception: bool = True):
+        if threshold is None:
+            threshold = settings.NPLUSONE_THRESHOLD
+        self.counter = QueryCounter(threshold)
+        self.raise_exception = raise_exception
+        self._stack = ExitStack()
+
+    @property
+    def violations(self):
+        return self.counter.violations
+
+    def __enter__(self):
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.counter))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None and self.raise_exception and self.violations:
+            raise NPlusOneError(
+                f"Repeated queries (threshold {self.counter.threshold}):\n"
+                + self.counter.report()
+            )
+        return False
+
+
+class NPlusOneMiddleware:
+    """
+    Flags repeated query shapes per request. Enabled by NPLUSONE_DETECTION:
+    `log` writes a warning on the `api.nplusone` logger, `raise` turns the
+    request into an NPlusOneError. Anything else removes the middleware.
+    """
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_DETECTION not in ("log", "raise"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        guard = NPlusOneGuard(raise_exception=False)
+        with guard:
+            response = self.get_response(request)
+        if guard.violations:
+            message = f"N+1 queries in {request.method} {request.path}:\n" + (
+                guard.counter.report()
+            )
+            if settings.NPLUSONE_DETECTION == "raise":
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
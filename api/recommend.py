@@ -0,0 +1,239 @@
+"""Co-enrollment recommendations: students who took X also took Y.
+
+Per batch and term, the enrollments form a users x offerings 0/1 sparse
+matrix A. AᵀA counts the students every pair of offerings shares, and
+dividing by sqrt(n_x * n_y) (the students of each) gives their cosine
+similarity. The RECOMMEND_TOP_K most similar offerings of every offering
+are kept in the ElectiveRecommendation table, which lookups only read.
+
+Enrollment and offering changes mark their term's RecommendedTerm dirty
+(one UPDATE, from the signals and the bulk enrollment paths).
+`manage.py build_recommendations` recomputes the dirty terms, and the ones
+never computed, with one query and a few sparse matrix operations each,
+and rewrites the rows of the offerings whose top-k changed.
+
+Archived batches (api.archive) no longer change and are rarely looked at:
+their recommendations are computed on the fly and never stored.
+"""
+
+import numpy as np  # type: ignore
+from django.conf import settings  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import Exists, OuterRef  # type: ignore
+from scipy import sparse  # type: ignore
+from .models import (
+    ArchivedElectiveOffering,
+    ArchivedElectiveEnrollment,
+    ElectiveOffering,
+    ElectiveEnrollment,
+    ElectiveRecommendation,
+    RecommendedTerm,
+)
+from .routers import use_primary
+
+
+def term_changed(batch, term):
+    """Mark (batch, term) for the next build_recommendations run."""
+    RecommendedTerm.objects.filter(epgp_batch=batch, term=term, dirty=False).update(
+        dirty=True
+    )
+
+
+def enrollments_changed(offering_ids):
+    """Mark the terms of `offering_ids` for the next build_recommendations run."""
+    offering_ids = list(offering_ids)
+    if not offering_ids:
+        return
+    RecommendedTerm.objects.filter(
+        Exists(
+            ElectiveOffering.objects.filter(
+                pk__in=offering_ids,
+                epgp_batch=OuterRef("epgp_batch"),
+                term=OuterRef("term"),
+            )
+        ),
+        dirty=False,
+    ).update(dirty=True)
+
+
+def enrollment_matrix(batch, term, archived: bool = False):
+    """
+    The offering ids of (batch, term), sorted, and the users x offerings
+    CSR matrix of their enrollments, from the archive tables if `archived`.
+    """
+    if archived:
+        offering_model, enrollment_model = (
+            ArchivedElectiveOffering,
+            ArchivedElectiveEnrollment,
+        )
+    else:
+        offering_model, enrollment_model = ElectiveOffering, ElectiveEnrollment
+    offerings = np.array(
+        offering_model.objects.filter(epgp_batch=batch, term=term)
+        .order_by("id")
+        .values_list("id", flat=True),
+        dtype=np.int64,
+    )
+    pairs = np.array(
+        enrollment_model.objects.filter(
+            elective_offering_id__in=offerings.tolist()
+        ).values_list("user_id", "elective_offering_id"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    users, rows = np.unique(pairs[:, 0], return_inverse=True)
+    columns = np.searchsorted(offerings, pairs[:, 1])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (rows, columns)),
+        shape=(len(users), len(offerings)),
+    )
+    return offerings, matrix
+
+
+def top_similar(matrix, k: int) -> list[list[tuple[int, float, int]]]:
+    """
+    For every column (offering) of `matrix`, the `k` most similar other
+    columns as (column, cosine similarity, students in both), best first.
+    """
+    together = (matrix.T @ matrix).tocsr()
+    students = together.diagonal().astype(np.float64)
+    together.setdiag(0)
+    together.eliminate_zeros()
+    together.sort_indices()
+
+    # Cosine similarity has the same sparsity as the co-enrollment counts
+    scale = np.divide(
+        1.0, np.sqrt(students), where=students > 0, out=np.zeros_like(students)
+    )
+    rows = np.repeat(np.arange(together.shape[0]), np.diff(together.indptr))
+    # Rounded so equal overlaps tie exactly instead of by float noise
+    scores = np.round(together.data * scale[rows] * scale[together.indices], 6)
+
+    top = []
+    for row in range(together.shape[0]):
+        start, end = together.indptr[row], together.indptr[row + 1]
+        columns, row_scores = together.indices[start:end], scores[start:end]
+        # Best score first; ties go to the lower column (offering id). A row
+        # has at most one term's offerings, so a full sort is cheap.
+        pick = np.lexsort((columns, -row_scores))[:k]
+        top.append(
+            [
+                (
+                    int(columns[i]),
+                    float(row_scores[i]),
+                    int(together.data[start + i]),
+                )
+                for i in pick
+            ]
+        )
+    return top
+
+
+def rebuild_term(batch, term, k: int | None = None) -> int:
+    """
+    Recompute the recommendations of (batch, term) and rewrite the ones that
+    changed. Returns the number of offerings rewritten.
+    """
+    k = k or settings.RECOMMEND_TOP_K
+    offerings, matrix = enrollment_matrix(batch, term)
+    computed = {
+        int(offerings[column]): [
+            (int(offerings[other]), score, together) for other, score, together in row
+        ]
+        for column, row in enumerate(top_similar(matrix, k))
+    }
+
+    stored = {pk: [] for pk in computed}
+    for row in (
+        ElectiveRecommendation.objects.filter(elective_offering_id__in=list(computed))
+        .order_by("elective_offering_id", "-score", "recommended_id")
+        .values_list("elective_offering_id", "recommended_id", "score", "together")
+    ):
+        stored[row[0]].append(tuple(row[1:]))
+    changed = [pk for pk, row in computed.items() if row != stored[pk]]
+
+    with transaction.atomic():
+        ElectiveRecommendation.objects.filter(elective_offering_id__in=changed).delete()
+        ElectiveRecommendation.objects.bulk_create(
+            [
+                ElectiveRecommendation(
+                    elective_offering_id=pk,
+                    recommended_id=other,
+                    score=score,
+                    together=together,
+                )
+                for pk in changed
+                for other, score, together in computed[pk]
+            ],
+            batch_size=1000,
+        )
+    return len(changed)
+
+
+def rebuild_changed(rebuild_all: bool = False) -> list[tuple[int, int, int]]:
+    """
+    Rebuild the dirty terms and the ones never computed (every term if
+    `rebuild_all`). Returns (batch, term, offerings rewritten) per term.
+
+    A term is marked clean before it is recomputed, so changes made during
+    the rebuild mark it dirty again for the next run.
+    """
+    terms = ElectiveOffering.objects.values_list("epgp_batch", "term").distinct()
+    states = RecommendedTerm.objects.all()
+    if not rebuild_all:
+        terms = terms.exclude(
+            Exists(
+                states.filter(
+                    epgp_batch=OuterRef("epgp_batch"),
+                    term=OuterRef("term"),
+                    dirty=False,
+                )
+            )
+        )
+    rebuilt = []
+    with use_primary():
+        for batch, term in list(terms.order_by("epgp_batch", "term")):
+            state, created = states.get_or_create(
+                epgp_batch=batch, term=term, defaults={"dirty": False}
+            )
+            if not created:
+                claimed = states.filter(pk=state.pk)
+                if not rebuild_all:
+                    # Another run already took it
+                    claimed = claimed.filter(dirty=True)
+                if not claimed.update(dirty=False):
+                    continue
+            rebuilt.append((batch, term, rebuild_term(batch, term)))
+    return rebuilt
+
+
+def recommendations(offering: ElectiveOffering, k: int):
+    """
+    The `k` offerings most often taken with `offering`, best first, as of
+    the last build_recommendations run.
+    """
+    return (
+        ElectiveRecommendation.objects.filter(elective_offering=offering)
+        .select_related("recommended__course__instructor")
+        .order_by("-score", "recommended_id")[:k]
+    )
+
+
+def archived_recommendations(offering: ArchivedElectiveOffering, k: int):
+    """
+    recommendations() of an archived offering, as (offering, score,
+    together) tuples: computed on the fly from its term's archived rows.
+    """
+    offerings, matrix = enrollment_matrix(
+        offering.epgp_batch, offering.term, archived=True
+    )
+    column = int(np.searchsorted(offerings, offering.id))
+    if column == len(offerings) or offerings[column] != offering.id:
+        return []
+    row = top_similar(matrix, k)[column]
+    recommended = ArchivedElectiveOffering.objects.select_related(
+        "course__instructor"
+    ).in_bulk([int(offerings[other]) for other, _, _ in row])
+    return [
+        (recommended[int(offerings[other])], score, together)
+        for other, score, together in row
+    ]
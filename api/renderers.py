@@ -0,0 +1,53 @@
+"""orjson based renderer and parser for the API app."""
+
+import orjson  # type: ignore
+from rest_framework.exceptions import ParseError  # type: ignore
+from rest_framework.parsers import BaseParser  # type: ignore
+from rest_framework.renderers import BaseRenderer  # type: ignore
+from rest_framework.utils.encoders import JSONEncoder  # type: ignore
+
+# orjson calls this for anything it can't serialise natively (lazy strings,
+# Decimals, querysets...). Datetimes are passed through too so the output
+# matches DRF's own JSONRenderer byte for byte.
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Drop-in replacement for DRF's JSONRenderer backed by orjson."""
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=options)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        """Indentation requested via `; indent=` or by the browsable API."""
+        if accepted_media_type:
+            _, _, params = accepted_media_type.partition(";")
+            for param in params.split(";"):
+                key, _, value = param.strip().partition("=")
+                if key == "indent" and value.isdigit():
+                    return int(value)
+        return renderer_context.get("indent")
+
+
+class ORJSONParser(BaseParser):
+    """Parses JSON request bodies with orjson."""
+
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
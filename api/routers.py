@@ -0,0 +1,123 @@
+"""Read replica routing with read-your-writes stickiness.
+
+Views marked with @read_replica send their reads to the DATABASE_REPLICA
+alias; everything else, and every write, uses `default`. Once a user
+writes, their reads stay on `default` for REPLICA_PIN_SECONDS so they never
+see the replica lag behind their own change: the write leaves a pin keyed
+by their id in the default cache, which every worker reads when it is
+shared (a cookie would not reach a cross-origin client using JWTs).
+
+ReplicaMiddleware (api.middleware) opens a routing scope per request; the
+router consults it lazily, at query time, because JWT users are only known
+once the DRF view has authenticated the request.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings  # type: ignore
+from django.core.cache import cache  # type: ignore
+from django.utils.functional import SimpleLazyObject, empty  # type: ignore
+
+PRIMARY = "default"
+
+_scope: ContextVar["RoutingScope | None"] = ContextVar("replica_scope", default=None)
+
+
+def pin_key(user_id) -> str:
+    return f"replica-pin:{user_id}"
+
+
+def read_replica(view):
+    """Mark a view (function or APIView subclass) as safe to read from the replica."""
+    view.read_replica = True
+    return view
+
+
+def resolved_user(request):
+    """
+    request.user if it is already loaded. The router must not load the
+    lazy session user itself: that runs a query, which asks the router again.
+    """
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+class RoutingScope:
+    """Routing state of one request."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = False  # set by ReplicaMiddleware for @read_replica views
+        self.pinned = False  # reads go to the primary for the rest of the request
+        self.wrote = False
+        self._checked_user = None
+
+    def read_alias(self):
+        if not self.replica or self.pinned:
+            return PRIMARY
+        user = resolved_user(self.request)
+        if user is not None and user.is_authenticated and self._checked_user != user.pk:
+            # Checked once per request, as soon as the user is known
+            self._checked_user = user.pk
+            self.pinned = cache.get(pin_key(user.pk)) is not None
+        return PRIMARY if self.pinned else settings.DATABASE_REPLICA
+
+    def record_write(self):
+        self.wrote = self.pinned = True
+
+    def pin_writer(self):
+        """Keep this user's reads on the primary for a while after a write."""
+        user = getattr(self.request, "user", None)
+        if not (self.wrote and settings.DATABASE_REPLICA):
+            return
+        if user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+@contextmanager
+def routing_scope(request):
+    token = _scope.set(RoutingScope(request))
+    try:
+        yield _scope.get()
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, e.g. to rebuild a shared cache."""
+    scope = _scope.get()
+    if scope is None or scope.pinned:
+        yield
+        return
+    scope.pinned = True
+    try:
+        yield
+    finally:
+        scope.pinned = False
+
+
+class ReplicaRouter:
+    """Reads of @read_replica views go to DATABASE_REPLICA, the rest to default."""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or not settings.DATABASE_REPLICA:
+            return PRIMARY
+        return scope.read_alias()
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.record_write()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,93 @@
+"""OpenAPI schema, generated once per code version and served from memory.
+
+`manage.py build_schema` (run by build.sh) writes SCHEMA_FILE at build time.
+At runtime the file is used if it was built from the same code version;
+otherwise the schema is generated on the first request. Either way the
+bytes, their brotli/gzip variants and the ETag are kept for the life of the
+worker.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings  # type: ignore
+from django.http import HttpResponseNotModified  # type: ignore
+from rest_framework.decorators import api_view, renderer_classes  # type: ignore
+from rest_framework.renderers import JSONOpenAPIRenderer  # type: ignore
+from rest_framework.schemas.openapi import SchemaGenerator  # type: ignore
+from .cache import CachedJSONResponse
+from .compression import precompress
+
+TITLE = "EPGP API"
+DESCRIPTION = "API for EPGP data access"
+VERSION = "1.0.0"
+
+_schema: dict | None = None
+
+
+def code_version() -> str:
+    """
+    Identifier of the deployed code: the commit Render builds from, or a
+    hash of the project's Python sources when that isn't available.
+    """
+    commit = os.getenv("RENDER_GIT_COMMIT")
+    if commit:
+        return commit
+    digest = hashlib.sha256()
+    for package in ("api", "EPGP"):
+        for path in sorted((settings.BASE_DIR / package).rglob("*.py")):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def generate() -> bytes:
+    """Walk the URLconf and render the OpenAPI document as JSON."""
+    generator = SchemaGenerator(title=TITLE, description=DESCRIPTION, version=VERSION)
+    schema = generator.get_schema(request=None, public=True)
+    return JSONOpenAPIRenderer().render(schema)
+
+
+def write(path: Path, version: str) -> bytes:
+    """Generate the schema and store it, stamped with `version`."""
+    content = generate()
+    path.write_bytes(content)
+    path.with_suffix(".version").write_text(version)
+    return content
+
+
+def load() -> dict:
+    """Schema variants and ETag for the current code version."""
+    global _schema
+    if _schema is None:
+        version = code_version()
+        path = Path(settings.SCHEMA_FILE)
+        stamp = path.with_suffix(".version")
+        if path.exists() and stamp.exists() and stamp.read_text() == version:
+            content = path.read_bytes()
+        else:
+            content = generate()
+        _schema = {
+            "variants": precompress(content),
+            "etag": f'"{hashlib.sha256(content).hexdigest()[:32]}"',
+        }
+    return _schema
+
+
+## /api/schema.json
+@api_view(["GET"])
+@renderer_classes([JSONOpenAPIRenderer])
+def schema_view(request):
+    """OpenAPI schema for every endpoint, cached per code version."""
+    schema = load()
+    etags = request.headers.get("If-None-Match", "")
+    if schema["etag"] in (tag.strip().removeprefix("W/") for tag in etags.split(",")):
+        response = HttpResponseNotModified()
+    else:
+        response = CachedJSONResponse(
+            schema["variants"], content_type=JSONOpenAPIRenderer.media_type
+        )
+    response["ETag"] = schema["etag"]
+    response["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return response
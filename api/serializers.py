@@ -1,4 +1,10 @@
+import hashlib
+
+import orjson  # type: ignore
 from django.contrib.auth.models import User, Group  # type: ignore
+from django.core.exceptions import FieldDoesNotExist  # type: ignore
+from django.db import models  # type: ignore
+from django.db.models import Prefetch  # type: ignore
 from .models import (
     StudyCenter,
     StudyCentrePOC,
@@ -9,25 +15,388 @@ from .models import (
     Elective,
     ElectiveOffering,
     ElectiveEnrollment,
+    AllocationRound,
+    ArchivedElectiveOffering,
+    ArchivedElectiveEnrollment,
 )
 from rest_framework import serializers  # type: ignore
 
+######################################################################
+## Fast path for list endpoints
+######################################################################
+
+# Field classes whose to_representation() returns the database value as is.
+_IDENTITY_REPRESENTATIONS = {
+    serializers.CharField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.FloatField.to_representation,
+    serializers.BooleanField.to_representation,
+    serializers.ChoiceField.to_representation,
+}
+
+_UNSUPPORTED_FIELDS = (
+    serializers.RelatedField,
+    serializers.ManyRelatedField,
+    serializers.SerializerMethodField,
+    serializers.FileField,
+    serializers.ModelField,
+)
+
+
+def values_plan(serializer, model, prefix="", lookups=None):
+    """
+    Map the readable fields of `serializer` onto `QuerySet.values_list()`
+    lookups.
+
+    Returns a list of `(field_name, index, convert, nested_plan)` tuples, or
+    None when the serializer needs model instances (hyperlinks, method
+    fields, `__str__` of related objects, reverse FKs...).
+    """
+    lookups = [] if lookups is None else lookups
+
+    def add(lookup):
+        lookups.append(lookup)
+        return len(lookups) - 1
+
+    plan = []
+    for field in serializer._readable_fields:
+        if field.source == "*" or len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        lookup = prefix + field.source
+
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer) or not (
+                model_field.many_to_one or model_field.one_to_one
+            ):
+                return None
+            index = add(lookup + "__pk")
+            nested = values_plan(
+                field, model_field.related_model, lookup + "__", lookups
+            )
+            if nested is None:
+                return None
+            plan.append((field.field_name, index, None, nested))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None or not model_field.concrete:
+                return None
+            plan.append((field.field_name, add(lookup), None, None))
+        elif isinstance(field, _UNSUPPORTED_FIELDS) or model_field.is_relation:
+            return None
+        else:
+            identity = type(field).to_representation in _IDENTITY_REPRESENTATIONS
+            convert = None if identity else field.to_representation
+            plan.append((field.field_name, add(lookup), convert, None))
+    return plan
+
+
+def build_row(plan, row):
+    """Build one output dict from a `values_list()` tuple."""
+    ret = {}
+    for name, index, convert, nested in plan:
+        value = row[index]
+        if value is None:
+            ret[name] = None
+        elif nested is not None:
+            ret[name] = build_row(nested, row)
+        else:
+            ret[name] = value if convert is None else convert(value)
+    return ret
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """
+    Opt-in list serializer that builds rows straight from `values_list()`.
+
+    Enable it with `Meta.list_serializer_class = ValuesListSerializer` on a
+    flat serializer. Nested single-object serializers are followed through
+    joins; anything else falls back to the regular per-instance path.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        if (
+            isinstance(iterable, models.QuerySet)
+            and iterable._result_cache is None
+            and iterable._iterable_class is models.query.ModelIterable
+        ):
+            lookups: list[str] = []
+            plan = values_plan(self.child, iterable.model, lookups=lookups)
+            if plan is not None:
+                rows = iterable.values_list(*lookups or ["pk"])
+                return [build_row(plan, row) for row in rows]
+        return super().to_representation(iterable)
+
+
+######################################################################
+## Sparse fieldsets (?fields= and ?include=)
+######################################################################
+
+
+def field_tree(value: str | None) -> dict | None:
+    """'id,course.course_code' -> {"id": {}, "course": {"course_code": {}}}"""
+    if value is None:
+        return None
+    tree: dict = {}
+    for path in value.split(","):
+        node = tree
+        for name in path.strip().split("."):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def sparse_fieldsets(request) -> tuple[dict | None, dict | None]:
+    """The ?fields= and ?include= trees of a read request, else (None, None)."""
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None, None
+    params = getattr(request, "query_params", request.GET)
+    return field_tree(params.get("fields")), field_tree(params.get("include"))
+
+
+def fieldset_key(request, serializer_class) -> str:
+    """
+    Cache key suffix for the fields of `serializer_class` that the request's
+    sparse fieldset selects, "" for all of them. The key is a digest of the
+    effective field tree, not of the raw parameters: misspelt, repeated or
+    reordered names share an entry, and there are only as many entries as
+    distinct subsets of the serializer's fields.
+    """
+    fields, include = sparse_fieldsets(request)
+    if fields is None and include is None:
+        return ""
+    selected = selected_fields(serializer_class(context={"request": request}))
+    if selected == selected_fields(serializer_class()):
+        return ""
+    tree = orjson.dumps(selected, option=orjson.OPT_SORT_KEYS)
+    return ":" + hashlib.blake2b(tree, digest_size=8).hexdigest()
+
+
+def nested_serializer(field):
+    """The serializer behind a nested field (single or many), else None."""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, serializers.BaseSerializer) else None
+
+
+def selected_fields(serializer) -> dict:
+    """The fields `serializer` outputs, as a tree like field_tree()'s."""
+    tree = {}
+    for name, field in serializer.fields.items():
+        nested = nested_serializer(field)
+        tree[name] = {} if nested is None else selected_fields(nested)
+    return tree
+
+
+def apply_sparse(serializer, fields: dict | None, include: dict | None):
+    """
+    Drop the fields of `serializer` that the two trees do not select. Plain
+    fields stay when listed in `fields` (all of them when it is None);
+    nested serializers only when named in `fields` or `include`, and are
+    trimmed in turn by the subtrees below that name.
+    """
+    for name, field in list(serializer.fields.items()):
+        nested = nested_serializer(field)
+        if nested is None:
+            if fields is not None and name not in fields:
+                serializer.fields.pop(name)
+        elif (fields and name in fields) or (include and name in include):
+            sub_fields = (fields or {}).get(name) or None
+            sub_include = (include or {}).get(name) or None
+            if sub_fields is not None or sub_include is not None:
+                apply_sparse(nested, sub_fields, sub_include)
+        else:
+            serializer.fields.pop(name)
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets for GET requests, taken from the serializer context's
+    request: `?fields=id,course.course_code` returns only those fields and
+    `?include=course.instructor` adds nested objects. Nested objects are
+    left out unless named in one of them; without either parameter the
+    output is unchanged. Unknown names are ignored.
+
+    Together with PrefetchMixin (see APIModelSerializer) the queryset then
+    only loads the columns and joins the trimmed serializer reads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, include = sparse_fieldsets(self.context.get("request"))
+        if fields is not None or include is not None:
+            apply_sparse(self, fields, include)
+
+
+def queryset_plan(serializer, model, prefix, only, select, prefetch) -> bool:
+    """
+    Collect the only() columns, select_related() joins and prefetches that
+    `serializer` reads. Returns False when a field reads something that is
+    not a model column (method fields, __str__...), so only() must not be
+    used.
+    """
+    exact = True
+    only.append(prefix + model._meta.pk.name)
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.HyperlinkedIdentityField):
+            only.append(prefix + field.lookup_field)
+            continue
+        if field.source == "*" or len(field.source_attrs) != 1:
+            exact = False
+            continue
+        model_field = related_or_field(model, field.source)
+        if model_field is None:
+            exact = False
+            continue
+        lookup = prefix + field.source
+        nested = nested_serializer(field)
+
+        if not model_field.is_relation:
+            only.append(lookup)
+        elif model_field.many_to_many or model_field.one_to_many:
+            if nested is None:
+                prefetch.append(lookup)
+            else:
+                # The reverse FK is needed to attach the prefetched rows
+                back = [] if model_field.many_to_many else [model_field.field.name]
+                related = model_field.related_model._default_manager.all()
+                prefetch.append(
+                    Prefetch(lookup, sparse_queryset(nested, related, back))
+                )
+        elif nested is not None:
+            select.append(lookup)
+            if model_field.concrete:
+                only.append(lookup)
+            exact &= queryset_plan(
+                nested, model_field.related_model, lookup + "__", only, select, prefetch
+            )
+        elif isinstance(
+            field,
+            (serializers.PrimaryKeyRelatedField, serializers.HyperlinkedRelatedField),
+        ):
+            if model_field.concrete:
+                only.append(lookup)
+            else:  # reverse one-to-one: the key is on the other side
+                select.append(lookup)
+                only.append(f"{lookup}__{model_field.related_model._meta.pk.name}")
+        else:
+            # e.g. StringRelatedField: the related object and what it links to
+            if model_field.concrete:
+                select.append(lookup)
+                select.extend(forward_relations(model_field.related_model, lookup))
+            exact = False
+    return exact
+
+
+def related_or_field(model, name):
+    """The model field, or reverse relation by accessor name, called `name`."""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+    return None
+
+
+def forward_relations(model, prefix, depth=3):
+    """
+    FK and one-to-one lookups below `prefix`, for objects rendered with
+    __str__ (which in this app shows the objects they point to).
+    """
+    if depth == 0:
+        return []
+    lookups = []
+    for field in model._meta.concrete_fields:
+        if field.is_relation and field.related_model is not model:
+            lookup = f"{prefix}__{field.name}"
+            lookups.append(lookup)
+            lookups += forward_relations(field.related_model, lookup, depth - 1)
+    return lookups
+
+
+def sparse_queryset(serializer, queryset, required=()):
+    """
+    Restrict `queryset` to what `serializer` (after apply_sparse) reads:
+    only() its columns plus `required`, select_related() for nested objects
+    and prefetch_related() for nested lists. select_related() and
+    prefetches already on the queryset are kept.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    only, select, prefetch = list(required), [], []
+    exact = queryset_plan(serializer, queryset.model, "", only, select, prefetch)
+    existing = queryset.query.select_related
+    if exact and existing is not True:
+        # Joins the view asked for must not be deferred
+        only.extend(selected_paths(existing or {}, queryset.model))
+        queryset = queryset.only(*dict.fromkeys(only))
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def selected_paths(select: dict, model, prefix=""):
+    """The FK lookups of a `query.select_related` tree."""
+    for name, nested in select.items():
+        field = model._meta.get_field(name)
+        if field.concrete:
+            yield prefix + name
+        yield from selected_paths(nested, field.related_model, prefix + name + "__")
+
+
+######################################################################
+## Serializer bases
+######################################################################
+
+
+class PrefetchMixin:
+    """
+    Load what the (possibly trimmed) serializer reads with its queryset:
+    a queryset passed with many=True goes through sparse_queryset(), so
+    nested objects are joined or prefetched instead of fetched per row.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if isinstance(serializer.instance, models.QuerySet):
+            serializer.instance = sparse_queryset(serializer.child, serializer.instance)
+        return serializer
+
+
+class APIModelSerializer(SparseFieldsMixin, PrefetchMixin, serializers.ModelSerializer):
+    """Base of the API model serializers: sparse fieldsets and no N+1 queries."""
+
+
+class APIHyperlinkedModelSerializer(
+    SparseFieldsMixin, PrefetchMixin, serializers.HyperlinkedModelSerializer
+):
+    """APIModelSerializer for hyperlinked serializers."""
+
 
 ######################################################################
 ## Study Centres
 ######################################################################
 
 
-class POCSerializer(serializers.ModelSerializer):
+class POCSerializer(APIModelSerializer):
     class Meta:
         model = StudyCentrePOC
         fields = "__all__"
+        list_serializer_class = ValuesListSerializer
 
 
-class SCSerilazer(serializers.ModelSerializer):
+class SCSerilazer(APIModelSerializer):
     class Meta:
         model = StudyCenter
         fields = "__all__"
+        list_serializer_class = ValuesListSerializer
 
 
 ######################################################################
@@ -35,23 +404,26 @@ class SCSerilazer(serializers.ModelSerializer):
 ######################################################################
 
 
-class BatchInfoSerializer(serializers.ModelSerializer):
+class BatchInfoSerializer(APIModelSerializer):
     class Meta:
         model = BatchInfo
         exclude = ["id", "user"]
+        list_serializer_class = ValuesListSerializer
 
 
-class SocialLinksSerializer(serializers.ModelSerializer):
+class SocialLinksSerializer(APIModelSerializer):
     class Meta:
         model = SocialLinks
         exclude = ["user"]
+        list_serializer_class = ValuesListSerializer
 
 
-class EmploymentSerializer(serializers.ModelSerializer):
+class EmploymentSerializer(APIModelSerializer):
     class Meta:
         model = Employment
         fields = "__all__"
         read_only_fields = ["user"]
+        list_serializer_class = ValuesListSerializer
 
 
 ######################################################################
@@ -59,7 +431,7 @@ class EmploymentSerializer(serializers.ModelSerializer):
 ######################################################################
 
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(APIHyperlinkedModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -71,13 +443,13 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         ]
 
 
-class GroupSerializer(serializers.HyperlinkedModelSerializer):
+class GroupSerializer(APIHyperlinkedModelSerializer):
     class Meta:
         model = Group
         fields = ["url", "name"]
 
 
-class DetailUserSerializer(serializers.ModelSerializer):
+class DetailUserSerializer(APIModelSerializer):
     batch_info = BatchInfoSerializer(read_only=True)
     social_links = SocialLinksSerializer()
 
@@ -91,9 +463,10 @@ class DetailUserSerializer(serializers.ModelSerializer):
             "batch_info",
             "social_links",
         ]
+        list_serializer_class = ValuesListSerializer
 
 
-class UserBatchSerializer(serializers.ModelSerializer):
+class UserBatchSerializer(APIModelSerializer):
     batch_info = BatchInfoSerializer(read_only=True)
 
     class Meta:
@@ -105,6 +478,25 @@ class UserBatchSerializer(serializers.ModelSerializer):
             "last_name",
             "batch_info",
         ]
+        list_serializer_class = ValuesListSerializer
+
+
+class DirectoryBatchInfoSerializer(APIModelSerializer):
+    class Meta:
+        model = BatchInfo
+        fields = ["epgp_batch", "epgp_group", "currentCity"]
+        list_serializer_class = ValuesListSerializer
+
+
+class DirectoryUserSerializer(APIModelSerializer):
+    """A classmate as any user of the batch sees them: no contact details."""
+
+    batch_info = DirectoryBatchInfoSerializer(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ["id", "first_name", "last_name", "batch_info"]
+        list_serializer_class = ValuesListSerializer
 
 
 ################################################################################
@@ -112,35 +504,39 @@ class UserBatchSerializer(serializers.ModelSerializer):
 ################################################################################
 
 
-class InstructorSerializer(serializers.ModelSerializer):
+class InstructorSerializer(APIModelSerializer):
     class Meta:
         model = Professor
         fields = ["salutation", "name", "area"]
+        list_serializer_class = ValuesListSerializer
 
 
-class ElectiveSerializer(serializers.ModelSerializer):
+class ElectiveSerializer(APIModelSerializer):
     instructor = InstructorSerializer(read_only=True)
 
     class Meta:
         model = Elective
         fields = "__all__"
+        list_serializer_class = ValuesListSerializer
 
 
-class ElectiveDetailSerializer(serializers.ModelSerializer):
+class ElectiveDetailSerializer(APIModelSerializer):
     course = ElectiveSerializer(read_only=True)
 
     class Meta:
         model = ElectiveOffering
         fields = "__all__"
+        list_serializer_class = ValuesListSerializer
 
 
-class ElectiveOfferingSerializer(serializers.ModelSerializer):
+class ElectiveOfferingSerializer(APIModelSerializer):
     class Meta:
         model = ElectiveOffering
         fields = "__all__"
+        list_serializer_class = ValuesListSerializer
 
 
-class ElectiveOfferingSmallSerializer(serializers.ModelSerializer):
+class ElectiveOfferingSmallSerializer(APIModelSerializer):
     course = serializers.StringRelatedField()
 
     class Meta:
@@ -149,10 +545,44 @@ class ElectiveOfferingSmallSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class ElectiveEnrollmentSerializer(serializers.ModelSerializer):
+class ElectiveEnrollmentSerializer(APIModelSerializer):
     elective_offering = ElectiveOfferingSmallSerializer(read_only=True)
 
     class Meta:
         model = ElectiveEnrollment
         fields = ["id", "elective_offering"]
         read_only_fields = ["id"]
+
+
+# Rows of archived batches (api.archive) serialize like the live ones
+class ArchivedElectiveDetailSerializer(ElectiveDetailSerializer):
+    class Meta(ElectiveDetailSerializer.Meta):
+        model = ArchivedElectiveOffering
+
+
+class ArchivedElectiveOfferingSmallSerializer(ElectiveOfferingSmallSerializer):
+    class Meta(ElectiveOfferingSmallSerializer.Meta):
+        model = ArchivedElectiveOffering
+
+
+class ArchivedElectiveEnrollmentSerializer(ElectiveEnrollmentSerializer):
+    elective_offering = ArchivedElectiveOfferingSmallSerializer(read_only=True)
+
+    class Meta(ElectiveEnrollmentSerializer.Meta):
+        model = ArchivedElectiveEnrollment
+
+
+class AllocationRoundSerializer(APIModelSerializer):
+    class Meta:
+        model = AllocationRound
+        # Not the seed: knowing the lottery order in advance is an edge
+        fields = [
+            "id",
+            "epgp_batch",
+            "term",
+            "opens_at",
+            "closes_at",
+            "picks",
+            "allocated_at",
+        ]
+        list_serializer_class = ValuesListSerializer
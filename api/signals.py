@@ -0,0 +1,196 @@
+"""Signal handlers for the API app."""
+
+from django.contrib.auth.models import User  # type: ignore
+from django.db.models.signals import pre_save, post_save, post_delete  # type: ignore
+from django.dispatch import receiver  # type: ignore
+from django.utils import timezone  # type: ignore
+from . import cache, events, recommend, suggest, sync
+from .models import (
+    StudyCenter,
+    StudyCentrePOC,
+    BatchInfo,
+    SocialLinks,
+    Employment,
+    Professor,
+    Elective,
+    ElectiveOffering,
+    ElectiveEnrollment,
+    Tombstone,
+)
+
+
+@receiver([post_save, post_delete], sender=Professor)
+@receiver([post_save, post_delete], sender=Elective)
+@receiver([post_save, post_delete], sender=ElectiveOffering)
+def invalidate_catalog(sender, **kwargs):
+    cache.invalidate(cache.CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Professor)
+@receiver([post_save, post_delete], sender=Elective)
+@receiver([post_save, post_delete], sender=ElectiveOffering)
+def publish_catalog_change(sender, instance, signal, **kwargs):
+    events.catalog_changed(instance, "deleted" if signal is post_delete else "saved")
+
+
+@receiver([post_save, post_delete], sender=ElectiveEnrollment)
+def publish_enrollment_count(sender, instance, **kwargs):
+    events.enrollments_changed([instance.elective_offering_id])
+
+
+@receiver([post_save, post_delete], sender=ElectiveEnrollment)
+def mark_recommendations_dirty(sender, instance, **kwargs):
+    recommend.enrollments_changed([instance.elective_offering_id])
+
+
+@receiver([post_save, post_delete], sender=ElectiveOffering)
+def mark_term_dirty(sender, instance, **kwargs):
+    recommend.term_changed(instance.epgp_batch, instance.term)
+
+
+# Fields whose changes the post_save handlers below act on
+TRACKED_FIELDS = {
+    # is_active: whether a user is suggested at all; the names and is_active
+    # are what the sync directory shows of a user
+    User: ("first_name", "last_name", "is_active"),
+    Employment: ("user", "employer", "start_date", "end_date"),
+}
+
+
+def changed_fields(sender, instance, update_fields, names) -> set[str]:
+    """
+    Which of the fields `names` the save of `instance` changes: all of them
+    for a new row, else from one read of the stored row, skipped when
+    `update_fields` leaves them all out.
+    """
+    if instance._state.adding:
+        return set(names)
+    if update_fields is not None:
+        names = [name for name in names if name in update_fields]
+        if not names:
+            return set()
+    attnames = {name: sender._meta.get_field(name).attname for name in names}
+    stored = (
+        sender._base_manager.filter(pk=instance.pk).values(*attnames.values()).first()
+    )
+    if stored is None:
+        return set(names)
+    return {
+        name
+        for name, attname in attnames.items()
+        if stored[attname] != getattr(instance, attname)
+    }
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Employment)
+def remember_changed_fields(sender, instance, update_fields=None, **kwargs):
+    instance._changed = changed_fields(
+        sender, instance, update_fields, TRACKED_FIELDS[sender]
+    )
+
+
+@receiver([post_save, post_delete], sender=BatchInfo)
+@receiver([post_save, post_delete], sender=Employment)
+@receiver([post_save, post_delete], sender=ElectiveEnrollment)
+def refresh_suggestion_features(sender, instance, signal, **kwargs):
+    # Employment saves that leave the employer and dates alone don't matter
+    if signal is post_save and sender is Employment and not instance._changed:
+        return
+    suggest.users_changed([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=User)
+def refresh_user_suggestion_features(sender, instance, signal, **kwargs):
+    # Logins, passwords and names don't change the suggestions
+    if signal is post_save and "is_active" not in instance._changed:
+        return
+    suggest.users_changed([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=StudyCenter)
+@receiver([post_save, post_delete], sender=StudyCentrePOC)
+def invalidate_centres(sender, **kwargs):
+    cache.invalidate(cache.CENTRES)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_profile(sender, instance, **kwargs):
+    cache.invalidate_profile(instance.pk, cache.PROFILE_DETAIL)
+
+
+@receiver([post_save, post_delete], sender=BatchInfo)
+def invalidate_batch_info(sender, instance, **kwargs):
+    cache.invalidate_profile(
+        instance.user_id, cache.PROFILE_DETAIL, cache.PROFILE_BATCH
+    )
+
+
+@receiver([post_save, post_delete], sender=SocialLinks)
+def invalidate_social_links(sender, instance, **kwargs):
+    cache.invalidate_profile(
+        instance.user_id, cache.PROFILE_DETAIL, cache.PROFILE_SOCIAL
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_directory_entry(sender, instance, created, **kwargs):
+    # The directory syncs on batch_info.updated_at (User has no such column);
+    # new users have no batch info yet
+    if created or not instance._changed:
+        return
+    BatchInfo.objects.filter(user_id=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Elective)
+@receiver(post_delete, sender=ElectiveOffering)
+@receiver(post_delete, sender=StudyCenter)
+@receiver(post_delete, sender=ElectiveEnrollment)
+@receiver(post_delete, sender=BatchInfo)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        resource=sync.TOMBSTONES[sender],
+        object_id=instance.user_id if sender is BatchInfo else instance.pk,
+        user_id=instance.user_id if sender is ElectiveEnrollment else None,
+        epgp_batch=getattr(instance, "epgp_batch", None),
+    )
+
+
+@receiver(post_save, sender=User)
+def record_deactivation_tombstone(sender, instance, created, **kwargs):
+    # Inactive users drop out of the directory, as if their batch info was deleted
+    if created or instance.is_active or "is_active" not in instance._changed:
+        return
+    batch = (
+        BatchInfo.objects.filter(user_id=instance.pk)
+        .values_list("epgp_batch", flat=True)
+        .first()
+    )
+    if batch is not None:
+        Tombstone.objects.create(
+            resource=sync.TOMBSTONES[BatchInfo], object_id=instance.pk, epgp_batch=batch
+        )
+
+
+@receiver(pre_save, sender=BatchInfo)
+def remember_batch(sender, instance, update_fields=None, **kwargs):
+    # upsert() on PostgreSQL sends no pre_save and sets _previous itself
+    if instance._state.adding or (
+        update_fields is not None and "epgp_batch" not in update_fields
+    ):
+        return
+    instance._previous = (
+        BatchInfo.objects.filter(pk=instance.pk).values("epgp_batch").first() or {}
+    )
+
+
+@receiver(post_save, sender=BatchInfo)
+def record_batch_move(sender, instance, **kwargs):
+    # Moving to another batch leaves the old batch's directory
+    previous = getattr(instance, "_previous", {}).get("epgp_batch")
+    if previous is not None and previous != instance.epgp_batch:
+        Tombstone.objects.create(
+            resource=sync.TOMBSTONES[BatchInfo],
+            object_id=instance.user_id,
+            epgp_batch=previous,
+        )
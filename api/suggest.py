@@ -0,0 +1,291 @@
+"""Classmate suggestions: the alumni with the most in common with a user.
+
+Every active user with batch info is a row of compact features: their
+batch, the elective offerings they took as a bitset (one bit per offering, packed in
+uint64 words) and integer codes for their study centre, current city,
+home state and current employer (-1 when unknown). Scoring one user
+against their batch is then a few NumPy operations over whole columns:
+
+    score = WEIGHTS["electives"] * popcount(bits & bits[user])
+          + sum(WEIGHTS[f] * (codes[f] == codes[f][user]) for f in FEATURES)
+
+Each worker keeps its own FeatureIndex. Saves that change a feature log
+the user ids in the SuggestionChange table (api.signals), and before
+answering the index reloads only the users logged since its last refresh,
+at most every REFRESH_INTERVAL.
+A transaction logs each user it changed once. A worker that last
+refreshed before the log's retention rebuilds from scratch; `manage.py
+prune_tombstones`, run periodically (see EPGP/settings.py), deletes the
+expired entries.
+"""
+
+import threading
+from datetime import timedelta
+
+import numpy as np  # type: ignore
+from django.db import transaction  # type: ignore
+from django.db.models import F  # type: ignore
+from django.utils import timezone  # type: ignore
+from .models import BatchInfo, Employment, ElectiveEnrollment, SuggestionChange
+from .routers import use_primary
+from .sync import OVERLAP
+
+FEATURES = ("centre", "city", "state", "employer")
+
+WEIGHTS = {
+    "electives": 1.0,  # per offering taken by both
+    "centre": 3.0,
+    "city": 2.0,
+    "state": 1.0,
+    "employer": 4.0,
+}
+
+MAX_SUGGESTIONS = 50
+
+LOG_RETENTION = timedelta(hours=1)  # SuggestionChange rows kept this long
+REFRESH_INTERVAL = timedelta(seconds=5)  # a worker reads the log at most this often
+MAX_PENDING = 1000  # changed users past which a rebuild is cheaper
+
+WORD_BITS = 64
+
+
+def normalize(value: str | None) -> str | None:
+    """Free text compared case- and whitespace-insensitively."""
+    value = " ".join((value or "").split()).casefold()
+    return value or None
+
+
+class PendingChanges:
+    """The users a transaction changed, logged with one insert on commit."""
+
+    def __init__(self):
+        self.user_ids = set()
+        self.logged = False
+
+    def __call__(self):
+        self.logged = True
+        # Logged after the commit, so a refresh that reads the entry also
+        # reads the change
+        SuggestionChange.objects.bulk_create(
+            SuggestionChange(user_id=user_id) for user_id in sorted(self.user_ids)
+        )
+
+
+def users_changed(user_ids):
+    """
+    Log that the features of `user_ids` changed once the transaction
+    commits: one row per user and transaction, however many of their rows
+    it saves.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    connection = transaction.get_connection()
+    pending = getattr(connection, "suggestion_changes", None)
+    # Reused while it is still to run on commit: not once it has run, nor
+    # after its transaction or savepoint rolled back
+    if (
+        pending is None
+        or pending.logged
+        or not any(func is pending for _, func, _ in connection.run_on_commit)
+    ):
+        pending = connection.suggestion_changes = PendingChanges()
+        pending.user_ids |= user_ids
+        transaction.on_commit(pending)  # runs at once outside a transaction
+    else:
+        pending.user_ids |= user_ids
+
+
+def user_features(user_ids=None) -> dict[int, dict]:
+    """
+    Features of the active users with batch info, all of them or those of
+    `user_ids`, in three queries.
+    """
+    profiles = BatchInfo.objects.filter(user__is_active=True)
+    employers = Employment.objects.filter(end_date__isnull=True).order_by(
+        "user_id", F("start_date").asc(nulls_first=True), "id"
+    )
+    enrollments = ElectiveEnrollment.objects.all()
+    if user_ids is not None:
+        profiles = profiles.filter(user_id__in=user_ids)
+        employers = employers.filter(user_id__in=user_ids)
+        enrollments = enrollments.filter(user_id__in=user_ids)
+
+    features = {
+        user_id: {
+            "batch": batch,
+            "centre": centre,
+            "city": normalize(city),
+            "state": state or None,
+            "employer": None,
+            "electives": [],
+        }
+        for user_id, batch, centre, city, state in profiles.values_list(
+            "user_id", "epgp_batch", "studyCenter_id", "currentCity", "homeState"
+        )
+    }
+    # The current job started last wins
+    for user_id, employer in employers.values_list("user_id", "employer"):
+        if user_id in features:
+            features[user_id]["employer"] = normalize(employer)
+    for user_id, offering_id in enrollments.values_list(
+        "user_id", "elective_offering_id"
+    ):
+        if user_id in features:
+            features[user_id]["electives"].append(offering_id)
+    return features
+
+
+class FeatureIndex:
+    """Feature arrays of every user, one row each, refreshed from the log."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.refreshed_at = None  # None until built
+        self.reset()
+
+    def reset(self):
+        self.rows: dict[int, int] = {}  # user id -> row
+        self.columns: dict[int, int] = {}  # offering id -> bit
+        self.vocabulary = {feature: {} for feature in FEATURES}
+        self.user_ids = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.batches = np.zeros(0, dtype=np.int64)
+        self.codes = {feature: np.zeros(0, dtype=np.int32) for feature in FEATURES}
+        self.bits = np.zeros((0, 1), dtype=np.uint64)
+
+    def code(self, feature: str, value) -> int:
+        if value is None:
+            return -1
+        vocabulary = self.vocabulary[feature]
+        return vocabulary.setdefault(value, len(vocabulary))
+
+    def grow(self, features: dict[int, dict]):
+        """Add rows for new users and bits for new offerings."""
+        new_users = [user_id for user_id in features if user_id not in self.rows]
+        for user_id in new_users:
+            self.rows[user_id] = len(self.rows)
+        for entry in features.values():
+            for offering_id in entry["electives"]:
+                self.columns.setdefault(offering_id, len(self.columns))
+
+        added = len(new_users)
+        words = max(1, -(-len(self.columns) // WORD_BITS))
+        self.user_ids = np.concatenate(
+            [self.user_ids, np.array(new_users, dtype=np.int64)]
+        )
+        self.active = np.concatenate([self.active, np.zeros(added, dtype=bool)])
+        self.batches = np.concatenate(
+            [self.batches, np.full(added, -1, dtype=np.int64)]
+        )
+        for feature in FEATURES:
+            self.codes[feature] = np.concatenate(
+                [self.codes[feature], np.full(added, -1, dtype=np.int32)]
+            )
+        self.bits = np.pad(self.bits, ((0, added), (0, words - self.bits.shape[1])))
+
+    def update(self, features: dict[int, dict], user_ids):
+        """
+        Rewrite the rows of `user_ids` from `features`; users missing from
+        it (deactivated, batch info deleted) stop being suggested.
+        """
+        self.grow(features)
+        rows = np.array(
+            [self.rows[user_id] for user_id in user_ids if user_id in self.rows],
+            dtype=np.int64,
+        )
+        self.active[rows] = False
+        self.batches[rows] = -1
+        self.bits[rows] = 0
+        for feature in FEATURES:
+            self.codes[feature][rows] = -1
+
+        set_rows, set_columns = [], []
+        for user_id, entry in features.items():
+            row = self.rows[user_id]
+            self.active[row] = True
+            self.batches[row] = entry["batch"]
+            for feature in FEATURES:
+                self.codes[feature][row] = self.code(feature, entry[feature])
+            for offering_id in entry["electives"]:
+                set_rows.append(row)
+                set_columns.append(self.columns[offering_id])
+        columns = np.array(set_columns, dtype=np.uint64)
+        np.bitwise_or.at(
+            self.bits,
+            (
+                np.array(set_rows, dtype=np.int64),
+                (columns // WORD_BITS).astype(np.int64),
+            ),
+            np.left_shift(np.uint64(1), columns % WORD_BITS),
+        )
+
+    def rebuild(self):
+        self.reset()
+        features = user_features()
+        self.update(features, list(features))
+
+    def refresh(self):
+        """Apply the changes logged since the last refresh."""
+        now = timezone.now()
+        if self.refreshed_at is not None and now - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        with self._lock, use_primary():
+            if self.refreshed_at is None or self.refreshed_at < now - LOG_RETENTION:
+                self.rebuild()
+            else:
+                # An entry written just before the last refresh may have
+                # committed just after it
+                user_ids = set(
+                    SuggestionChange.objects.filter(
+                        changed_at__gt=self.refreshed_at - OVERLAP
+                    )
+                    .values_list("user_id", flat=True)
+                    .distinct()[: MAX_PENDING + 1]
+                )
+                if len(user_ids) > MAX_PENDING:
+                    self.rebuild()
+                elif user_ids:
+                    self.update(user_features(user_ids), user_ids)
+            self.refreshed_at = now
+
+    def suggest(self, user_id: int, k: int) -> list[dict]:
+        """
+        The `k` users of the same batch with the highest score for `user_id`,
+        best first, with how many electives they share and which other
+        features match.
+        """
+        self.refresh()
+        with self._lock:
+            row = self.rows.get(user_id)
+            if row is None or not self.active[row]:
+                return []
+            electives = np.bitwise_count(self.bits & self.bits[row]).sum(
+                axis=1, dtype=np.int64
+            )
+            scores = WEIGHTS["electives"] * electives
+            matches = {}
+            for feature in FEATURES:
+                codes = self.codes[feature]
+                matches[feature] = (codes == codes[row]) & (codes[row] >= 0)
+                scores = scores + WEIGHTS[feature] * matches[feature]
+
+            candidates = (
+                self.active & (self.batches == self.batches[row]) & (scores > 0)
+            )
+            candidates[row] = False
+            picked = np.flatnonzero(candidates)
+            # Highest score first, then the lower user id
+            picked = picked[np.lexsort((self.user_ids[picked], -scores[picked]))][:k]
+            return [
+                {
+                    "user_id": int(self.user_ids[i]),
+                    "score": float(scores[i]),
+                    "electives": int(electives[i]),
+                    "matches": [f for f in FEATURES if matches[f][i]],
+                }
+                for i in picked
+            ]
+
+
+index = FeatureIndex()
@@ -0,0 +1,183 @@
+"""Delta sync: what changed or was deleted since a client's cursor.
+
+Rows carry `updated_at` (auto_now) and deletions leave a Tombstone (see
+api.signals), so a background refresh only returns the difference. A
+cursor is the server time, in microseconds, at which the previous
+response was taken; without one, or once it is older than the tombstone
+retention, the response is a full snapshot.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings  # type: ignore
+from django.contrib.auth.models import User  # type: ignore
+from django.db.models import Q  # type: ignore
+from django.utils import timezone  # type: ignore
+from .models import (
+    BatchInfo,
+    StudyCenter,
+    Elective,
+    ElectiveOffering,
+    ElectiveEnrollment,
+    Tombstone,
+    ArchivedElectiveOffering,
+    ArchivedElectiveEnrollment,
+)
+from .serializers import (
+    SCSerilazer,
+    DirectoryUserSerializer,
+    ElectiveSerializer,
+    ElectiveOfferingSmallSerializer,
+    ElectiveEnrollmentSerializer,
+    ArchivedElectiveOfferingSmallSerializer,
+    ArchivedElectiveEnrollmentSerializer,
+)
+
+# A row saved just before a cursor was taken may commit just after it;
+# re-sending this much history keeps such rows from being missed.
+OVERLAP = timedelta(seconds=2)
+
+# Deleting one of these leaves a tombstone for the named resource
+TOMBSTONES = {
+    Elective: "electives",
+    ElectiveOffering: "offerings",
+    StudyCenter: "centres",
+    ElectiveEnrollment: "enrollments",
+    BatchInfo: "directory",  # a user without batch info leaves the directory
+}
+# Resources of the user's batch only, whose tombstones record their batch
+BATCH_RESOURCES = ("offerings", "directory")
+
+
+def make_cursor(moment: datetime) -> str:
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_cursor(cursor: str) -> datetime:
+    """Inverse of make_cursor; raises ValueError for anything else."""
+    return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+
+
+def changed(since, *relations: str) -> Q:
+    """Rows whose own, or any related row's, updated_at is after `since`."""
+    query = Q()
+    for relation in ("", *relations):
+        query |= Q(**{f"{relation}updated_at__gt": since})
+    return query
+
+
+def electives(user, since):
+    rows = Elective.objects.select_related("instructor").order_by("area", "course_code")
+    if since:
+        rows = rows.filter(changed(since, "instructor__"))
+    return ElectiveSerializer(rows, many=True).data
+
+
+def offerings(user, since):
+    """Offerings of the user's batch."""
+    batch = BatchInfo.objects.filter(user=user).values("epgp_batch")[:1]
+    rows = (
+        ElectiveOffering.objects.filter(epgp_batch=batch)
+        .select_related("course__instructor")
+        .order_by("course__area", "course__course_code", "section")
+    )
+    if since:
+        rows = rows.filter(changed(since, "course__", "course__instructor__"))
+        return ElectiveOfferingSmallSerializer(rows, many=True).data
+    # Archived batches (api.archive) never change: full snapshots only
+    archived = ArchivedElectiveOffering.objects.filter(epgp_batch=batch).order_by(
+        "course__area", "course__course_code", "section"
+    )
+    return (
+        ArchivedElectiveOfferingSmallSerializer(archived, many=True).data
+        + ElectiveOfferingSmallSerializer(rows, many=True).data
+    )
+
+
+def centres(user, since):
+    rows = StudyCenter.objects.order_by("state")
+    if since:
+        rows = rows.filter(changed(since))
+    return SCSerilazer(rows, many=True).data
+
+
+def enrollments(user, since):
+    """The user's own enrollments."""
+    rows = (
+        ElectiveEnrollment.objects.filter(user=user)
+        .select_related("elective_offering__course__instructor")
+        .order_by("id")
+    )
+    if since:
+        rows = rows.filter(
+            changed(
+                since,
+                "elective_offering__",
+                "elective_offering__course__",
+                "elective_offering__course__instructor__",
+            )
+        )
+        return ElectiveEnrollmentSerializer(rows, many=True).data
+    archived = ArchivedElectiveEnrollment.objects.filter(user=user).order_by("id")
+    return (
+        ArchivedElectiveEnrollmentSerializer(archived, many=True).data
+        + ElectiveEnrollmentSerializer(rows, many=True).data
+    )
+
+
+def directory(user, since):
+    """
+    Active users of the user's batch (saves of the names or is_active touch
+    batch_info.updated_at). Users deactivated, or moved to another batch,
+    leave a tombstone in the batch they left.
+    """
+    batch = BatchInfo.objects.filter(user=user).values("epgp_batch")[:1]
+    rows = (
+        User.objects.filter(is_active=True, batch_info__epgp_batch=batch)
+        .select_related("batch_info")
+        .order_by("id")
+    )
+    if since:
+        rows = rows.filter(batch_info__updated_at__gt=since)
+    return DirectoryUserSerializer(rows, many=True).data
+
+
+RESOURCES = {
+    "electives": electives,
+    "offerings": offerings,
+    "centres": centres,
+    "enrollments": enrollments,
+    "directory": directory,
+}
+
+
+def deleted(resource: str, user, since) -> list[int]:
+    tombstones = Tombstone.objects.filter(resource=resource, deleted_at__gt=since)
+    if resource == "enrollments":
+        tombstones = tombstones.filter(user_id=user.pk)
+    elif resource in BATCH_RESOURCES:
+        tombstones = tombstones.filter(
+            epgp_batch=BatchInfo.objects.filter(user=user).values("epgp_batch")[:1]
+        )
+    return list(tombstones.values_list("object_id", flat=True).distinct())
+
+
+def retention_cutoff() -> datetime:
+    return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+def sync(user, cursor: str | None, resources: list[str]) -> dict:
+    """Changes to `resources` since `cursor`, and the cursor for next time."""
+    now = timezone.now()
+    since = parse_cursor(cursor) - OVERLAP if cursor else None
+    full = since is None or since < retention_cutoff()
+    result = {}
+    for name in resources:
+        if full:
+            result[name] = {"changed": RESOURCES[name](user, None), "deleted": []}
+        else:
+            result[name] = {
+                "changed": RESOURCES[name](user, since),
+                "deleted": deleted(name, user, since),
+            }
+    return {"cursor": make_cursor(now), "full": full, "resources": result}
@@ -1 +1,1484 @@
 """Test cases for the API application."""
+
+import gzip
+import math
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import brotli  # type: ignore
+import orjson  # type: ignore
+from django.conf import settings  # type: ignore
+from django.contrib.auth.models import User  # type: ignore
+from django.core.cache import caches  # type: ignore
+from django.core.wsgi import get_wsgi_application  # type: ignore
+from django.db import connection  # type: ignore
+from django.db.models.signals import post_save  # type: ignore
+from django.test import (  # type: ignore
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext  # type: ignore
+from django.urls import reverse  # type: ignore
+from django.utils import timezone  # type: ignore
+from rest_framework.renderers import JSONRenderer  # type: ignore
+from rest_framework.request import Request  # type: ignore
+from rest_framework_simplejwt.tokens import RefreshToken  # type: ignore
+from . import (
+    allocation,
+    archive,
+    cache,
+    checks,
+    events,
+    geo,
+    loadtest,
+    recommend,
+    schema,
+    suggest,
+    sync,
+    views,
+    warmup,
+)
+from .benchmarks import api_client
+from .compression import negotiate_encoding
+from .nplusone import NPlusOneGuard
+from .models import (
+    AllocationPreference,
+    AllocationRound,
+    BatchInfo,
+    Employment,
+    Elective,
+    Professor,
+    StudyCenter,
+    ElectiveOffering,
+    ElectiveEnrollment,
+    RecommendedTerm,
+    SocialLinks,
+    SuggestionChange,
+    Tombstone,
+)
+from .routers import PRIMARY, RoutingScope, pin_key
+from .renderers import ORJSONRenderer
+from .serializers import (
+    APIModelSerializer,
+    DetailUserSerializer,
+    ElectiveDetailSerializer,
+    ElectiveEnrollmentSerializer,
+    ElectiveSerializer,
+    EmploymentSerializer,
+    SCSerilazer,
+    fieldset_key,
+    sparse_queryset,
+)
+from .throttles import AuthThrottle, EnrollThrottle, ListThrottle
+from .upsert import upsert
+
+
+def reset_state():
+    """Empty the caches: ids are reused once a test's rows roll back."""
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    suggest.index.refreshed_at = None
+    geo._index = None
+
+
+class APITestCase(TestCase):
+    def setUp(self):
+        reset_state()
+
+
+def make_offerings(count: int, batch: int = 17, term: int = 1, **fields) -> list:
+    electives = Elective.objects.bulk_create(
+        Elective(course_code=f"T{batch}-{term}-{i}", course_name=f"Test elective {i}")
+        for i in range(count)
+    )
+    return ElectiveOffering.objects.bulk_create(
+        ElectiveOffering(epgp_batch=batch, term=term, course=elective, **fields)
+        for elective in electives
+    )
+
+
+def make_users(count: int, prefix: str = "student") -> list:
+    return User.objects.bulk_create(
+        User(username=f"{prefix}-{i}", email=f"{prefix}-{i}@example.com")
+        for i in range(count)
+    )
+
+
+def enroll(users, offerings):
+    ElectiveEnrollment.objects.bulk_create(
+        ElectiveEnrollment(user=user, elective_offering=offering)
+        for user in users
+        for offering in offerings
+    )
+
+
+class RecommendationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.offerings = make_offerings(3)
+        self.users = make_users(4)
+        enroll(self.users[:2], self.offerings[:2])
+
+    def recommended(self, offering):
+        return [row.recommended_id for row in recommend.recommendations(offering, 5)]
+
+    def test_changed_terms_are_rebuilt(self):
+        first, second, third = self.offerings
+        # The third offering shares no students: nothing to write for it
+        self.assertEqual(recommend.rebuild_changed(), [(17, 1, 2)])
+        self.assertEqual(self.recommended(first), [second.pk])
+        self.assertEqual(recommend.rebuild_changed(), [])
+
+        for user in self.users[2:]:
+            for offering in (first, third):
+                ElectiveEnrollment.objects.create(user=user, elective_offering=offering)
+        self.assertTrue(RecommendedTerm.objects.get(epgp_batch=17, term=1).dirty)
+        # Lookups only read the table until the next run
+        self.assertEqual(self.recommended(first), [second.pk])
+        self.assertEqual(recommend.rebuild_changed(), [(17, 1, 3)])
+        self.assertEqual(self.recommended(first), [second.pk, third.pk])
+
+    def test_lookup_is_one_query(self):
+        recommend.rebuild_changed()
+        with self.assertNumQueries(1):
+            self.recommended(self.offerings[0])
+
+
+class DirectorySyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.classmates = make_users(2)
+        self.other = make_users(1, prefix="other")[0]
+        BatchInfo.objects.bulk_create(
+            [
+                BatchInfo(user=self.classmates[0], epgp_batch=17, roll_number="1"),
+                BatchInfo(user=self.classmates[1], epgp_batch=17, roll_number="2"),
+                BatchInfo(user=self.other, epgp_batch=18, roll_number="3"),
+            ]
+        )
+        self.client = api_client(self.classmates[0])
+
+    def directory(self, since=None):
+        params = {"resources": "directory"}
+        if since:
+            params["since"] = since
+        response = self.client.get(reverse("sync"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_only_the_batch_without_contact_details(self):
+        rows = self.directory()["resources"]["directory"]["changed"]
+        self.assertEqual(
+            sorted(row["id"] for row in rows), [user.pk for user in self.classmates]
+        )
+        self.assertEqual(set(rows[0]), {"id", "first_name", "last_name", "batch_info"})
+        self.assertNotIn("roll_number", rows[0]["batch_info"])
+
+    def test_deactivation_leaves_a_tombstone(self):
+        cursor = self.directory()["cursor"]
+        classmate = self.classmates[1]
+        classmate.is_active = False
+        classmate.save()
+        classmate.save()  # already inactive: no second tombstone
+        directory = self.directory(cursor)["resources"]["directory"]
+        # Rows saved within sync.OVERLAP of the cursor are sent again
+        self.assertNotIn(classmate.pk, [row["id"] for row in directory["changed"]])
+        self.assertEqual(directory["deleted"], [classmate.pk])
+        self.assertEqual(Tombstone.objects.filter(resource="directory").count(), 1)
+
+    def test_tombstones_of_other_batches_are_not_sent(self):
+        cursor = self.directory()["cursor"]
+        self.other.is_active = False
+        self.other.save()
+        directory = self.directory(cursor)["resources"]["directory"]
+        self.assertEqual(directory["deleted"], [])
+
+    def test_moving_batch_leaves_a_tombstone_in_the_old_one(self):
+        cursor = self.directory()["cursor"]
+        classmate = self.classmates[1]
+        response = api_client(classmate).post(
+            reverse("batch-info"), {"epgp_batch": 18}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        directory = self.directory(cursor)["resources"]["directory"]
+        self.assertEqual(directory["deleted"], [classmate.pk])
+        self.assertEqual(
+            list(Tombstone.objects.values_list("object_id", "epgp_batch")),
+            [(classmate.pk, 17)],
+        )
+        batch_info = BatchInfo.objects.get(user=classmate)
+        batch_info.epgp_batch = 17
+        batch_info.save()
+        self.assertEqual(
+            list(Tombstone.objects.values_list("object_id", "epgp_batch")),
+            [(classmate.pk, 17), (classmate.pk, 18)],
+        )
+
+    def test_only_directory_fields_touch_the_entry(self):
+        batch_info = BatchInfo.objects.get(user=self.classmates[1])
+        stamp = batch_info.updated_at
+        user = User.objects.get(pk=self.classmates[1].pk)
+        user.set_password("new password")
+        user.save()
+        batch_info.refresh_from_db()
+        self.assertEqual(batch_info.updated_at, stamp)
+        user.first_name = "Ada"
+        user.save()
+        batch_info.refresh_from_db()
+        self.assertGreater(batch_info.updated_at, stamp)
+
+
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.other = make_users(2)
+        BatchInfo.objects.create(user=self.user, epgp_batch=17)
+        self.offerings = make_offerings(2)
+        enroll([self.user, self.other], self.offerings)
+        self.client = api_client(self.user)
+
+    def sync(self, since=None, resources="offerings,enrollments"):
+        params = {"resources": resources}
+        if since:
+            params["since"] = since
+        return self.client.get(reverse("sync"), params)
+
+    def test_deletions_since_the_cursor(self):
+        first = self.sync().json()
+        self.assertTrue(first["full"])
+        removed = self.offerings[1].pk
+        self.offerings[1].delete()  # cascades to both enrollments
+        ElectiveEnrollment.objects.get(
+            user=self.user, elective_offering=self.offerings[0]
+        ).delete()
+        ElectiveEnrollment.objects.get(
+            user=self.other, elective_offering=self.offerings[0]
+        ).delete()
+
+        delta = self.sync(first["cursor"]).json()
+        self.assertFalse(delta["full"])
+        self.assertEqual(delta["resources"]["offerings"]["deleted"], [removed])
+        # Only the user's own enrollments
+        deleted = delta["resources"]["enrollments"]["deleted"]
+        self.assertEqual(
+            sorted(deleted),
+            sorted(
+                Tombstone.objects.filter(
+                    resource="enrollments", user_id=self.user.pk
+                ).values_list("object_id", flat=True)
+            ),
+        )
+        self.assertEqual(len(deleted), 2)
+
+    def test_expired_cursor_gets_a_snapshot(self):
+        expired = sync.make_cursor(
+            timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS + 1)
+        )
+        response = self.sync(expired).json()
+        self.assertTrue(response["full"])
+        self.assertEqual(
+            len(response["resources"]["offerings"]["changed"]), len(self.offerings)
+        )
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.sync("yesterday").status_code, 400)
+        self.assertEqual(self.sync(resources="offerings,grades").status_code, 400)
+
+
+class SuggestionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = make_users(3)
+        self.other = make_users(1, prefix="other")[0]
+        BatchInfo.objects.bulk_create(
+            [
+                BatchInfo(user=self.users[0], epgp_batch=17, currentCity="Pune"),
+                BatchInfo(user=self.users[1], epgp_batch=17, currentCity="Pune"),
+                BatchInfo(user=self.users[2], epgp_batch=17, currentCity="Goa"),
+                BatchInfo(user=self.other, epgp_batch=18, currentCity="Pune"),
+            ]
+        )
+        self.index = suggest.FeatureIndex()
+        patcher = mock.patch.object(suggest, "REFRESH_INTERVAL", timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggested(self):
+        return [row["user_id"] for row in self.index.suggest(self.users[0].pk, 10)]
+
+    def test_same_batch_only(self):
+        self.assertEqual(self.suggested(), [self.users[1].pk])
+
+    def test_changes_logged_in_the_database_are_applied(self):
+        self.suggested()
+        with self.captureOnCommitCallbacks(execute=True):
+            Employment.objects.create(user=self.users[0], employer="Acme")
+            Employment.objects.create(user=self.users[2], employer=" ACME ")
+        self.assertTrue(SuggestionChange.objects.exists())
+        self.assertEqual(self.suggested(), [self.users[2].pk, self.users[1].pk])
+
+    def test_one_log_entry_per_user_and_transaction(self):
+        offerings = make_offerings(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            for offering in offerings:
+                ElectiveEnrollment.objects.create(
+                    user=self.users[0], elective_offering=offering
+                )
+            Employment.objects.create(user=self.users[0], employer="Acme")
+            Employment.objects.create(user=self.users[1], employer="Acme")
+        self.assertEqual(
+            sorted(SuggestionChange.objects.values_list("user_id", flat=True)),
+            [self.users[0].pk, self.users[1].pk],
+        )
+
+    def test_saves_without_feature_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            employment = Employment.objects.create(user=self.users[0], employer="Acme")
+        SuggestionChange.objects.all().delete()
+        user = self.users[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            employment.description = "Widgets"
+            employment.save()
+            user.set_password("new password")
+            user.first_name = "Ada"
+            user.save()
+        self.assertFalse(SuggestionChange.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            user.is_active = False
+            user.save(update_fields=["is_active"])
+        self.assertEqual(
+            list(SuggestionChange.objects.values_list("user_id", flat=True)),
+            [user.pk],
+        )
+
+    @mock.patch.object(suggest, "REFRESH_INTERVAL", timedelta(minutes=1))
+    def test_log_read_at_most_every_refresh_interval(self):
+        self.suggested()
+        with self.assertNumQueries(0):
+            self.suggested()
+
+    def test_view_leaves_out_contact_details(self):
+        response = api_client(self.users[0]).get(reverse("suggested-users"))
+        self.assertEqual(response.status_code, 200)
+        (suggestion,) = response.json()
+        self.assertEqual(suggestion["user"]["id"], self.users[1].pk)
+        self.assertNotIn("email", suggestion["user"])
+
+
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.other = make_users(2)
+        self.factory = RequestFactory()
+
+    def read_alias(self, user):
+        request = self.factory.get("/api/electives/")
+        request.user = user
+        scope = RoutingScope(request)
+        scope.replica = True
+        return scope.read_alias()
+
+    @override_settings(DATABASE_REPLICA="replica")
+    def test_writes_pin_the_writer_to_the_primary(self):
+        self.assertEqual(self.read_alias(self.user), "replica")
+        response = api_client(self.user).post(
+            reverse("batch-info"), {"epgp_batch": 17}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        # Kept server side: no cookie for a cross-origin client to lose
+        self.assertEqual(response.cookies, {})
+        self.assertEqual(self.read_alias(self.user), PRIMARY)
+        self.assertEqual(self.read_alias(self.other), "replica")
+
+    def test_no_pin_without_a_replica(self):
+        response = api_client(self.user).post(
+            reverse("batch-info"), {"epgp_batch": 17}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(caches["default"].get(pin_key(self.user.pk)))
+
+    def test_local_memory_pins_are_reported(self):
+        caches_setting = {**settings.CACHES, "default": {"BACKEND": checks.LOCMEM}}
+        with override_settings(
+            DEBUG=False, DATABASE_REPLICA="replica", CACHES=caches_setting
+        ):
+            self.assertEqual(
+                [error.id for error in checks.check_replica_pin_cache(None)],
+                ["api.W003"],
+            )
+        with override_settings(DEBUG=False, CACHES=caches_setting):
+            self.assertEqual(checks.check_replica_pin_cache(None), [])
+
+
+class SparseFieldsetCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        make_offerings(50)
+        self.client = api_client(make_users(1)[0])
+
+    def test_key_is_the_effective_field_set(self):
+        def key(**params):
+            return fieldset_key(RequestFactory().get("/", params), ElectiveSerializer)
+
+        self.assertEqual(key(), "")
+        self.assertEqual(key(fields=",".join(ElectiveSerializer().fields)), "")
+        self.assertNotEqual(key(fields="id,course_code"), "")
+        self.assertEqual(key(fields="id,course_code"), key(fields="course_code,id,id"))
+        self.assertEqual(key(fields="id,course_code"), key(fields="id,course_code,x"))
+
+    def test_sparse_payloads_are_compressed_per_response(self):
+        url = reverse("all_elective-list")
+        full = self.client.get(url, HTTP_ACCEPT_ENCODING="br")
+        sparse = self.client.get(
+            url, {"fields": "id,course_name"}, HTTP_ACCEPT_ENCODING="br"
+        )
+        self.assertEqual(set(full.variants), {"identity", "br", "gzip"})
+        self.assertEqual(set(sparse.variants), {"identity"})
+        self.assertEqual(sparse["Content-Encoding"], "br")
+        self.assertEqual(
+            {row["id"] for row in orjson.loads(sparse.variants["identity"])},
+            set(Elective.objects.values_list("id", flat=True)),
+        )
+
+
+class BootstrapTests(TransactionTestCase):
+    """Committed rows: the sections are read on connections of their own."""
+
+    def setUp(self):
+        reset_state()
+        self.user = make_users(1)[0]
+        BatchInfo.objects.create(user=self.user, epgp_batch=17)
+        enroll([self.user], make_offerings(2))
+        # A plain async view: authenticated like a client, not forced
+        self.client = api_client()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        )
+
+    def test_sections_are_built_concurrently(self):
+        lock, running, peak = threading.Lock(), [0], [0]
+
+        def section(build, *args):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)  # long enough for the others to start
+            with lock:
+                running[0] -= 1
+            return build(*args)
+
+        with (
+            override_settings(BOOTSTRAP_CONCURRENCY=2),
+            mock.patch("api.views.bootstrap_section", wraps=section) as built,
+        ):
+            self.assertEqual(self.client.get(reverse("bootstrap")).status_code, 200)
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(built.call_count, 6)
+        # "electives" reuses the "batch" section rather than reading it again
+        self.assertIn(
+            mock.call(views.bootstrap_electives, mock.ANY), built.call_args_list
+        )
+
+    def test_sections_match_their_endpoints(self):
+        response = self.client.get(reverse("bootstrap"))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertIsNone(data["social"])
+        for name, url in [
+            ("user", reverse("user-info")),
+            ("batch", reverse("batch-info")),
+            ("enrolled", reverse("elective-enrolled")),
+            ("electives", reverse("elective-list")),
+            ("centres", reverse("centres")),
+        ]:
+            self.assertEqual(data[name], self.client.get(url).json(), name)
+
+    def test_throttled_like_the_list_endpoints(self):
+        with mock.patch.object(ListThrottle, "rate", "1/min", create=True):
+            self.assertEqual(self.client.get(reverse("bootstrap")).status_code, 200)
+            response = self.client.get(reverse("bootstrap"))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+
+    def test_requires_authentication(self):
+        response = api_client().get(reverse("bootstrap"))
+        self.assertEqual(response.status_code, 401)
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.offerings = make_offerings(3)
+        self.users = make_users(3)
+        enroll(self.users[:2], self.offerings[:2])
+        enroll(self.users[2:], self.offerings[::2])
+        recommend.rebuild_changed()
+        self.client = api_client(self.users[0])
+
+    def snapshot(self):
+        first = self.offerings[0].pk
+        return [
+            self.client.get(reverse(name, args=[first])).json()
+            for name in ("elective-takers", "elective-also-taken")
+        ]
+
+    def test_round_trip(self):
+        live = self.snapshot()
+        enrollments = sorted(
+            ElectiveEnrollment.objects.values_list(
+                "id", "user_id", "elective_offering_id"
+            )
+        )
+        self.assertEqual(archive.archive_batch(17), {"offerings": 3, "enrollments": 6})
+        self.assertFalse(ElectiveOffering.objects.filter(epgp_batch=17).exists())
+        self.assertFalse(ElectiveEnrollment.objects.exists())
+        # Takers and recommendations read the archive, ids and order kept
+        self.assertEqual(self.snapshot(), live)
+
+        self.assertEqual(archive.restore_batch(17), {"offerings": 3, "enrollments": 6})
+        self.assertFalse(archive.is_archived(17))
+        recommend.rebuild_changed()
+        self.assertEqual(
+            sorted(
+                ElectiveEnrollment.objects.values_list(
+                    "id", "user_id", "elective_offering_id"
+                )
+            ),
+            enrollments,
+        )
+        self.assertEqual(self.snapshot(), live)
+
+    def test_unknown_offering(self):
+        for name in ("elective-takers", "elective-also-taken"):
+            response = self.client.get(reverse(name, args=[0]))
+            self.assertEqual(response.status_code, 404, name)
+
+
+class AdminEnrollActionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.offering = make_offerings(3)[0]
+        self.users = make_users(2)
+        self.admin = User.objects.create_superuser("admin", "admin@example.com")
+        self.client.force_login(self.admin)
+
+    def test_offerings_are_not_rendered(self):
+        response = self.client.get(reverse("admin:auth_user_changelist"))
+        self.assertContains(response, 'class="admin-autocomplete"')
+        self.assertNotContains(response, "Test elective")
+
+    def test_enrolls_the_selected_users(self):
+        response = self.client.post(
+            reverse("admin:auth_user_changelist"),
+            {
+                "action": "enroll_in_offering",
+                "offering": self.offering.pk,
+                "_selected_action": [user.pk for user in self.users],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(
+                ElectiveEnrollment.objects.values_list(
+                    "user_id", "elective_offering_id"
+                )
+            ),
+            {(user.pk, self.offering.pk) for user in self.users},
+        )
+
+
+class EnrollTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_users(1)[0]
+        self.offering = make_offerings(1)[0]
+        self.client = api_client(self.user)
+
+    def test_enrolls_once(self):
+        url = reverse("elective-enroll", args=[self.offering.pk])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already enrolled", response.json()["error"])
+
+    def test_concurrent_enrollment_is_not_an_error(self):
+        def enrolled_meanwhile(offering_ids):
+            enroll([self.user], [self.offering])
+            return set()
+
+        with mock.patch(
+            "api.allocation.full_offerings", side_effect=enrolled_meanwhile
+        ):
+            response = self.client.post(
+                reverse("elective-enroll", args=[self.offering.pk])
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already enrolled", response.json()["error"])
+
+
+class BatchEnrollTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.other = make_users(2)
+        BatchInfo.objects.create(user=self.user, epgp_batch=17)
+        self.client = api_client(self.user)
+
+    def enroll(self, offerings):
+        return self.client.post(
+            reverse("electives-enroll"),
+            {"offerings": [offering.pk for offering in offerings]},
+            format="json",
+        )
+
+    def statuses(self, response):
+        return [result["status"] for result in response.json()]
+
+    def test_popular_offerings_are_read_once(self):
+        first, second = make_offerings(2)
+        enroll([self.user], [first])
+        enroll(make_users(20, prefix="taker"), [first, second])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.enroll([first, second])
+        self.assertEqual(self.statuses(response), ["already enrolled", "enrolled"])
+        (validation,) = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and '"api_electiveoffering"."course_id"' in query["sql"]
+        ]
+        self.assertNotIn("JOIN", validation)
+
+    def test_clashes_are_rejected(self):
+        first, second, third = make_offerings(3, track=1)
+        enroll([self.user], [first])
+        response = self.enroll([second, third])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(response), ["rejected", "rejected"])
+        self.assertIn("Clashes", response.json()[0]["error"])
+
+    def test_clash_within_the_request(self):
+        first, second = make_offerings(2, track=1)
+        other_track = make_offerings(1, term=2, track=1)[0]
+        response = self.enroll([first, second, other_track])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.statuses(response), ["enrolled", "rejected", "enrolled"])
+        self.assertEqual(
+            set(
+                ElectiveEnrollment.objects.values_list(
+                    "elective_offering_id", flat=True
+                )
+            ),
+            {first.pk, other_track.pk},
+        )
+
+    def test_full_offerings_are_rejected(self):
+        full, open_ = make_offerings(2, capacity=1)
+        enroll([self.other], [full])
+        response = self.enroll([full, open_])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.statuses(response), ["rejected", "enrolled"])
+        self.assertEqual(response.json()[0]["error"], "No seats left")
+
+    def test_locks_the_users_batch_info(self):
+        offering = make_offerings(1)[0]
+        with mock.patch.object(
+            BatchInfo.objects,
+            "select_for_update",
+            wraps=BatchInfo.objects.select_for_update,
+        ) as lock:
+            self.assertEqual(self.enroll([offering]).status_code, 201)
+        lock.assert_called_once_with()
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        make_offerings(50)
+        self.user = make_users(1)[0]
+        self.client = api_client(self.user)
+
+    def get(self, name="all_elective-list", accept_encoding=None, **kwargs):
+        headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+        return self.client.get(reverse(name, **kwargs), headers=headers)
+
+    def test_negotiation(self):
+        for header, expected in [
+            ("gzip, br", "br"),
+            ("gzip, deflate", "gzip"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, *", "gzip"),
+            ("*", "br"),
+            ("identity", None),
+            ("", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(negotiate_encoding(header), expected)
+
+    def test_cached_payloads_are_served_precompressed(self):
+        plain = self.get()
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        decompress = {"br": brotli.decompress, "gzip": gzip.decompress}
+        with mock.patch("api.middleware.compress") as compress:
+            for encoding in ("br", "gzip"):
+                response = self.get(accept_encoding=encoding)
+                self.assertEqual(response["Content-Encoding"], encoding)
+                self.assertLess(len(response.content), len(plain.content))
+                self.assertEqual(decompress[encoding](response.content), plain.content)
+        compress.assert_not_called()
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.get("user-info-id", "br", args=[self.user.pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.content), settings.API_COMPRESSION_MIN_SIZE)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class SchemaTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = api_client(make_users(1)[0])
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "openapi.json"
+        self.enterContext(override_settings(SCHEMA_FILE=self.path))
+        self.enterContext(mock.patch.object(schema, "code_version", return_value="v2"))
+        self.enterContext(mock.patch.object(schema, "_schema", None))
+
+    def get(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(reverse("openapi-schema"), headers=headers)
+
+    def test_etag_revalidation(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("/api/electives/all", orjson.loads(first.content)["paths"])
+        etag = first["ETag"]
+        self.assertEqual(self.get(etag).status_code, 304)
+        # Compressed responses carry the weak form
+        self.assertEqual(self.get(f'"other", W/{etag}').status_code, 304)
+        self.assertEqual(self.get('"other"').status_code, 200)
+
+    def test_built_file_of_the_same_version(self):
+        self.path.write_bytes(b'{"built": true}')
+        self.path.with_suffix(".version").write_text("v1")
+        self.assertNotEqual(orjson.loads(self.get().content), {"built": True})
+
+        schema._schema = None
+        self.path.with_suffix(".version").write_text("v2")
+        with mock.patch.object(schema, "generate") as generate:
+            self.assertEqual(orjson.loads(self.get().content), {"built": True})
+        generate.assert_not_called()
+
+
+class NearestCentreTests(APITestCase):
+    def test_kd_tree_matches_brute_force(self):
+        rng = random.Random(41)
+        points = [
+            geo.unit_vector(rng.uniform(-90, 90), rng.uniform(-180, 180))
+            for _ in range(300)
+        ]
+        tree = geo.KDTree([(point, i) for i, point in enumerate(points)])
+        for _ in range(50):
+            origin = geo.unit_vector(rng.uniform(-90, 90), rng.uniform(-180, 180))
+            for k in (1, 5, 400):
+                expected = sorted(
+                    (math.dist(origin, point), i) for i, point in enumerate(points)
+                )[:k]
+                found = tree.nearest(origin, k)
+                self.assertEqual([i for _, i in found], [i for _, i in expected])
+                for (distance, _), (brute, _) in zip(found, expected):
+                    self.assertAlmostEqual(distance, brute)
+
+    def test_coordinates_from_map_urls(self):
+        for url, expected in [
+            ("https://www.google.com/maps/place/X/@12.97,77.59,17z", (12.97, 77.59)),
+            ("https://maps.google.com/?q=19.07,72.87", (19.07, 72.87)),
+            ("https://www.google.com/maps/place/X/data=!3d28.61!4d77.2", (28.61, 77.2)),
+            ("https://goo.gl/maps/abc", None),
+            (None, None),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(geo.coordinates_from_geo(url), expected)
+
+    def test_endpoint_follows_centre_changes(self):
+        def centre(location, lat, lng):
+            return StudyCenter.objects.create(
+                state="KA",
+                city=location,
+                location=location,
+                address="",
+                geo=f"https://maps.google.com/?q={lat},{lng}",
+            )
+
+        centre("Bengaluru", 12.97, 77.59)
+        centre("Mumbai", 19.07, 72.87)
+        client = api_client(make_users(1)[0])
+
+        def nearest(**params):
+            response = client.get(reverse("centres-nearest"), params)
+            self.assertEqual(response.status_code, 200)
+            return [row["location"] for row in response.json()["centres"]]
+
+        self.assertEqual(nearest(lat=13.0, lng=77.6, k=2), ["Bengaluru", "Mumbai"])
+        centre("Hosur", 12.74, 77.83)  # bumps the CENTRES namespace
+        self.assertEqual(nearest(lat=12.7, lng=77.8, k=2), ["Hosur", "Bengaluru"])
+        response = client.get(reverse("centres-nearest"), {"lat": 95, "lng": 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class FastPathTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        professor = Professor.objects.create(name="Rao", area="Finance")
+        offerings = make_offerings(3)
+        Elective.objects.filter(pk=offerings[0].course_id).update(instructor=professor)
+        self.users = make_users(3)
+        BatchInfo.objects.create(user=self.users[0], epgp_batch=17, currentCity="Pune")
+        SocialLinks.objects.create(user=self.users[1], phone="123")
+        Employment.objects.create(
+            user=self.users[0], employer="Acme", start_date="2020-01-31"
+        )
+        StudyCenter.objects.create(
+            state="KA", city="Bengaluru", location="Centre", address="", pin=560001
+        )
+
+    def test_rows_match_the_instance_path(self):
+        for serializer_class, queryset in [
+            (ElectiveDetailSerializer, ElectiveOffering.objects.order_by("id")),
+            (DetailUserSerializer, User.objects.order_by("id")),
+            (EmploymentSerializer, Employment.objects.all()),
+            (SCSerilazer, StudyCenter.objects.all()),
+        ]:
+            with self.subTest(serializer=serializer_class.__name__):
+                expected = [serializer_class(row).data for row in queryset.all()]
+                with self.assertNumQueries(1):
+                    rows = serializer_class(queryset.all(), many=True).data
+                self.assertEqual(rows, expected)
+
+    def test_renderer_matches_drf(self):
+        data = {
+            "when": timezone.now(),
+            "day": timezone.now().date(),
+            "amount": Decimal("1.50"),
+            "name": "Zoë",
+            "rows": [{"id": 1}, None],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        response = api_client(self.users[0]).post(
+            reverse("batch-info"), b"{not json", content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PrefetchSerializerTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.offerings = make_offerings(3)
+        self.users = make_users(6)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        class EmployedUserSerializer(APIModelSerializer):
+            employment_set = EmploymentSerializer(many=True, read_only=True)
+
+            class Meta:
+                model = User
+                fields = ["id", "employment_set"]
+
+        def queries(serializer_class, queryset):
+            with CaptureQueriesContext(connection) as captured:
+                serializer_class(queryset.all(), many=True).data
+            return len(captured)
+
+        enroll(self.users[:2], self.offerings)
+        Employment.objects.bulk_create(
+            Employment(user=user, employer="Acme") for user in self.users[:2]
+        )
+        cases = [
+            (ElectiveEnrollmentSerializer, ElectiveEnrollment.objects.all()),
+            (EmployedUserSerializer, User.objects.all()),
+        ]
+        few = [queries(*case) for case in cases]
+        enroll(self.users[2:], self.offerings)
+        Employment.objects.bulk_create(
+            Employment(user=user, employer="Acme") for user in self.users[2:]
+        )
+        # One query per nested list (prefetch), none per row
+        self.assertEqual([queries(*case) for case in cases], few)
+        self.assertEqual(few, [1, 2])
+
+    def test_sparse_fields_load_only_their_columns(self):
+        request = RequestFactory().get("/", {"fields": "id,course.course_code"})
+        serializer = ElectiveDetailSerializer(context={"request": Request(request)})
+        queryset = sparse_queryset(serializer, ElectiveOffering.objects.all())
+        self.assertEqual(queryset.query.select_related, {"course": {}})
+        with self.assertNumQueries(1):
+            rows = [
+                type(serializer)(row, context=serializer.context).data
+                for row in queryset
+            ]
+        self.assertEqual(
+            rows[0], {"id": self.offerings[0].pk, "course": {"course_code": "T17-1-0"}}
+        )
+
+
+class AdminChangelistTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_superuser("admin", "admin@example.com")
+        self.client.force_login(admin)
+
+    def add_rows(self, count, prefix):
+        users = make_users(count, prefix)
+        offerings = make_offerings(count, batch=len(prefix))
+        centres = StudyCenter.objects.bulk_create(
+            StudyCenter(state="KA", city="Bengaluru", location=f"{prefix} {i}")
+            for i in range(count)
+        )
+        BatchInfo.objects.bulk_create(
+            BatchInfo(user=user, epgp_batch=17, studyCenter=centre)
+            for user, centre in zip(users, centres)
+        )
+        Employment.objects.bulk_create(
+            Employment(user=user, employer="Acme") for user in users
+        )
+        enroll(users, offerings[:1])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        names = [
+            "admin:api_batchinfo_changelist",
+            "admin:api_employment_changelist",
+            "admin:api_electiveoffering_changelist",
+            "admin:api_electiveenrollment_changelist",
+        ]
+
+        def queries(name):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+            return len(captured)
+
+        self.add_rows(2, "few")
+        few = [queries(name) for name in names]
+        self.add_rows(10, "many")
+        self.assertEqual([queries(name) for name in names], few)
+
+    def test_foreign_keys_use_autocomplete(self):
+        offering = make_offerings(5)[0]
+        user = make_users(5)[0]
+        enroll([user], [offering])
+        enrollment = ElectiveEnrollment.objects.get()
+        response = self.client.get(
+            reverse("admin:api_electiveenrollment_change", args=[enrollment.pk])
+        )
+        self.assertContains(response, 'class="admin-autocomplete"', count=2)
+        # Only the selected user and offering, not every row of their tables
+        self.assertContains(response, "<option ", count=2)
+
+
+class WarmUpTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        make_offerings(3)
+        self.enterContext(mock.patch.dict("os.environ", {"WARM_UP": "1"}))
+        self.enterContext(mock.patch.object(schema, "_schema", None))
+
+    def test_primes_the_caches(self):
+        timings = warmup.warm_up()
+        self.assertEqual(list(timings), [step.__name__ for step in warmup.STEPS])
+        build = mock.Mock()
+        cache.cached_payload(cache.CATALOG, "all", build)
+        cache.cached_payload(cache.CATALOG, "batch:17", build)
+        cache.cached_payload(cache.CENTRES, "all", build)
+        build.assert_not_called()
+        self.assertIsNotNone(schema._schema)
+
+    def test_failing_steps_are_skipped(self):
+        def broken():
+            raise ConnectionError("database unreachable")
+
+        steps = [broken, warmup.resolve_urlconf]
+        with mock.patch.object(warmup, "STEPS", steps):
+            with self.assertLogs("api.warmup", "WARNING"):
+                timings = warmup.warm_up()
+        self.assertEqual(list(timings), ["broken", "resolve_urlconf"])
+
+    def test_can_be_turned_off(self):
+        with mock.patch.dict("os.environ", {"WARM_UP": "0"}):
+            self.assertEqual(warmup.warm_up(), {})
+
+
+# Logins hash the password on every request
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoadTestHarnessTests(TransactionTestCase):
+    def setUp(self):
+        reset_state()
+        self.user = User.objects.create_user("load-0", password="load-password")
+        self.data = {
+            "users": [self.user],
+            "offerings": make_offerings(2),
+            "centres": [StudyCenter.objects.create(state="KA", city="B", location="C")],
+        }
+        self.mix = [
+            {"name": "centres", "method": "GET", "path": "/api/centres", "weight": 1}
+        ]
+
+    def virtual_user(self, password="load-password"):
+        return loadtest.VirtualUser("load-0", password, self.data, self.mix, seed=1)
+
+    def test_percentiles_and_report(self):
+        ordered = [i / 100 for i in range(1, 101)]
+        self.assertEqual(loadtest.percentile(ordered, 50), 0.5)
+        self.assertEqual(loadtest.percentile(ordered, 99), 0.99)
+        self.assertEqual(loadtest.percentile(ordered, 100), 1.0)
+        self.assertEqual(loadtest.percentile([0.3], 50), 0.3)
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+        stats = loadtest.Stats()
+        for status in (200, 200, 429, 500):
+            stats.add("centres", 0.01, status)
+        (row,) = stats.report(elapsed=2.0)
+        self.assertEqual(
+            {k: row[k] for k in ("route", "requests", "rps", "4xx", "errors")},
+            {"route": "centres", "requests": 4, "rps": 2.0, "4xx": 1, "errors": 1},
+        )
+
+    def test_virtual_users_log_in_first_and_again_after_a_401(self):
+        user = self.virtual_user()
+        item, path, body, headers = user.next_request()
+        self.assertEqual((item["name"], path), ("token_obtain_pair", "/auth/token/"))
+        self.assertEqual(orjson.loads(body)["username"], "load-0")
+        user.handle_response(item, 200, orjson.dumps({"access": "token"}))
+        item, path, _, headers = user.next_request()
+        self.assertEqual(path, "/api/centres")
+        self.assertEqual(headers, {"authorization": "Bearer token"})
+        user.handle_response(item, 401, b"")
+        self.assertEqual(user.next_request()[1], "/auth/token/")
+
+    def test_wsgi_run(self):
+        stats = loadtest.run_wsgi(
+            get_wsgi_application(), [self.virtual_user()], duration=0.3
+        )
+        rows = {row["route"]: row for row in stats.report(elapsed=0.3)}
+        self.assertEqual(rows["token_obtain_pair"]["requests"], 1)
+        self.assertGreater(rows["centres"]["requests"], 0)
+        self.assertEqual(rows["centres"]["4xx"] + rows["centres"]["errors"], 0)
+
+        stats = loadtest.run_wsgi(
+            get_wsgi_application(), [self.virtual_user("wrong")], duration=0.1
+        )
+        (row,) = stats.report(elapsed=0.1)
+        self.assertEqual(row["route"], "token_obtain_pair")
+        self.assertEqual(row["4xx"], row["requests"])
+
+
+class ServerTimingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        make_offerings(3)
+        self.client = api_client(make_users(1)[0])
+
+    def get(self):
+        return self.client.get(reverse("all_elective-list"))
+
+    def test_header(self):
+        timing = self.get()["Server-Timing"]
+        self.assertRegex(
+            timing,
+            r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+, '
+            r"render;dur=[\d.]+, total;dur=[\d.]+$",
+        )
+
+    def test_only_slow_requests_are_warned_about(self):
+        with override_settings(API_SLOW_REQUEST_MS=60_000):
+            with self.assertNoLogs("api.timing", "WARNING"):
+                self.get()
+        with override_settings(API_SLOW_REQUEST_MS=0):
+            with self.assertLogs("api.timing", "WARNING") as logs:
+                self.get()
+        (line,) = logs.records
+        self.assertEqual(
+            orjson.loads(line.getMessage())["url_name"], "all_elective-list"
+        )
+
+
+class MetricsTests(APITestCase):
+    def scrape(self, **headers):
+        return self.client.get(reverse("metrics"), headers=headers)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.scrape().status_code, 404)
+
+    @override_settings(METRICS_TOKEN="", DEBUG=True)
+    def test_open_without_a_token_in_debug(self):
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret", DEBUG=False)
+    def test_bearer_token(self):
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(Authorization="Bearer wrong").status_code, 401)
+        response = self.scrape(Authorization="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
+
+
+class NPlusOneTests(APITestCase):
+    """List endpoints run a fixed number of queries however long the list."""
+
+    def setUp(self):
+        super().setUp()
+        professor = Professor.objects.create(name="Test professor")
+        offerings = make_offerings(10, track=1)
+        Elective.objects.update(instructor=professor)
+        self.offering = offerings[0]
+        self.users = make_users(10)
+        centres = StudyCenter.objects.bulk_create(
+            StudyCenter(state="KA", city="Bengaluru", location=f"Centre {i}")
+            for i in range(len(self.users))
+        )
+        BatchInfo.objects.bulk_create(
+            BatchInfo(user=user, epgp_batch=17, studyCenter=centre)
+            for user, centre in zip(self.users, centres)
+        )
+        Employment.objects.bulk_create(
+            Employment(user=user, employer="Test employer") for user in self.users
+        )
+        enroll(self.users, offerings)
+        self.client = api_client(self.users[0])
+
+    def test_list_endpoints(self):
+        for url in [
+            reverse("all_elective-list"),
+            reverse("elective-list"),
+            reverse("elective-enrolled"),
+            reverse("electives-by-user", args=[self.users[1].pk]),
+            reverse("elective-takers", args=[self.offering.pk]),
+            reverse("elective-also-taken", args=[self.offering.pk]),
+            reverse("suggested-users"),
+            reverse("centres"),
+            reverse("sync"),
+        ]:
+            with self.subTest(url=url), NPlusOneGuard(threshold=3):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ProfileCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_users(1)[0]
+        BatchInfo.objects.create(user=self.user, epgp_batch=17, currentCity="Pune")
+        self.client = api_client(self.user)
+
+    def profile(self):
+        return self.client.get(reverse("user-info-id", args=[self.user.pk])).json()
+
+    def test_saves_invalidate_the_cached_profile(self):
+        self.assertEqual(self.profile()["batch_info"]["currentCity"], "Pune")
+        with self.assertNumQueries(0):
+            self.profile()
+        response = self.client.post(
+            reverse("batch-info"), {"currentCity": "Goa"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile()["batch_info"]["currentCity"], "Goa")
+        self.user.first_name = "Ada"
+        self.user.save()
+        self.assertEqual(self.profile()["first_name"], "Ada")
+
+    def test_local_memory_profiles_are_reported(self):
+        caches_setting = {**settings.CACHES, "profiles": {"BACKEND": checks.LOCMEM}}
+        with override_settings(DEBUG=False, CACHES=caches_setting):
+            self.assertEqual(
+                [error.id for error in checks.check_profile_cache(None)], ["api.W002"]
+            )
+        self.assertEqual(settings.CACHES["profiles"]["TIMEOUT"], 30)
+
+
+class UpsertTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.other = make_users(2)
+        self.saved = []
+        post_save.connect(self.record, sender=BatchInfo)
+        self.addCleanup(post_save.disconnect, self.record, sender=BatchInfo)
+
+    def record(self, sender, instance, created, update_fields, **kwargs):
+        self.saved.append((instance.user_id, created, update_fields))
+
+    def test_inserts_then_updates_only_the_given_fields(self):
+        [(created, is_new)] = upsert(
+            BatchInfo,
+            [{"user": self.user, "epgp_batch": 18, "homeTown": "Pune"}],
+            conflict="user",
+            update_fields=["epgp_batch", "homeTown"],
+        )
+        self.assertTrue(is_new)
+        [(updated, is_new)] = upsert(
+            BatchInfo,
+            [{"user": self.user, "epgp_batch": 19}],
+            conflict="user",
+            update_fields=["epgp_batch"],
+        )
+        self.assertFalse(is_new)
+        self.assertEqual(updated.pk, created.pk)
+        stored = BatchInfo.objects.get(user=self.user)
+        self.assertEqual((stored.epgp_batch, stored.homeTown), (19, "Pune"))
+        # post_save still runs for the signal based cache invalidation
+        self.assertEqual(
+            self.saved,
+            [
+                (self.user.pk, True, None),
+                (self.user.pk, False, frozenset({"epgp_batch", "updated_at"})),
+            ],
+        )
+
+    def test_results_follow_the_row_order(self):
+        BatchInfo.objects.create(user=self.other, epgp_batch=17)
+        results = upsert(
+            BatchInfo,
+            [
+                {"user": self.user, "epgp_batch": 18},
+                {"user": self.other, "epgp_batch": 18},
+            ],
+            conflict="user",
+            update_fields=["epgp_batch"],
+        )
+        self.assertEqual(
+            [(instance.user_id, is_new) for instance, is_new in results],
+            [(self.user.pk, True), (self.other.pk, False)],
+        )
+
+    def test_views_answer_created_then_ok(self):
+        client = api_client(self.user)
+        url = reverse("batch-info")
+        response = client.post(
+            url, {"epgp_batch": 18, "homeTown": "Pune"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        response = client.post(url, {"epgp_group": "B"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            (data["epgp_batch"], data["homeTown"], data["epgp_group"]),
+            (18, "Pune", "B"),
+        )
+
+
+class TokenBucketThrottleTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.other = make_users(2)
+        self.now = 1000.0
+        patcher = mock.patch.object(ListThrottle, "timer", lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def allowed(self, user, throttle_class=ListThrottle, method="get"):
+        request = getattr(RequestFactory(), method)("/api/electives/")
+        request.user = user
+        throttle = throttle_class()
+        return throttle.allow_request(request, None), throttle
+
+    def test_burst_then_the_average_rate(self):
+        with mock.patch.object(ListThrottle, "rate", "3/min", create=True):
+            for _ in range(3):
+                self.assertTrue(self.allowed(self.user)[0])
+            allowed, throttle = self.allowed(self.user)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(throttle.wait(), 20.0)
+            # A token every 20 seconds, never more than the bucket holds
+            self.now += 20
+            self.assertTrue(self.allowed(self.user)[0])
+            self.assertFalse(self.allowed(self.user)[0])
+            self.now += 3600
+            for _ in range(3):
+                self.assertTrue(self.allowed(self.user)[0])
+            self.assertFalse(self.allowed(self.user)[0])
+
+    def test_one_bucket_per_user(self):
+        with mock.patch.object(ListThrottle, "rate", "1/min", create=True):
+            self.assertTrue(self.allowed(self.user)[0])
+            self.assertFalse(self.allowed(self.user)[0])
+            self.assertTrue(self.allowed(self.other)[0])
+
+    def test_enroll_status_checks_are_not_throttled(self):
+        with mock.patch.object(EnrollThrottle, "rate", "1/min", create=True):
+            for _ in range(3):
+                self.assertTrue(self.allowed(self.user, EnrollThrottle)[0])
+            self.assertTrue(self.allowed(self.user, EnrollThrottle, "post")[0])
+            self.assertFalse(self.allowed(self.user, EnrollThrottle, "post")[0])
+
+    def test_retry_after_header(self):
+        client = api_client(self.user)
+        with mock.patch.object(ListThrottle, "rate", "1/min", create=True):
+            self.assertEqual(client.get(reverse("all_elective-list")).status_code, 200)
+            response = client.get(reverse("all_elective-list"))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+
+    def test_anonymous_requests_are_keyed_by_the_proxied_address(self):
+        def key(forwarded_for):
+            request = RequestFactory().post(
+                "/auth/token/",
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=forwarded_for,
+            )
+            request.user = None
+            return AuthThrottle().get_cache_key(request, None)
+
+        # One proxy: the address it appended, whatever the client sent before it
+        self.assertEqual(key("203.0.113.9"), key("198.51.100.1, 203.0.113.9"))
+        self.assertNotEqual(key("203.0.113.9"), key("203.0.113.10"))
+
+    def test_local_memory_buckets_are_reported(self):
+        caches_setting = {
+            **settings.CACHES,
+            "throttles": {"BACKEND": checks.LOCMEM},
+        }
+        with override_settings(DEBUG=False, CACHES=caches_setting):
+            self.assertEqual(
+                [error.id for error in checks.check_throttle_cache(None)],
+                ["api.W001"],
+            )
+        with override_settings(DEBUG=True, CACHES=caches_setting):
+            self.assertEqual(checks.check_throttle_cache(None), [])
+
+
+class DraftTests(TestCase):
+    """allocation.draft() on plain ids: offering -> (course, track)."""
+
+    def test_later_passes_run_in_reverse_order(self):
+        offerings = {1: (1, None), 2: (2, None), 3: (3, None)}
+        seats = {1: 1, 2: 1, 3: 1}
+        preferences = {10: [1, 2, 3], 20: [1, 2, 3]}
+        allocated = allocation.draft(
+            [10, 20], preferences, seats, offerings, {}, picks=2
+        )
+        # 10 picks 1, 20 gets 2, then 20 picks first again and gets 3
+        self.assertEqual(allocated, {10: [1], 20: [2, 3]})
+
+    def test_clashes_and_sections_are_skipped(self):
+        offerings = {1: (1, 1), 2: (2, 1), 3: (1, 2), 4: (3, 2)}
+        seats = dict.fromkeys(offerings)
+        preferences = {10: [1, 2, 3, 4]}
+        allocated = allocation.draft([10], preferences, seats, offerings, {}, picks=3)
+        # 2 clashes with 1 on track 1 and 3 is another section of course 1
+        self.assertEqual(allocated, {10: [1, 4]})
+
+    def test_existing_enrollments_count(self):
+        offerings = {1: (1, 1), 2: (2, 2)}
+        allocated = allocation.draft(
+            [10],
+            {10: [1, 2]},
+            dict.fromkeys(offerings),
+            offerings,
+            {10: (set(), {1})},
+            picks=2,
+        )
+        self.assertEqual(allocated, {10: [2]})
+
+
+class AllocationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.offerings = make_offerings(2, capacity=1)
+        self.users = make_users(3)
+        now = timezone.now()
+        self.round = AllocationRound.objects.create(
+            epgp_batch=17,
+            term=1,
+            opens_at=now - timedelta(days=2),
+            closes_at=now - timedelta(days=1),
+            seed=42,
+        )
+        AllocationPreference.objects.bulk_create(
+            AllocationPreference(
+                allocation_round=self.round,
+                user=user,
+                elective_offering=offering,
+                rank=rank,
+            )
+            for user in self.users
+            for rank, offering in enumerate(self.offerings, 1)
+        )
+
+    def test_allocates_the_seats_once(self):
+        self.assertEqual(
+            allocation.allocate(self.round),
+            {"students": 3, "allocated": 2, "unallocated": 1},
+        )
+        self.assertEqual(
+            sorted(
+                ElectiveEnrollment.objects.values_list(
+                    "elective_offering_id", flat=True
+                )
+            ),
+            [offering.pk for offering in self.offerings],
+        )
+        with self.assertRaises(allocation.AllocationError):
+            allocation.allocate(self.round)
+
+    def test_the_seed_decides_the_lottery(self):
+        order = allocation.ballot(self.round)[0]
+        self.assertEqual(allocation.ballot(self.round)[0], order)
+        allocation.allocate(self.round)
+        winner = ElectiveEnrollment.objects.get(
+            elective_offering=self.offerings[0]
+        ).user_id
+        self.assertEqual(winner, order[0])
+
+    def test_open_rounds_are_refused(self):
+        self.round.closes_at = timezone.now() + timedelta(days=1)
+        self.round.save()
+        with self.assertRaises(allocation.AllocationError):
+            allocation.allocate(self.round)
+        self.assertFalse(ElectiveEnrollment.objects.exists())
+
+    def test_enrolling_waits_for_the_ballot(self):
+        BatchInfo.objects.create(user=self.users[0], epgp_batch=17)
+        response = api_client(self.users[0]).post(
+            reverse("electives-enroll"),
+            {"offerings": [self.offerings[0].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ballot", response.json()[0]["error"])
+
+
+class EnrollmentEventTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_users(1)[0]
+        self.offering = make_offerings(1)[0]
+
+    def enroll(self):
+        with (
+            mock.patch.object(events, "enrollment_counts", return_value=[]) as counts,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            ElectiveEnrollment.objects.create(
+                user=self.user, elective_offering=self.offering
+            )
+        return counts
+
+    @mock.patch.object(events, "fanout", events.LocalFanout())
+    def test_no_count_without_local_streams(self):
+        self.enroll().assert_not_called()
+
+    @mock.patch.object(events, "fanout", events.LocalFanout())
+    def test_count_for_open_streams(self):
+        channel = events.offering_channel(self.offering.pk)
+        with mock.patch.dict(events.broker._channels, {channel: {mock.Mock()}}):
+            counts = self.enroll()
+        counts.assert_called_once_with({self.offering.pk})
+
+    @mock.patch.object(events, "fanout", events.CacheFanout())
+    def test_count_for_other_workers(self):
+        self.enroll().assert_called_once_with({self.offering.pk})
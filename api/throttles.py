@@ -0,0 +1,70 @@
+"""Token-bucket throttles, kept in the "throttles" cache (no DB queries)."""
+
+from django.core.cache import caches  # type: ignore
+from rest_framework.permissions import SAFE_METHODS  # type: ignore
+from rest_framework.throttling import SimpleRateThrottle  # type: ignore
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Each client gets a bucket of `num_requests` tokens that refills
+    continuously at num_requests per duration, so short bursts are allowed
+    while a client retrying in a loop is held to the average rate. A
+    throttled request gets a 429 with Retry-After set to the time until the
+    next token.
+
+    Clients are authenticated users, or the remote address for anonymous
+    requests. The bucket is read and written without a lock, so concurrent
+    requests from one client may occasionally both take the last token.
+    """
+
+    cache = caches["throttles"]
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill = self.num_requests / self.duration  # tokens per second
+        tokens, stamp = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - stamp) * refill)
+        if tokens < 1:
+            self.wait_time = (1 - tokens) / refill
+            return False
+        # An expired bucket is a full one, so it only needs to live `duration`.
+        self.cache.set(self.key, (tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class EnrollThrottle(TokenBucketThrottle):
+    """Enrollment writes only; checking enrollment status is not throttled."""
+
+    scope = "enroll"
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
+
+
+class AuthThrottle(TokenBucketThrottle):
+    """Token endpoints, keyed by remote address (callers are anonymous)."""
+
+    scope = "auth"
+
+
+class ListThrottle(TokenBucketThrottle):
+    scope = "lists"
@@ -0,0 +1,129 @@
+"""Single statement INSERT ... ON CONFLICT DO UPDATE for the API models."""
+
+from django.db import connections, router, transaction  # type: ignore
+from django.db.models.signals import post_save  # type: ignore
+
+
+def upsert(
+    model,
+    rows: list[dict],
+    conflict: str,
+    update_fields: list[str],
+    previous: list[str] = (),
+):
+    """
+    Insert `rows` or, where `conflict` already exists, update only
+    `update_fields`. Returns `[(instance, created), ...]` in row order.
+
+    On PostgreSQL this is one statement that also returns the stored rows
+    (`xmax = 0` tells inserts from updates). Other databases fall back to
+    get_or_create + save(update_fields) per row. post_save is sent for every
+    row either way, so the signal based cache invalidation still runs.
+
+    On PostgreSQL pre_save is not sent; the stored values of the `previous`
+    fields being updated are read (and locked) first instead, and set as an
+    `instance._previous` dict on the updated rows for the post_save receivers.
+    """
+    meta = model._meta
+    if update_fields:
+        # auto_now columns (updated_at) change whenever anything else does
+        update_fields = list(update_fields) + [
+            f.name
+            for f in meta.concrete_fields
+            if getattr(f, "auto_now", False) and f.name not in update_fields
+        ]
+    db = router.db_for_write(model)
+    connection = connections[db]
+    if connection.vendor != "postgresql":
+        return _upsert_orm(model, rows, conflict, update_fields, db)
+
+    quote = connection.ops.quote_name
+    key = meta.get_field(conflict)
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    # Touch the conflict column when nothing else changes so RETURNING still
+    # yields the existing row.
+    updated = [quote(meta.get_field(name).column) for name in update_fields]
+    assignments = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in updated or [quote(key.column)]
+    )
+
+    values, params, keys = [], [], []
+    for row in rows:
+        obj = model(**row)
+        keys.append(getattr(obj, key.attname))
+        values.append("(" + ", ".join(["%s"] * len(fields)) + ")")
+        params.extend(
+            f.get_db_prep_save(f.pre_save(obj, add=True), connection) for f in fields
+        )
+
+    returning = meta.concrete_fields
+    sql = (
+        f"INSERT INTO {quote(meta.db_table)} "
+        f"({', '.join(quote(f.column) for f in fields)}) "
+        f"VALUES {', '.join(values)} "
+        f"ON CONFLICT ({quote(key.column)}) DO UPDATE SET {assignments} "
+        f"RETURNING {', '.join(quote(f.column) for f in returning)}, (xmax = 0)"
+    )
+    previous = [name for name in previous if name in update_fields]
+    with transaction.atomic(using=db):
+        before = _stored_values(model, key, keys, previous, connection)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            results = cursor.fetchall()
+
+        columns = [f.get_col(meta.db_table) for f in returning]
+        stored = {}
+        for result in results:
+            row_values = list(result[:-1])
+            for i, col in enumerate(columns):
+                converters = connection.ops.get_db_converters(col)
+                for converter in converters + col.get_db_converters(connection):
+                    row_values[i] = converter(row_values[i], col, connection)
+            instance = model.from_db(db, [f.attname for f in returning], row_values)
+            stored[getattr(instance, key.attname)] = (instance, bool(result[-1]))
+
+        upserted = [stored[value] for value in keys]
+        for instance, created in upserted:
+            if not created and previous:
+                instance._previous = before.get(getattr(instance, key.attname), {})
+            post_save.send(
+                sender=model,
+                instance=instance,
+                created=created,
+                update_fields=None if created else frozenset(update_fields),
+                raw=False,
+                using=db,
+            )
+    return upserted
+
+
+def _stored_values(model, key, keys, names, connection) -> dict:
+    if not names:
+        return {}
+    quote = connection.ops.quote_name
+    meta = model._meta
+    columns = [quote(meta.get_field(name).column) for name in names]
+    sql = (
+        f"SELECT {quote(key.column)}, {', '.join(columns)} "
+        f"FROM {quote(meta.db_table)} WHERE {quote(key.column)} = ANY(%s) FOR UPDATE"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [list(keys)])
+        return {row[0]: dict(zip(names, row[1:])) for row in cursor.fetchall()}
+
+
+def _upsert_orm(model, rows, conflict, update_fields, db):
+    key = model._meta.get_field(conflict).attname
+    upserted = []
+    with transaction.atomic(using=db):
+        for row in rows:
+            defaults = {name: row[name] for name in update_fields if name in row}
+            instance, created = model.objects.using(db).get_or_create(
+                **{key: getattr(model(**row), key)}, defaults=defaults
+            )
+            if not created and update_fields:
+                for name, value in defaults.items():
+                    setattr(instance, name, value)
+                instance.save(using=db, update_fields=update_fields)
+            upserted.append((instance, created))
+    return upserted
@@ -1,17 +1,8 @@
 """API URL Configuration"""
 
 from django.urls import path  # type: ignore
-from rest_framework.schemas import get_schema_view  # type: ignore
-from rest_framework.renderers import JSONOpenAPIRenderer  # type: ignore
 from . import views
-
-schema_view = get_schema_view(
-    title="EPGP API",
-    description="API for EPGP data access",
-    version="1.0.0",
-    renderer_classes=[JSONOpenAPIRenderer],
-)
-
+from .schema import schema_view
 
 urlpatterns = [
     path("schema.json", schema_view, name="openapi-schema"),
@@ -23,7 +14,9 @@ urlpatterns = [
     path("user/change-pwd/", views.change_password, name="change-password"),
     path("users/", views.ListUsers.as_view(), name="user-list"),
     path("users/create/", views.create_user, name="create-user"),
+    path("users/suggested", views.suggested_users, name="suggested-users"),
     path("users/<int:pk>/update", views.update_user_admin, name="update-user"),
+    path("users/batch", views.bulk_update_batch_info, name="bulk-batch-info"),
     path("users/<int:pk>/batch", views.batch_info_by_id, name="batch-info"),
     path("users/<int:pk>/social", views.social_links_by_id, name="batch-info"),
     path("users/<int:pk>/electives", views.electives_by_user, name="electives-by-user"),
@@ -31,8 +24,26 @@ urlpatterns = [
     path("electives/all", views.list_all_electives, name="all_elective-list"),
     path("electives/<int:pk>", views.elective_detail, name="elective-detail"),
     path("electives/<int:pk>/takers", views.elective_takers, name="elective-takers"),
+    path(
+        "electives/<int:pk>/also-taken",
+        views.elective_also_taken,
+        name="elective-also-taken",
+    ),
     path("electives/enrolled/", views.enrolled_elective, name="elective-enrolled"),
+    path("electives/enroll/", views.enroll_electives, name="electives-enroll"),
     path("electives/enroll/<int:pk>", views.enroll_elective, name="elective-enroll"),
-    path("centres", views.StudyCentresView.as_view()),
-    path("centres/<int:id>/poc/", views.StudyCentrePOCView.as_view()),
+    path("electives/rounds", views.allocation_rounds, name="allocation-rounds"),
+    path(
+        "electives/rounds/<int:pk>/preferences",
+        views.allocation_preferences,
+        name="allocation-preferences",
+    ),
+    path("bootstrap", views.bootstrap, name="bootstrap"),
+    path("sync", views.delta_sync, name="sync"),
+    path("events", views.event_stream, name="events"),
+    path("centres", views.StudyCentresView.as_view(), name="centres"),
+    path("centres/nearest", views.NearestCentresView.as_view(), name="centres-nearest"),
+    path(
+        "centres/<int:id>/poc/", views.StudyCentrePOCView.as_view(), name="centre-poc"
+    ),
 ]
@@ -1,26 +1,66 @@
 """API views for the EPGP application."""
 
+import asyncio
+from math import ceil
+
+import orjson  # type: ignore
+from asgiref.sync import sync_to_async  # type: ignore
+from django.conf import settings  # type: ignore
 from django.contrib.auth.models import User  # type: ignore
+from django.core.handlers.asgi import ASGIRequest  # type: ignore
+from django.db import IntegrityError, close_old_connections, transaction  # type: ignore
+from django.db.models import Exists, OuterRef, Q, Subquery  # type: ignore
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse  # type: ignore
+from django.utils import timezone  # type: ignore
+from django.views.decorators.http import require_GET  # type: ignore
+from rest_framework.exceptions import APIException  # type: ignore
+from rest_framework.request import Request  # type: ignore
+from rest_framework.settings import api_settings  # type: ignore
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.decorators import (  # type: ignore
     api_view,
     permission_classes,
+    throttle_classes,
 )
 from rest_framework.response import Response  # type: ignore
 from rest_framework.permissions import IsAuthenticated, IsAdminUser  # type: ignore
+from rest_framework.validators import UniqueValidator  # type: ignore
 from .serializers import (
     SCSerilazer,
     POCSerializer,
     UserSerializer,
     UserBatchSerializer,
     DetailUserSerializer,
+    DirectoryUserSerializer,
     BatchInfoSerializer,
     SocialLinksSerializer,
     ElectiveSerializer,
     ElectiveOfferingSmallSerializer,
     ElectiveEnrollmentSerializer,
     ElectiveDetailSerializer,
+    AllocationRoundSerializer,
+    ArchivedElectiveDetailSerializer,
+    ArchivedElectiveOfferingSmallSerializer,
+    ArchivedElectiveEnrollmentSerializer,
+    fieldset_key,
+    sparse_queryset,
+)
+from .cache import (
+    cached_payload,
+    cached_response,
+    cached_profile,
+    CATALOG,
+    CENTRES,
+    PROFILE_DETAIL,
+    PROFILE_BATCH,
+    PROFILE_SOCIAL,
 )
+from . import allocation, archive, events, recommend, suggest, sync
+from .geo import coordinates_from_pin, nearest_centres
+from .renderers import ORJSONRenderer
+from .routers import read_replica
+from .throttles import EnrollThrottle, ListThrottle
+from .upsert import upsert
 from .models import (
     StudyCenter,
     StudyCentrePOC,
@@ -29,6 +69,10 @@ from .models import (
     Elective,
     ElectiveOffering,
     ElectiveEnrollment,
+    AllocationRound,
+    AllocationPreference,
+    ArchivedElectiveOffering,
+    ArchivedElectiveEnrollment,
 )
 
 
@@ -38,6 +82,7 @@ from .models import (
 
 
 ## /api/users/
+@read_replica
 class ListUsers(APIView):
     """
     View to list all users in the system.
@@ -45,6 +90,7 @@ class ListUsers(APIView):
     """
 
     permission_classes = [IsAdminUser]
+    throttle_classes = [ListThrottle]
 
     def get(self, request, format=None):
         users = User.objects.all()
@@ -190,6 +236,17 @@ def update_user(request, pk):
         return Response({"error": str(e)}, status=400)
 
 
+# Helper function for a user's detailed info
+def user_detail(id):
+    """Serialized user with batch info and social links (cached per user)."""
+
+    def build():
+        user = User.objects.select_related("batch_info", "social_links").get(id=id)
+        return DetailUserSerializer(user).data
+
+    return cached_profile(PROFILE_DETAIL, id, build)
+
+
 ## /api/user/
 ## /api/users/id/
 @api_view(["GET"])
@@ -198,13 +255,50 @@ def userinfo(request, pk=None):
     """Get detailed info of a user"""
     id = pk if pk else request.user.id
     try:
-        user = User.objects.get(id=id)
-        serializer = DetailUserSerializer(user)
-        return Response(serializer.data)
+        return Response(user_detail(id))
     except User.DoesNotExist:
         return Response({"error": f"User with id {id} does not exist"}, status=404)
 
 
+## /api/users/suggested (?k=10)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ListThrottle])
+def suggested_users(request):
+    """
+    Classmates to connect with: the users of the same batch sharing the
+    most electives, study centre, current city, home state and employer
+    (see api.suggest). Users are listed without contact details.
+    """
+    try:
+        k = int(request.query_params.get("k", 10))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= suggest.MAX_SUGGESTIONS:
+        return Response(
+            {"error": f"k must be between 1 and {suggest.MAX_SUGGESTIONS}"},
+            status=400,
+        )
+
+    suggestions = suggest.index.suggest(request.user.pk, k)
+    users = User.objects.filter(pk__in=[s["user_id"] for s in suggestions])
+    by_id = {
+        user["id"]: user for user in DirectoryUserSerializer(users, many=True).data
+    }
+    return Response(
+        [
+            {
+                "user": by_id[s["user_id"]],
+                "score": s["score"],
+                "electives": s["electives"],
+                "matches": s["matches"],
+            }
+            for s in suggestions
+            if s["user_id"] in by_id
+        ]
+    )
+
+
 ################################################################################
 ## User information - Batch info, Social links and jobs (TBD)
 ################################################################################
@@ -212,50 +306,75 @@ def userinfo(request, pk=None):
 
 def get_batch_info(user):
     """Helper function to get batch info by user"""
+
+    def build():
+        return BatchInfoSerializer(BatchInfo.objects.get(user=user)).data
+
     try:
-        batch_info = BatchInfo.objects.get(user=user)
-        serializer = BatchInfoSerializer(batch_info)
-        return Response(serializer.data)
+        return Response(cached_profile(PROFILE_BATCH, getattr(user, "pk", user), build))
     except BatchInfo.DoesNotExist:
         return Response({"error": f"No BatchInfo found for user {user}"}, status=404)
 
 
 def update_batch_info(user, data):
     """Helper function to update batch info by user"""
-    try:
-        batch_info_obj, created = BatchInfo.objects.get_or_create(user=user)
-        serializer = BatchInfoSerializer(batch_info_obj, data=data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            status_code = 201 if created else 200
-            return Response(serializer.data, status=status_code)
-        return Response(serializer.errors, status=400)
-    except User.DoesNotExist:
-        return Response({"error": f"User with id {user} does not exist"}, status=404)
+    return upsert_for_user(BatchInfoSerializer, user, data, previous=["epgp_batch"])
 
 
 def get_social_links(user):
     """Helper function to get social links by user"""
+
+    def build():
+        return SocialLinksSerializer(SocialLinks.objects.get(user=user)).data
+
     try:
-        social_links = SocialLinks.objects.get(user=user)
-        serializer = SocialLinksSerializer(social_links)
-        return Response(serializer.data)
+        return Response(
+            cached_profile(PROFILE_SOCIAL, getattr(user, "pk", user), build)
+        )
     except SocialLinks.DoesNotExist:
         return Response({"error": f"No SocialLinks found for user {user}"}, status=404)
 
 
 def update_social_link(user, data):
     """Helper function to update social ink by user"""
-    try:
-        social_links, created = SocialLinks.objects.get_or_create(user=user)
-        serializer = SocialLinksSerializer(social_links, data=data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            status_code = 201 if created else 200
-            return Response(serializer.data, status=status_code)
+    return upsert_for_user(SocialLinksSerializer, user, data)
+
+
+# Helper function for the per-user upserts
+def upsert_validate(serializer_class, data):
+    """
+    Partial serializer for `data` without the unique validators: the rows
+    are written with INSERT ... ON CONFLICT, so uniqueness is left to the
+    database rather than checked with a SELECT per unique field.
+    """
+    serializer = serializer_class(data=data, partial=True)
+    for field in serializer.fields.values():
+        field.validators = [
+            v for v in field.validators if not isinstance(v, UniqueValidator)
+        ]
+    return serializer
+
+
+def upsert_for_user(serializer_class, user, data, previous=()):
+    """
+    Create or update the user's row, writing only the submitted fields.
+    `previous` is passed on to upsert().
+    """
+    serializer = upsert_validate(serializer_class, data)
+    if not serializer.is_valid():
         return Response(serializer.errors, status=400)
-    except User.DoesNotExist:
-        return Response({"error": f"User with id {user} does not exist"}, status=404)
+    fields = list(serializer.validated_data)
+    try:
+        [(instance, created)] = upsert(
+            serializer_class.Meta.model,
+            [{"user": user, **serializer.validated_data}],
+            conflict="user",
+            update_fields=fields,
+            previous=previous,
+        )
+    except IntegrityError as e:
+        return Response({"error": str(e).strip()}, status=400)
+    return Response(serializer_class(instance).data, status=201 if created else 200)
 
 
 ## /api/user/batch
@@ -278,6 +397,68 @@ def batch_info_by_id(request, pk):
     return get_batch_info(user=pk)
 
 
+## /api/users/batch
+@api_view(["PATCH"])
+@permission_classes([IsAdminUser])
+def bulk_update_batch_info(request):
+    """
+    Update Batch Info for many users in one transaction (admin only).
+
+    Body: a list of {"user": id, <fields to set>}, eg
+    [{"user": 4, "epgp_group": "B"}, {"user": 5, "studyCenter": 2}]
+    Missing Batch Info rows are created. Nothing is written unless every
+    item is valid.
+    """
+    if not isinstance(request.data, list) or not request.data:
+        return Response({"error": "Expected a non-empty list of updates"}, status=400)
+
+    errors, items, seen = [], [], set()
+    for item in request.data:
+        user = item.get("user") if isinstance(item, dict) else None
+        if not isinstance(user, int) or isinstance(user, bool):
+            errors.append({"user": ["A user id is required."]})
+            continue
+        if user in seen:
+            errors.append({"user": [f"User {user} appears more than once."]})
+            continue
+        seen.add(user)
+        data = {k: v for k, v in item.items() if k != "user"}
+        serializer = upsert_validate(BatchInfoSerializer, data)
+        errors.append({} if serializer.is_valid() else serializer.errors)
+        items.append((user, serializer.validated_data))
+    if any(errors):
+        return Response(errors, status=400)
+
+    ids = [user for user, _ in items]
+    missing = set(ids) - set(
+        User.objects.filter(pk__in=ids).values_list("pk", flat=True)
+    )
+    if missing:
+        return Response({"error": f"Users do not exist: {sorted(missing)}"}, status=404)
+
+    # One INSERT ... ON CONFLICT per distinct set of submitted fields
+    groups = {}
+    for user, data in items:
+        groups.setdefault(tuple(data), []).append({"user_id": user, **data})
+    stored = {}
+    try:
+        with transaction.atomic():
+            for fields, rows in groups.items():
+                for instance, _ in upsert(
+                    BatchInfo,
+                    rows,
+                    conflict="user",
+                    update_fields=list(fields),
+                    previous=["epgp_batch"],
+                ):
+                    stored[instance.user_id] = instance
+    except IntegrityError as e:
+        return Response({"error": str(e).strip()}, status=400)
+    return Response(
+        [{"user": user, **BatchInfoSerializer(stored[user]).data} for user in ids]
+    )
+
+
 ## /api/user/social
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
@@ -303,84 +484,184 @@ def social_links_by_id(request, pk):
 ################################################################################
 
 
+# Helper function for the elective catalog
+def all_electives_data(request=None):
+    """Serialized list of all electives (the cached catalog payload)."""
+    electives = Elective.objects.all().order_by("area", "course_code")
+    serializer = ElectiveSerializer(electives, many=True, context={"request": request})
+    return serializer.data
+
+
+# Helper function for a batch's elective offerings
+def batch_electives_data(batch, request=None):
+    """Serialized elective offerings of a batch (cached per batch)."""
+    if archive.is_archived(batch):
+        electives = ArchivedElectiveOffering.objects.filter(epgp_batch=batch)
+        serializer_class = ArchivedElectiveOfferingSmallSerializer
+    else:
+        electives = ElectiveOffering.objects.filter(epgp_batch=batch)
+        serializer_class = ElectiveOfferingSmallSerializer
+    electives = electives.order_by("course__area", "course__course_code", "section")
+    serializer = serializer_class(electives, many=True, context={"request": request})
+    return serializer.data
+
+
 ## /api/electives/all/
+@read_replica
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ListThrottle])
 def list_all_electives(request):
     """List all elective subjects offered across years"""
-
-    electives = Elective.objects.all().order_by("area", "course_code")
-    serializer = ElectiveSerializer(
-        electives,
-        many=True,
-        context={"request": request},
+    # Sparse fieldsets are cached too, but not precompressed at full effort
+    fields = fieldset_key(request, ElectiveSerializer)
+    return cached_response(
+        request,
+        CATALOG,
+        "all" + fields,
+        lambda: all_electives_data(request),
+        precompute=not fields,
     )
-    return Response(serializer.data)
 
 
 ## /api/electives/
+@read_replica
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ListThrottle])
 def list_electives_for_user(request):
     """List all elective offerings for the user's batch."""
 
     batch = BatchInfo.objects.get(user=request.user).epgp_batch
-
-    electives = ElectiveOffering.objects.filter(epgp_batch=batch).order_by(
-        "course__area", "course__course_code", "section"
-    )
-    serializer = ElectiveOfferingSmallSerializer(
-        electives,
-        many=True,
-        context={"request": request},
+    fields = fieldset_key(request, ElectiveOfferingSmallSerializer)
+    return cached_response(
+        request,
+        CATALOG,
+        f"batch:{batch}" + fields,
+        lambda: batch_electives_data(batch, request),
+        precompute=not fields,
     )
-    return Response(serializer.data)
 
 
 ## /api/electives/id/
+@read_replica
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def elective_detail(request, pk):
     """Details of a specific Elective offering by ID."""
 
-    try:
-        elective_offering = ElectiveOffering.objects.get(id=pk)
-        serializer = ElectiveDetailSerializer(
-            elective_offering, context={"request": request}
-        )
+    for model, serializer_class in (
+        (ElectiveOffering, ElectiveDetailSerializer),
+        (ArchivedElectiveOffering, ArchivedElectiveDetailSerializer),
+    ):
+        serializer = serializer_class(context={"request": request})
+        try:
+            serializer.instance = sparse_queryset(serializer, model.objects.all()).get(
+                id=pk
+            )
+        except model.DoesNotExist:
+            continue
         return Response(serializer.data)
-    except ElectiveOffering.DoesNotExist:
-        return Response(
-            {"error": f"ElectiveOffering with id {pk} does not exist"}, status=404
-        )
+    return Response(
+        {"error": f"ElectiveOffering with id {pk} does not exist"}, status=404
+    )
 
 
 ## /api/electives/id/takers/
+@read_replica
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ListThrottle])
 def elective_takers(request, pk):
-    """List of users enrolled in a specific Elective offering by ID."""
+    """
+    List of users enrolled in a specific Elective offering by ID, archived
+    ones included.
+    """
 
-    try:
-        elective_offering = ElectiveOffering.objects.get(id=pk)
-        enrollments = ElectiveEnrollment.objects.filter(
-            elective_offering=elective_offering
+    if ElectiveOffering.objects.filter(id=pk).exists():
+        users = User.objects.filter(
+            electiveenrollment__elective_offering_id=pk
+        ).order_by("electiveenrollment__id")
+    elif ArchivedElectiveOffering.objects.filter(id=pk).exists():
+        # No reverse relation from User to the archive
+        users = (
+            User.objects.annotate(
+                enrollment_id=Subquery(
+                    ArchivedElectiveEnrollment.objects.filter(
+                        user=OuterRef("pk"), elective_offering_id=pk
+                    ).values("id")[:1]
+                )
+            )
+            .filter(enrollment_id__isnull=False)
+            .order_by("enrollment_id")
         )
-        users = [enrollment.user for enrollment in enrollments]
-        serializer = UserBatchSerializer(users, many=True, context={"request": request})
-        return Response(serializer.data)
-    except ElectiveOffering.DoesNotExist:
+    else:
         return Response(
             {"error": f"ElectiveOffering with id {pk} does not exist"}, status=404
         )
+    serializer = UserBatchSerializer(users, many=True, context={"request": request})
+    return Response(serializer.data)
+
+
+## /api/electives/id/also-taken (?k=5)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([ListThrottle])
+def elective_also_taken(request, pk):
+    """
+    Students who took this offering also took: the offerings of the same
+    batch and term whose students overlap most (see api.recommend).
+    """
+    elective_offering = (
+        ElectiveOffering.objects.filter(id=pk).first()
+        or ArchivedElectiveOffering.objects.filter(id=pk).first()
+    )
+    if elective_offering is None:
+        return Response(
+            {"error": f"ElectiveOffering with id {pk} does not exist"}, status=404
+        )
+    try:
+        k = int(request.query_params.get("k", settings.RECOMMEND_TOP_K))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= settings.RECOMMEND_TOP_K:
+        return Response(
+            {"error": f"k must be between 1 and {settings.RECOMMEND_TOP_K}"},
+            status=400,
+        )
+
+    if isinstance(elective_offering, ArchivedElectiveOffering):
+        serializer_class = ArchivedElectiveOfferingSmallSerializer
+        rows = recommend.archived_recommendations(elective_offering, k)
+    else:
+        serializer_class = ElectiveOfferingSmallSerializer
+        rows = (
+            (row.recommended, row.score, row.together)
+            for row in recommend.recommendations(elective_offering, k)
+        )
+    return Response(
+        [
+            {
+                "elective_offering": serializer_class(offering).data,
+                "score": score,
+                "together": together,
+            }
+            for offering, score, together in rows
+        ]
+    )
 
 
 # Helper function for a user's elective
-def get_electives_by_user(user):
-    """List all electives enrolled by a user"""
-    enrollments = ElectiveEnrollment.objects.filter(user=user)
-    serializer = ElectiveEnrollmentSerializer(enrollments, many=True)
-    return Response(serializer.data, status=200)
+def get_electives_by_user(user, request=None):
+    """List all electives enrolled by a user, archived batches first"""
+    context = {"request": request}
+    archived = ArchivedElectiveEnrollmentSerializer(
+        ArchivedElectiveEnrollment.objects.filter(user=user), many=True, context=context
+    )
+    enrollments = ElectiveEnrollmentSerializer(
+        ElectiveEnrollment.objects.filter(user=user), many=True, context=context
+    )
+    return Response(archived.data + enrollments.data, status=200)
 
 
 ## /api/electives/enrolled/
@@ -388,7 +669,7 @@ def get_electives_by_user(user):
 @permission_classes([IsAuthenticated])
 def enrolled_elective(request):
     """Enrolled electives of the authenticated user."""
-    return get_electives_by_user(user=request.user)
+    return get_electives_by_user(user=request.user, request=request)
 
 
 ## /api/users/<int:pk>/electives/
@@ -396,12 +677,13 @@ def enrolled_elective(request):
 @permission_classes([IsAuthenticated])
 def electives_by_user(request, pk):
     """Enrolled electives by a user"""
-    return get_electives_by_user(user=pk)
+    return get_electives_by_user(user=pk, request=request)
 
 
 ## /api/electives/enroll/id/
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([EnrollThrottle])
 def enroll_elective(request, pk):
     """Get status of or enroll in an elective for logged in user
     POST: Enroll the authenticated user in an elective offering.
@@ -414,19 +696,34 @@ def enroll_elective(request, pk):
                 {"error": f"ElectiveOffering with id {pk} does not exist"}, status=404
             )
 
-        # Check if already enrolled
-        if ElectiveEnrollment.objects.filter(
-            user=request.user, elective_offering=elective_offering
+        already_enrolled = Response(
+            {"error": "User is already enrolled in this elective offering"},
+            status=400,
+        )
+        if allocation.ballots(
+            elective_offering.epgp_batch, elective_offering.term
         ).exists():
             return Response(
-                {"error": "User is already enrolled in this elective offering"},
+                {"error": f"Seats in term {elective_offering.term} go by ballot"},
                 status=400,
             )
 
         # Enroll the user
-        enrollment = ElectiveEnrollment.objects.create(
-            user=request.user, elective_offering=elective_offering
-        )
+        try:
+            with transaction.atomic():
+                # Check if already enrolled
+                if ElectiveEnrollment.objects.filter(
+                    user=request.user, elective_offering=elective_offering
+                ).exists():
+                    return already_enrolled
+                if allocation.full_offerings([pk]):
+                    return Response({"error": "No seats left"}, status=400)
+                enrollment = ElectiveEnrollment.objects.create(
+                    user=request.user, elective_offering=elective_offering
+                )
+        except IntegrityError:
+            # A concurrent request (double click, retry) enrolled first
+            return already_enrolled
         serializer = ElectiveEnrollmentSerializer(enrollment)
         return Response(serializer.data, status=201)
 
@@ -452,30 +749,521 @@ def enroll_elective(request, pk):
             return Response({"error": str(e)}, status=400)
 
 
+## /api/electives/enroll/
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([EnrollThrottle])
+def enroll_electives(request):
+    """Enroll the logged in user in several elective offerings at once
+
+    Body: {"offerings": [id, ...]}
+    Each offering must belong to the user's batch, must not already be
+    taken, must have a seat left, must not be in a term allocated by ballot
+    (api.allocation) and must not clash with another chosen or enrolled
+    offering in the same term and track, or of the same course. Valid
+    offerings are enrolled in one statement; the response has a result per
+    offering. The user's BatchInfo row is locked for the checks and the
+    insert, so their concurrent requests are checked one after another.
+    """
+    ids = request.data.get("offerings") if isinstance(request.data, dict) else None
+    if (
+        not isinstance(ids, list)
+        or not ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+    ):
+        return Response(
+            {"error": "offerings must be a non-empty list of ids"}, status=400
+        )
+    ids = list(dict.fromkeys(ids))
+
+    with transaction.atomic():
+        # Locking the user's batch row serializes their concurrent requests,
+        # which would otherwise both pass the clash checks below
+        list(BatchInfo.objects.select_for_update().filter(user=request.user))
+
+        # The requested offerings, the ones already taken and the user's batch
+        rows = {
+            row["id"]: row
+            for row in ElectiveOffering.objects.filter(
+                # A subquery: joining the enrollments would repeat each
+                # offering once per student enrolled in it
+                Q(id__in=ids)
+                | Q(
+                    pk__in=ElectiveEnrollment.objects.filter(user=request.user).values(
+                        "elective_offering"
+                    )
+                )
+            )
+            .annotate(
+                enrolled=Exists(
+                    ElectiveEnrollment.objects.filter(
+                        user=request.user, elective_offering=OuterRef("pk")
+                    )
+                ),
+                user_batch=Subquery(
+                    BatchInfo.objects.filter(user=request.user).values("epgp_batch")[:1]
+                ),
+                balloted=Exists(
+                    allocation.ballots(OuterRef("epgp_batch"), OuterRef("term"))
+                ),
+            )
+            .values(
+                "id",
+                "epgp_batch",
+                "term",
+                "track",
+                "course_id",
+                "enrolled",
+                "user_batch",
+                "balloted",
+            )
+        }
+        taken = [row for row in rows.values() if row["enrolled"]]
+        slots = {
+            (row["term"], row["track"]) for row in taken if row["track"] is not None
+        }
+        courses = {row["course_id"] for row in taken}
+
+        results, accepted = [], []
+        for pk in ids:
+            row = rows.get(pk)
+            if row is None:
+                error = f"ElectiveOffering with id {pk} does not exist"
+            elif row["enrolled"]:
+                results.append({"elective_offering": pk, "status": "already enrolled"})
+                continue
+            elif row["user_batch"] is None:
+                error = f"No BatchInfo found for user {request.user}"
+            elif row["epgp_batch"] != row["user_batch"]:
+                error = f"Offered to batch {row['epgp_batch']}, not {row['user_batch']}"
+            elif row["balloted"]:
+                error = f"Seats in term {row['term']} go by ballot"
+            elif row["course_id"] in courses:
+                error = "Another section of this course is already chosen"
+            elif row["track"] is not None and (row["term"], row["track"]) in slots:
+                error = (
+                    f"Clashes with another elective in term {row['term']} "
+                    f"track {row['track']}"
+                )
+            else:
+                courses.add(row["course_id"])
+                if row["track"] is not None:
+                    slots.add((row["term"], row["track"]))
+                accepted.append(pk)
+                results.append({"elective_offering": pk, "status": "enrolled"})
+                continue
+            results.append(
+                {"elective_offering": pk, "status": "rejected", "error": error}
+            )
+
+        full = allocation.full_offerings(accepted)
+        if full:
+            accepted = [pk for pk in accepted if pk not in full]
+            for result in results:
+                if result["elective_offering"] in full:
+                    result.update(status="rejected", error="No seats left")
+        ElectiveEnrollment.objects.bulk_create(
+            [
+                ElectiveEnrollment(user=request.user, elective_offering_id=pk)
+                for pk in accepted
+            ],
+            ignore_conflicts=True,
+        )
+        events.enrollments_changed(accepted)  # bulk_create sends no signals
+        recommend.enrollments_changed(accepted)
+        suggest.users_changed([request.user.pk])
+    if accepted:
+        status = 201
+    elif any(result["status"] == "rejected" for result in results):
+        status = 400
+    else:
+        status = 200
+    return Response(results, status=status)
+
+
+## /api/electives/rounds
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def allocation_rounds(request):
+    """Allocation rounds (ballots) of the logged in user's batch"""
+    rounds = AllocationRound.objects.filter(
+        epgp_batch=Subquery(
+            BatchInfo.objects.filter(user=request.user).values("epgp_batch")[:1]
+        )
+    )
+    return Response(AllocationRoundSerializer(rounds, many=True).data)
+
+
+## /api/electives/rounds/id/preferences
+@api_view(["GET", "PUT"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([EnrollThrottle])
+def allocation_preferences(request, pk):
+    """The logged in user's ranked offerings in an allocation round
+    GET: the ranking, best first
+    PUT: replace it while the round is open. Body: {"offerings": [id, ...]}
+    best first, offerings of the round's term; [] withdraws from the ballot.
+    """
+    try:
+        allocation_round = AllocationRound.objects.get(
+            id=pk,
+            epgp_batch=Subquery(
+                BatchInfo.objects.filter(user=request.user).values("epgp_batch")[:1]
+            ),
+        )
+    except AllocationRound.DoesNotExist:
+        return Response(
+            {"error": f"AllocationRound with id {pk} does not exist"}, status=404
+        )
+    preferences = AllocationPreference.objects.filter(
+        allocation_round=allocation_round, user=request.user
+    )
+
+    if request.method == "PUT":
+        ids = request.data.get("offerings") if isinstance(request.data, dict) else None
+        if (
+            not isinstance(ids, list)
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+            or len(set(ids)) != len(ids)
+        ):
+            return Response(
+                {"error": "offerings must be a list of distinct ids"}, status=400
+            )
+        if not allocation_round.opens_at <= timezone.now() < allocation_round.closes_at:
+            return Response({"error": f"{allocation_round} is not open"}, status=400)
+        offered = set(
+            ElectiveOffering.objects.filter(
+                id__in=ids,
+                epgp_batch=allocation_round.epgp_batch,
+                term=allocation_round.term,
+            ).values_list("id", flat=True)
+        )
+        if len(offered) != len(ids):
+            missing = [i for i in ids if i not in offered]
+            return Response(
+                {"error": f"Not offered in this round: {missing}"}, status=400
+            )
+        with transaction.atomic():
+            preferences.delete()
+            AllocationPreference.objects.bulk_create(
+                AllocationPreference(
+                    allocation_round=allocation_round,
+                    user=request.user,
+                    elective_offering_id=offering,
+                    rank=rank,
+                )
+                for rank, offering in enumerate(ids, 1)
+            )
+
+    return Response(
+        {
+            "round": AllocationRoundSerializer(allocation_round).data,
+            "offerings": list(
+                preferences.order_by("rank").values_list(
+                    "elective_offering_id", flat=True
+                )
+            ),
+        }
+    )
+
+
+################################################################################
+## Sync
+################################################################################
+
+
+## /api/sync?since=<cursor>&resources=electives,centres
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def delta_sync(request):
+    """
+    Rows created, changed or deleted since `since` (the cursor returned by
+    the previous call), per resource: electives, offerings (the user's
+    batch), centres, enrollments (the user's own) and directory (the user's
+    batch). Without `since`, or when it is too old, every row is returned
+    with "full": true.
+    """
+    names = request.query_params.get("resources")
+    resources = names.split(",") if names else list(sync.RESOURCES)
+    unknown = [name for name in resources if name not in sync.RESOURCES]
+    if unknown:
+        return Response({"error": f"Unknown resources: {unknown}"}, status=400)
+    try:
+        return Response(
+            sync.sync(request.user, request.query_params.get("since"), resources)
+        )
+    except (ValueError, OverflowError, OSError):
+        return Response({"error": "since must be a cursor from /api/sync"}, status=400)
+
+
+################################################################################
+## Events
+################################################################################
+
+
+# Helper function to authenticate a plain Django view like the API views
+def authenticated_user(request):
+    authenticators = [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        user = Request(request, authenticators=authenticators).user
+    except APIException:
+        return None
+    return user if user.is_authenticated else None
+
+
+# Helper function for the ids in a comma separated query parameter
+def id_list(value):
+    return [int(i) for i in value.split(",") if i] if value else []
+
+
+## /api/events?offerings=1,2&batches=17 (text/event-stream)
+@require_GET
+async def event_stream(request):
+    """
+    Server-sent events instead of polling enrollment counts and the catalog.
+
+    Channels: the given offerings and batches, or the user's own batch, and
+    always the catalog. "enrollment" events carry an offering's current
+    count (each one subscribed to is sent on connect), "catalog" events a
+    saved or deleted professor, elective or offering. "resync" means events
+    were dropped and the client should refetch. Needs the ASGI server.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "Event streams are only served by the ASGI app"}, status=501
+        )
+    user = await sync_to_async(authenticated_user)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    try:
+        offerings = id_list(request.GET.get("offerings"))
+        batches = id_list(request.GET.get("batches"))
+    except ValueError:
+        return JsonResponse(
+            {"error": "offerings and batches must be comma separated ids"}, status=400
+        )
+    if not offerings and not batches:
+        batch = (
+            await BatchInfo.objects.filter(user=user)
+            .values_list("epgp_batch", flat=True)
+            .afirst()
+        )
+        batches = [batch] if batch is not None else []
+    if len(offerings) + len(batches) > events.MAX_CHANNELS:
+        return JsonResponse(
+            {"error": f"At most {events.MAX_CHANNELS} offerings and batches"},
+            status=400,
+        )
+
+    channels = [events.CATALOG]
+    channels += [events.offering_channel(pk) for pk in offerings]
+    channels += [events.batch_channel(batch) for batch in batches]
+    response = StreamingHttpResponse(
+        events.stream(channels, lambda: events.enrollment_counts(offerings, batches)),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx style proxies: do not buffer
+    return response
+
+
+################################################################################
+## Bootstrap
+################################################################################
+
+
+# Helper function for the sections of /api/bootstrap
+def bootstrap_sections(user):
+    """
+    Builders of what the client loads after login, by response key, but for
+    "electives": see bootstrap_electives().
+    """
+
+    def found(response):
+        return response.data if response.status_code == 200 else None
+
+    def centres():
+        return orjson.Fragment(cached_payload(CENTRES, "all", centres_data)["identity"])
+
+    return {
+        "user": lambda: user_detail(user.pk),
+        "batch": lambda: found(get_batch_info(user)),
+        "social": lambda: found(get_social_links(user)),
+        "enrolled": lambda: get_electives_by_user(user).data,
+        "centres": centres,
+    }
+
+
+# Helper function for the "electives" section, built from the "batch" one
+def bootstrap_electives(batch):
+    if batch is None:
+        return None
+    key = f"batch:{batch['epgp_batch']}"
+    variants = cached_payload(
+        CATALOG, key, lambda: batch_electives_data(batch["epgp_batch"])
+    )
+    return orjson.Fragment(variants["identity"])  # spliced in as is
+
+
+# Helper function to build one section in a worker thread
+def bootstrap_section(build, *args):
+    # Worker threads keep their own connection; retire it like a request would
+    close_old_connections()
+    try:
+        return build(*args)
+    finally:
+        close_old_connections()
+
+
+# Helper function to apply a DRF throttle outside of a DRF view
+def throttle_wait(request, user, throttle_class):
+    """None if `throttle_class` allows `user`'s request, else seconds to wait."""
+    drf_request = Request(request)
+    drf_request.user = user
+    throttle = throttle_class()
+    if throttle.allow_request(drf_request, None):
+        return None
+    return throttle.wait()
+
+
+## /api/bootstrap
+@require_GET
+async def bootstrap(request):
+    """
+    Everything the client loads after login in one round trip: the
+    payloads of /api/users/ ("user"), /api/user/batch ("batch"),
+    /api/user/social ("social"), /api/electives/enrolled/ ("enrolled"),
+    /api/electives/ ("electives") and /api/centres ("centres"). A missing
+    batch info or social links row is null. Throttled like the list
+    endpoints (ListThrottle).
+
+    The sections are independent, but for "electives" which needs the
+    batch, and built concurrently, each in a thread with its own database
+    connection; at most BOOTSTRAP_CONCURRENCY at a time per request.
+    """
+    user = await sync_to_async(authenticated_user)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    wait = await sync_to_async(throttle_wait)(request, user, ListThrottle)
+    if wait is not None:
+        seconds = ceil(wait)
+        response = JsonResponse(
+            {
+                "detail": "Request was throttled. "
+                f"Expected available in {seconds} seconds."
+            },
+            status=429,
+        )
+        response["Retry-After"] = str(seconds)
+        return response
+
+    slots = asyncio.Semaphore(settings.BOOTSTRAP_CONCURRENCY)
+
+    async def build(builder, *args):
+        async with slots:
+            return await sync_to_async(bootstrap_section, thread_sensitive=False)(
+                builder, *args
+            )
+
+    sections = bootstrap_sections(user)
+    batch = asyncio.ensure_future(build(sections.pop("batch")))
+
+    async def electives():
+        return await build(bootstrap_electives, await batch)
+
+    results = await asyncio.gather(
+        batch, *(build(builder) for builder in sections.values()), electives()
+    )
+    return HttpResponse(
+        ORJSONRenderer().render(dict(zip(["batch", *sections, "electives"], results))),
+        content_type="application/json",
+    )
+
+
 ################################################################################
 ## Study Centre
 ################################################################################
 
 
+# Helper function for the study centre list
+def centres_data(request=None):
+    """Serialized list of all study centres (cached)."""
+    sc = StudyCenter.objects.all().order_by("state")
+    serializer = SCSerilazer(sc, many=True, context={"request": request})
+    return serializer.data
+
+
 ## /api/centres/
+@read_replica
 class StudyCentresView(APIView):
     """List all study centres"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request, format=None):
-        sc = StudyCenter.objects.all().order_by("state")
-        serializer = SCSerilazer(sc, many=True, context={"request": request})
-        return Response(serializer.data)
+        fields = fieldset_key(request, SCSerilazer)
+        return cached_response(
+            request,
+            CENTRES,
+            "all" + fields,
+            lambda: centres_data(request),
+            precompute=not fields,
+        )
+
+
+## /api/centres/nearest?pin=<pin> or ?lat=<lat>&lng=<lng> (&k=3)
+class NearestCentresView(APIView):
+    """Study centres closest to a PIN code or a location"""
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        params = request.query_params
+        try:
+            k = min(max(int(params.get("k", 3)), 1), 20)
+        except ValueError:
+            return Response({"error": "k must be an integer"}, status=400)
+
+        if "pin" in params:
+            origin = coordinates_from_pin(params["pin"])
+            if origin is None:
+                return Response(
+                    {"error": f"Unknown PIN code {params['pin']}"}, status=400
+                )
+        else:
+            try:
+                origin = (float(params["lat"]), float(params["lng"]))
+            except (KeyError, ValueError):
+                return Response(
+                    {"error": "Pass pin, or lat and lng as numbers"}, status=400
+                )
+            if not (-90 <= origin[0] <= 90 and -180 <= origin[1] <= 180):
+                return Response({"error": "lat/lng out of range"}, status=400)
+
+        return Response(
+            {
+                "origin": {"lat": origin[0], "lng": origin[1]},
+                "centres": nearest_centres(*origin, k),
+            }
+        )
 
 
 ## /api/centres/id/POC
+@read_replica
 class StudyCentrePOCView(APIView):
     """List all study centre POCs"""
 
     permission_classes = [IsAuthenticated]
 
     def get(self, request, id, format=None):
-        poc = StudyCentrePOC.objects.filter(centre__id=id)
-        serializer = POCSerializer(poc, many=True, context={"request": request})
-        return Response(serializer.data)
+        def build():
+            poc = StudyCentrePOC.objects.filter(centre__id=id)
+            serializer = POCSerializer(poc, many=True, context={"request": request})
+            return serializer.data
+
+        return cached_response(request, CENTRES, f"poc:{id}", build)
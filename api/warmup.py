@@ -0,0 +1,99 @@
+"""Worker warm-up, run by gunicorn's post_worker_init hook (gunicorn.conf.py)
+before the worker serves traffic. Nothing runs it on import, so runserver
+and management commands start as before.
+
+Without it the first request pays for resolving the URLconf (which imports
+the views, serializers, DRF, simplejwt...), loading DRF's renderer, parser
+and authentication classes, connecting to the database and building the
+catalog caches. Set WARM_UP=0 to skip.
+"""
+
+import logging
+import os
+import time
+
+logger = logging.getLogger("api.warmup")
+
+
+def resolve_urlconf():
+    """Import every view module and build the resolver's reverse dicts."""
+    from django.urls import get_resolver  # type: ignore
+
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+
+def load_framework_classes():
+    """Import the classes DRF and simplejwt load lazily from settings."""
+    from rest_framework.settings import api_settings  # type: ignore
+    from rest_framework_simplejwt.settings import (  # type: ignore
+        api_settings as jwt_settings,
+    )
+    from . import serializers  # noqa: F401
+
+    for name in (
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+        "DEFAULT_THROTTLE_CLASSES",
+    ):
+        getattr(api_settings, name)
+    jwt_settings.AUTH_TOKEN_CLASSES
+    jwt_settings.TOKEN_USER_CLASS
+
+
+def open_connections():
+    """
+    Connect to the databases whose connections outlive a request. With
+    CONN_MAX_AGE 0 the first request would close the connection unused.
+    """
+    from django.db import connections  # type: ignore
+
+    for alias in connections:
+        if connections[alias].settings_dict["CONN_MAX_AGE"]:
+            connections[alias].ensure_connection()
+
+
+def prime_caches():
+    """
+    Build the catalog, per-batch catalog, centres and schema payloads and
+    the in-memory centre and suggestion indexes.
+    """
+    from . import cache, geo, schema, suggest, views
+    from .models import ElectiveOffering
+
+    cache.cached_payload(cache.CATALOG, "all", views.all_electives_data)
+    cache.cached_payload(cache.CENTRES, "all", views.centres_data)
+    batches = ElectiveOffering.objects.values_list("epgp_batch", flat=True).distinct()
+    for batch in batches:
+        cache.cached_payload(
+            cache.CATALOG, f"batch:{batch}", lambda: views.batch_electives_data(batch)
+        )
+    schema.load()
+    geo.centre_index()
+    suggest.index.refresh()
+
+
+STEPS = [resolve_urlconf, load_framework_classes, open_connections, prime_caches]
+
+
+def warm_up() -> dict:
+    """
+    Run every warm-up step and return their durations in seconds. A failing
+    step (say the database is unreachable) is logged and skipped so the
+    worker still starts.
+    """
+    timings = {}
+    if os.getenv("WARM_UP", "1") == "0":
+        return timings
+    for step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning("Warm-up step %s failed", step.__name__, exc_info=True)
+        timings[step.__name__] = time.perf_counter() - start
+    return timings
@@ -1,2 +1,3 @@
 uv sync --frozen && uv cache prune --ci
-python manage.py collectstatic --no-input
\ No newline at end of file
+python manage.py collectstatic --no-input
+python manage.py build_schema
@@ -0,0 +1,43 @@
+"""Gunicorn configuration, loaded automatically from the working directory."""
+
+import os
+import shutil
+import tempfile
+
+# Every worker writes its Prometheus samples here; /metrics merges them.
+# prometheus_client reads it on import, so nothing in this file imports it
+# before this line.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "epgp-metrics")
+)
+
+
+def on_starting(server):
+    """Start from an empty metrics directory on every (re)deploy."""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauges of workers that are gone."""
+    from prometheus_client import multiprocess  # type: ignore
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    """
+    WSGI workers keep their database connections across requests (and reuse
+    the one the warm-up opens). ASGI (uvicorn) workers query from executor
+    threads and keep the per-request default.
+    """
+    if not server.cfg.worker_class_str.startswith("uvicorn"):
+        os.environ.setdefault("DB_CONN_MAX_AGE", "60")
+
+
+def post_worker_init(worker):
+    """Warm the worker up before it accepts requests (WARM_UP=0 to skip)."""
+    from api.warmup import warm_up
+
+    warm_up()